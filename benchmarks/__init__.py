@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmarks for nombot hot paths; run with `python -m benchmarks.<name>`"""
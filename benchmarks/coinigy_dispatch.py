@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the per-message cost of the Coinigy strategy
+
+    python -m benchmarks.coinigy_dispatch [count] [number]
+"""
+
+from collections import namedtuple
+import sys
+import timeit
+
+from nombot.api.coinigy_response import Result
+from nombot.strategies.middleware.coinigy import CoinigyStrategy
+
+
+# The UnmarshalResult marshmallow 2 wraps loaded results in
+Loaded = namedtuple("Loaded", ("data", "errors"))
+
+
+def make_contexts(count, channels=20):
+    """Pipeline contexts of websocket results over a few channels"""
+    api_context = {"name": "coinigy", "inst": [], "shared": {},
+                   "conf": {"subscriptions": {}}}
+    contexts = []
+    for num in range(count):
+        chan = f"TRADE-GDAX--C{num % channels}--USD"
+        result = Result(channel=chan, response_type="trade",
+                        result={"price": 6500.0, "quantity": 0.5})
+        contexts.append({"api_context": api_context, "api_contexts": {},
+                         "result": Loaded(result, {}), "strategy": {}})
+    return contexts
+
+
+def main(count=10000, number=20):
+    """Time the strategy over the contexts, printing the cost per message"""
+    contexts = make_contexts(count)
+    strategy = CoinigyStrategy()
+    strategy.api_facade = strategy.ws_facade = object()
+
+    def run():
+        """Bind every context"""
+        for context in contexts:
+            context["strategy"] = {}
+            strategy.bind(context)
+
+    best = min(timeit.repeat(run, number=1, repeat=number))
+    print(f"{count} messages, best of {number} runs: "
+          f"{best / count * 1e6:.2f} us/msg, {count / best:.0f} msg/s")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
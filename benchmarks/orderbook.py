@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark order book decoding: marshmallow schema vs. NumPy arrays
+
+    python -m benchmarks.orderbook [exchanges] [markets] [depth]
+"""
+
+import random
+import sys
+import timeit
+
+from nombot.generics.arrays import decode_order_books
+from nombot.generics.exchange import OrderBookSchema
+
+
+def make_result(exchanges, markets, depth):
+    """Generate ccxt-like fetchOrderBook results as CCXTApi returns them"""
+    def side(start, step):
+        return [[start + step * lvl, random.uniform(0.01, 10.0)]
+                for lvl in range(depth)]
+
+    data = {"result": {
+        f"exch{ex}": {
+            f"CUR{mkt}/USD": {
+                "bids": side(100.0, -0.01),
+                "asks": side(100.01, 0.01),
+                "timestamp": 1530000000000,
+                "datetime": "2018-06-26T08:00:00.000Z",
+                "nonce": None,
+            }
+            for mkt in range(markets)
+        }
+        for ex in range(exchanges)
+    }}
+    data["result"]["result"] = data["result"]  # as CCXTResponseSchema does
+    return data
+
+
+def main(exchanges=4, markets=20, depth=100, number=20):
+    """Time both decoders, printing the mean time per call"""
+    data = make_result(exchanges, markets, depth)
+    schema = OrderBookSchema(many=True)
+
+    timings = {
+        "marshmallow": timeit.timeit(
+            lambda: schema.dump(schema.prepare(data)), number=number),
+        "numpy": timeit.timeit(
+            lambda: decode_order_books(data), number=number),
+    }
+
+    print(f"{exchanges} exchanges x {markets} markets x {depth} levels")
+    for name, seconds in timings.items():
+        print(f"{name:>12}: {seconds / number * 1000:9.3f} ms")
+    print(f"{'speedup':>12}: "
+          f"{timings['marshmallow'] / timings['numpy']:9.1f}x")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
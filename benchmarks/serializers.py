@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark response serialization: marshmallow dumps vs. compiled serializers
+
+    python -m benchmarks.serializers [count] [number]
+"""
+
+import sys
+import timeit
+
+from nombot.generics.response import RESPONSE_MAP, SERIALIZERS
+
+
+def make_samples(count):
+    """Generate prepared ccxt-like objects for every benchmarked callname"""
+    fee = {"currency": "USD", "cost": 0.1, "rate": 0.0025}
+    limit = {"min": 0.001, "max": 1000.0}
+    order = {
+        "exchange": "exch", "id": "1", "datetime": "2018-06-26T08:00:00Z",
+        "timestamp": 1530000000000, "lastTradeTimestamp": 1530000000000,
+        "status": "open", "symbol": "BTC/USD", "type": "limit",
+        "side": "buy", "price": 6000.0, "amount": 1.5, "filled": 0.5,
+        "remaining": 1.0, "cost": 3000.0, "trades": [[6000.0, 0.5]],
+        "fee": fee, "info": {"raw": "payload"},
+    }
+    trade = {
+        "exchange": "exch", "info": {"raw": "payload"}, "id": "1",
+        "timestamp": 1530000000000, "datetime": "2018-06-26T08:00:00Z",
+        "symbol": "BTC/USD", "order": "2", "type": "limit", "side": "sell",
+        "price": 6000.0, "amount": 0.5,
+    }
+    ticker = {
+        "exchange": "exch", "symbol": "BTC/USD", "info": {"raw": "payload"},
+        "timestamp": 1530000000000, "datetime": "2018-06-26T08:00:00Z",
+        "high": 6100.0, "low": 5900.0, "bid": 5999.0, "bidVolume": 1.0,
+        "ask": 6001.0, "askVolume": 2.0, "vwap": 6000.0, "open": 5950.0,
+        "close": 6000.0, "last": 6000.0, "previousClose": 5950.0,
+        "change": 50.0, "percentage": 0.84, "average": 5975.0,
+        "baseVolume": 100.0, "quoteVolume": 600000.0,
+    }
+    samples = {
+        "fetchBalance": [{
+            "exchange": "exch", "info": [{"raw": "payload"}],
+            "free": {"BTC": 1.0}, "used": {"BTC": 0.5},
+            "total": {"BTC": 1.5}, "by_sym": {"BTC": {"free": 1.0}},
+        }] * count,
+        "fetchMarkets": {
+            "exchange": "exch", "active": True, "symbol": "BTC/USD",
+            "base": "BTC", "baseId": "btc", "quote": "USD",
+            "quoteId": "usd", "id": "btcusd", "info": {"raw": "payload"},
+            "limits": {"amount": limit, "price": limit}, "maker": 0.001,
+            "taker": 0.002, "precision": {"amount": limit, "price": limit},
+        },
+        "fetchOrderBook": [{
+            "exchange": "exch", "market": "BTC/USD",
+            "bids": [[6000.0 - lvl, 1.0] for lvl in range(50)],
+            "asks": [[6001.0 + lvl, 1.0] for lvl in range(50)],
+            "timestamp": 1530000000000,
+            "datetime": "2018-06-26T08:00:00Z", "nonce": None,
+        }] * count,
+        "fetchOHLCV": [{
+            "exchange": "exch", "market": "BTC/USD",
+            "timestamp": list(range(1530000000000, 1530000000000 + 500)),
+            "open": [6000.0] * 500, "high": [6001.0] * 500,
+            "low": [5999.0] * 500, "close": [6000.5] * 500,
+            "volume": [1.5] * 500,
+        }] * (count // 10 or 1),
+        "fetchOrders": [order] * count,
+        "fetchTicker": ticker,
+        "fetchTickers": [ticker] * count,
+        "fetchTrades": [trade] * count,
+        "fetchMyTrades": [dict(trade, cost=3000.0, fee=fee)] * count,
+    }
+    samples["fetchOpenOrders"] = samples["fetchOrders"]
+    samples["fetchClosedOrders"] = samples["fetchOrders"]
+    return samples
+
+
+def main(count=100, number=50):
+    """Time both serializers for each callname, printing the mean per call"""
+    print(f"{count} objects per list response, mean of {number} calls")
+    print(f"{'callname':>18} {'marshmallow':>12} {'compiled':>12} "
+          f"{'speedup':>8}")
+    for callname, sample in make_samples(count).items():
+        dump = RESPONSE_MAP[callname].dump
+        compiled = SERIALIZERS[callname]
+        assert compiled(sample) == dump(sample), callname
+
+        slow = timeit.timeit(lambda: dump(sample), number=number)
+        fast = timeit.timeit(lambda: compiled(sample), number=number)
+        print(f"{callname:>18} {slow / number * 1000:9.3f} ms "
+              f"{fast / number * 1000:9.3f} ms {slow / fast:7.1f}x")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
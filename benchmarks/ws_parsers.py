@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark websocket payload parsing: per-message schema lookup and dump
+from stdlib-decoded JSON vs. pre-resolved parsers on the fast backend
+
+    python -m benchmarks.ws_parsers [count] [number]
+"""
+
+import json
+import sys
+import timeit
+
+from nombot.api.coinigy_response import RESPONSE_MAP
+from nombot.common.fastjson import BACKEND
+from nombot.generics.response import ParserRegistry
+
+
+# Payloads as published on Coinigy's TRADE and ORDER channels
+TRADE_PAYLOAD = (
+    '{"market_history_id":1234567890,"channel":"TRADE-GDAX--BTC--USD",'
+    '"exchange":"GDAX","marketid":7435,"label":"BTC/USD",'
+    '"tradeid":"45678901","price":6512.37,"quantity":0.0123,'
+    '"total":80.1021,"type":"SELL","exchId":62,'
+    '"time":"2018-06-26T08:00:01","timestamp":"2018-06-26T08:00:01",'
+    '"time_local":"2018-06-26 08:00:01"}'
+)
+ORDER_ITEM = (
+    '{{"exchange":"GDAX","label":"BTC/USD","ordertype":"{side}",'
+    '"price":{price},"quantity":0.75,"total":{total},'
+    '"timestamp":"2018-06-26T08:00:01"}}'
+)
+
+
+def order_payload(levels=50):
+    """An order channel book of `levels` bids and asks"""
+    items = []
+    for lvl in range(levels):
+        for side, price in (("Buy", 6512.0 - lvl), ("Sell", 6513.0 + lvl)):
+            items.append(ORDER_ITEM.format(side=side, price=price,
+                                           total=price * 0.75))
+    return "[" + ",".join(items) + "]"
+
+
+def make_messages(count):
+    """Interleave `count` trade messages with an order book each tenth"""
+    book = order_payload()
+    return [("orders", book) if num % 10 == 9 else ("trade", TRADE_PAYLOAD)
+            for num in range(count)]
+
+
+def parse_each(messages):
+    """Parse as prep_data did: look up, fall back, dump each message"""
+    out = []
+    for res_type, payload in messages:
+        try:
+            schema = RESPONSE_MAP[res_type]
+        except KeyError:
+            schema = None
+        data = json.loads(payload)
+        out.append(data if schema is None else schema.dump(data))
+    return out
+
+
+def parse_resolved(registry, messages):
+    """Parse through the parsers resolved at subscription time"""
+    resolve = registry.resolve
+    return [resolve(res_type)(payload) for res_type, payload in messages]
+
+
+def main(count=1000, number=20):
+    """Time both parsing paths, printing their message throughput"""
+    messages = make_messages(count)
+    registry = ParserRegistry(RESPONSE_MAP)
+    for res_type in ("trade", "orders"):
+        registry.resolve(res_type)
+    assert parse_resolved(registry, messages) == parse_each(messages)
+
+    print(f"{count} messages (one order book per ten), best of {number} "
+          f"runs; fast JSON backend: {BACKEND}")
+    slow = min(timeit.repeat(lambda: parse_each(messages),
+                             number=1, repeat=number))
+    fast = min(timeit.repeat(lambda: parse_resolved(registry, messages),
+                             number=1, repeat=number))
+    print(f"{'per-message dump':>18} {count / slow:12.0f} msg/s")
+    print(f"{'resolved parsers':>18} {count / fast:12.0f} msg/s "
+          f"{slow / fast:7.1f}x")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,407 @@
+"""
+Incremental technical indicators
+
+Every indicator keeps just enough state to fold in one new bar at O(1)
+cost with `update`, and offers a vectorized `batch` over NumPy arrays that
+returns the indicator for each bar and leaves the same state behind, for
+warming up over historical candles.  Incremental updates return None until
+an indicator has enough bars; batches return NaN in those places.
+"""
+
+from collections import deque
+import math
+
+import numpy as np
+
+
+def ewm(values, alpha, initial=None):
+    """
+    Exponentially weighted mean of an array, seeded with `initial` (or
+    the first value): y[k] = y[k-1] + alpha * (values[k] - y[k-1])
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty(len(values))
+    if not len(values):
+        return out
+    if alpha >= 1:
+        out[:] = values
+        return out
+
+    # y[k] = w^k * (y[0] + alpha * sum(values[j] / w^j)), computed in blocks
+    # short enough that w^-k cannot overflow
+    decay = 1 - alpha
+    block = max(1, min(256, int(150 / -math.log10(decay))))
+    prev = values[0] if initial is None else initial
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        powers = decay ** np.arange(1, len(chunk) + 1)
+        out[start:start + len(chunk)] = \
+            powers * (prev + alpha * np.cumsum(chunk / powers))
+        prev = out[start + len(chunk) - 1]
+    return out
+
+
+def _latest(value):
+    """Turn a NaN from a batch into the None `update` would return"""
+    return None if value is None or math.isnan(value) else float(value)
+
+
+class EMA:
+    """Exponential moving average"""
+    def __init__(self, period=None, alpha=None):
+        self.alpha = alpha if alpha is not None else 2 / (period + 1)
+        self.value = None
+
+    def update(self, value):
+        """Fold in a value, returning the average"""
+        if self.value is None:
+            self.value = float(value)
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+    def batch(self, values):
+        """Fold in an array of values, returning the average at each"""
+        out = ewm(values, self.alpha, self.value)
+        if len(out):
+            self.value = float(out[-1])
+        return out
+
+
+class SMA:
+    """Simple moving average"""
+    def __init__(self, period):
+        self.period = period
+        self.window = deque(maxlen=period)  # type: deque
+        self.total = 0.0
+
+    def update(self, value):
+        """Fold in a value, returning the average once the window is full"""
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(float(value))
+        self.total += value
+        if len(self.window) < self.period:
+            return None
+        return self.total / self.period
+
+    def _extend(self, values):
+        """Join the window to new values, returning their running sums"""
+        joined = np.concatenate([np.asarray(self.window), values])
+        sums = np.concatenate([[0.0], np.cumsum(joined)])
+        self.window.clear()
+        self.window.extend(joined[-self.period:].tolist())
+        return joined, sums
+
+    def _window_sums(self, sums, count, total):
+        """Sum of the window ending at each of the `count` last values"""
+        ends = np.arange(total - count + 1, total + 1)
+        out = np.full(count, np.nan)
+        full = ends >= self.period
+        out[full] = sums[ends[full]] - sums[ends[full] - self.period]
+        return out
+
+    def batch(self, values):
+        """Fold in an array of values, returning the average at each"""
+        values = np.asarray(values, dtype=np.float64)
+        joined, sums = self._extend(values)
+        out = self._window_sums(sums, len(values), len(joined)) / self.period
+        self.total = float(sum(self.window))
+        return out
+
+
+class Bollinger(SMA):
+    """Bollinger bands: (middle, upper, lower) at `width` deviations"""
+    def __init__(self, period=20, width=2.0):
+        super().__init__(period)
+        self.width = width
+        self.squares = 0.0
+
+    def _bands(self, mean, square):
+        """Bands from the mean and mean square of a window"""
+        dev = self.width * np.sqrt(np.maximum(square - mean * mean, 0.0))
+        return mean, mean + dev, mean - dev
+
+    def update(self, value):
+        """Fold in a value, returning the bands once the window is full"""
+        if len(self.window) == self.period:
+            self.squares -= self.window[0] ** 2
+        self.squares += value * value
+        mean = super().update(value)
+        if mean is None:
+            return None
+        mid, upper, lower = self._bands(mean, self.squares / self.period)
+        return float(mid), float(upper), float(lower)
+
+    def batch(self, values):
+        """Fold in an array of values, returning arrays of the bands"""
+        values = np.asarray(values, dtype=np.float64)
+        joined, sums = self._extend(values)
+        squares = np.concatenate([[0.0], np.cumsum(joined * joined)])
+        mean = self._window_sums(sums, len(values), len(joined)) \
+            / self.period
+        square = self._window_sums(squares, len(values), len(joined)) \
+            / self.period
+        self.total = float(sum(self.window))
+        self.squares = float(sum(item * item for item in self.window))
+        return self._bands(mean, square)
+
+
+class RSI:
+    """Relative strength index, with Wilder's smoothing"""
+    def __init__(self, period=14):
+        self.gains = EMA(alpha=1 / period)
+        self.losses = EMA(alpha=1 / period)
+        self.prev = None
+
+    @staticmethod
+    def _index(gain, loss):
+        """RSI from average gains and losses"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(loss == 0, 100.0, 100 - 100 / (1 + gain / loss))
+
+    def update(self, close):
+        """Fold in a close, returning the RSI from the second close on"""
+        prev, self.prev = self.prev, close
+        if prev is None:
+            return None
+        change = close - prev
+        gain = self.gains.update(max(change, 0.0))
+        loss = self.losses.update(max(-change, 0.0))
+        return 100.0 if loss == 0 else 100 - 100 / (1 + gain / loss)
+
+    def batch(self, closes):
+        """Fold in an array of closes, returning the RSI at each"""
+        closes = np.asarray(closes, dtype=np.float64)
+        out = np.full(len(closes), np.nan)
+        if not len(closes):
+            return out
+        first = 1 if self.prev is None else 0
+        prev = closes[0] if self.prev is None else self.prev
+        changes = np.diff(closes, prepend=prev)[first:]
+        self.prev = float(closes[-1])
+        gain = self.gains.batch(np.maximum(changes, 0.0))
+        loss = self.losses.batch(np.maximum(-changes, 0.0))
+        out[first:] = self._index(gain, loss)
+        return out
+
+
+class MACD:
+    """Moving average convergence/divergence: (macd, signal, histogram)"""
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+
+    def update(self, close):
+        """Fold in a close, returning (macd, signal, histogram)"""
+        macd = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal.update(macd)
+        return macd, signal, macd - signal
+
+    def batch(self, closes):
+        """Fold in an array of closes, returning arrays of the lines"""
+        macd = self.fast.batch(closes) - self.slow.batch(closes)
+        signal = self.signal.batch(macd)
+        return macd, signal, macd - signal
+
+
+class ATR:
+    """Average true range, with Wilder's smoothing"""
+    def __init__(self, period=14):
+        self.average = EMA(alpha=1 / period)
+        self.prev = None
+
+    def update(self, high, low, close):
+        """Fold in a bar, returning the ATR"""
+        true_range = high - low
+        if self.prev is not None:
+            true_range = max(true_range, abs(high - self.prev),
+                             abs(low - self.prev))
+        self.prev = close
+        return self.average.update(true_range)
+
+    def batch(self, high, low, close):
+        """Fold in arrays of bars, returning the ATR at each"""
+        high, low, close = (np.asarray(column, dtype=np.float64)
+                            for column in (high, low, close))
+        if not len(close):
+            return np.empty(0)
+        prev = np.concatenate([[np.nan if self.prev is None else self.prev],
+                               close[:-1]])
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - prev),
+                                                 np.abs(low - prev)))
+        self.prev = float(close[-1])
+        return self.average.batch(true_range)
+
+
+class VWAP:
+    """
+    Volume weighted average (typical) price of a session; given bar times
+    (ms), a new session starts each `session` ms, a UTC day by default
+    """
+    def __init__(self, session=86400000):
+        self.session = session
+        self.start = None  # time the current session started
+        self.value = 0.0
+        self.volume = 0.0
+
+    def reset(self, start=None):
+        """Start a new session"""
+        self.start = start
+        self.value = self.volume = 0.0
+
+    def update(self, high, low, close, volume, time=None):
+        """Fold in a bar, returning the VWAP once volume has traded"""
+        # pylint: disable=too-many-arguments
+        if time is not None and self.session:
+            start = time - time % self.session
+            if start != self.start:
+                self.reset(start)
+        self.value += (high + low + close) / 3 * volume
+        self.volume += volume
+        return self.value / self.volume if self.volume else None
+
+    def batch(self, high, low, close, volume, time=None):
+        """Fold in arrays of bars, returning the VWAP at each"""
+        # pylint: disable=too-many-arguments
+        typical = (np.asarray(high, dtype=np.float64) + low + close) / 3
+        volume = np.asarray(volume, dtype=np.float64)
+        values = np.cumsum(typical * volume)
+        volumes = np.cumsum(volume)
+        if not len(volumes):
+            return volumes
+        if time is None or not self.session:
+            values += self.value
+            volumes += self.volume
+        else:
+            values, volumes = self._sessions(np.asarray(time, np.int64),
+                                             values, volumes)
+        self.value, self.volume = float(values[-1]), float(volumes[-1])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(volumes > 0, values / volumes, np.nan)
+
+    def _sessions(self, time, values, volumes):
+        """Restart cumulative sums at each session's first bar"""
+        starts = time - time % self.session
+        new = np.empty(len(starts), dtype=bool)
+        new[0] = starts[0] != self.start
+        new[1:] = starts[1:] != starts[:-1]
+        # index of the session's first bar; -1 while the old one goes on
+        first = np.maximum.accumulate(
+            np.where(new, np.arange(len(new)), -1))
+        ongoing = first < 0
+        first = np.maximum(first, 0)
+        before = values - np.diff(values, prepend=0.0)
+        before_volume = volumes - np.diff(volumes, prepend=0.0)
+        values = values - np.where(ongoing, -self.value, before[first])
+        volumes = volumes - np.where(ongoing, -self.volume,
+                                     before_volume[first])
+        self.start = int(starts[-1])
+        return values, volumes
+
+
+class Indicators:
+    """The indicators of one market, fed bars in time order"""
+    columns = ("time", "open", "high", "low", "close", "volume")
+
+    def __init__(self, sma=20, ema=20, rsi=14, macd=(12, 26, 9),
+                 bollinger=(20, 2.0), atr=14, vwap_session=86400000):
+        self.sma = SMA(sma)
+        self.ema = EMA(ema)
+        self.rsi = RSI(rsi)
+        self.macd = MACD(*macd)
+        self.bollinger = Bollinger(*bollinger)
+        self.atr = ATR(atr)
+        self.vwap = VWAP(vwap_session)
+        self.time = None
+        self.latest = {}  # type: dict
+
+    def update(self, time, open_, high, low, close, volume):
+        """Fold in one bar, returning the latest values"""
+        # pylint: disable=too-many-arguments,unused-argument
+        macd, signal, hist = self.macd.update(close)
+        bands = self.bollinger.update(close) or (None, None, None)
+        self.latest.update({
+            "time": time,
+            "sma": self.sma.update(close),
+            "ema": self.ema.update(close),
+            "rsi": self.rsi.update(close),
+            "macd": macd,
+            "macd_signal": signal,
+            "macd_hist": hist,
+            "boll": bands[0],
+            "boll_upper": bands[1],
+            "boll_lower": bands[2],
+            "atr": self.atr.update(high, low, close),
+            "vwap": self.vwap.update(high, low, close, volume, time),
+        })
+        self.time = time
+        return self.latest
+
+    def batch(self, bars):
+        """
+        Fold in columns of bars (time, open, high, low, close, volume),
+        returning each indicator as an array over them
+        """
+        close = np.asarray(bars["close"], dtype=np.float64)
+        high, low, volume = (np.asarray(bars[column], dtype=np.float64)
+                             for column in ("high", "low", "volume"))
+        macd, signal, hist = self.macd.batch(close)
+        boll, upper, lower = self.bollinger.batch(close)
+        out = {
+            "sma": self.sma.batch(close),
+            "ema": self.ema.batch(close),
+            "rsi": self.rsi.batch(close),
+            "macd": macd,
+            "macd_signal": signal,
+            "macd_hist": hist,
+            "boll": boll,
+            "boll_upper": upper,
+            "boll_lower": lower,
+            "atr": self.atr.batch(high, low, close),
+            "vwap": self.vwap.batch(high, low, close, volume,
+                                    bars["time"]),
+        }
+        if len(close):
+            self.time = int(bars["time"][-1])
+            self.latest["time"] = self.time
+            self.latest.update({name: _latest(values[-1])
+                                for name, values in out.items()})
+        return out
+
+    def feed(self, bars):
+        """
+        Fold in the bars newer than the last one seen: in a batch when
+        there are several, one at a time otherwise
+        """
+        times = np.asarray(bars["time"])
+        start = 0 if self.time is None else \
+            int(np.searchsorted(times, self.time, side="right"))
+        if len(times) - start > 1:
+            self.batch({column: bars[column][start:]
+                        for column in self.columns})
+        elif len(times) - start == 1:
+            time, *prices = (bars[column][start] for column in self.columns)
+            self.update(int(time), *(float(price) for price in prices))
+        return self.latest
+
+
+class IndicatorTable:
+    """Indicators keyed by exchange and market"""
+    def __init__(self, **settings):
+        self.settings = settings
+        self.indicators = {}  # type: dict
+
+    def get(self, exchange, market):
+        """Return the indicators of a market, creating them when new"""
+        key = (exchange, market)
+        indicators = self.indicators.get(key, None)
+        if indicators is None:
+            indicators = self.indicators[key] = Indicators(**self.settings)
+        return indicators
+
+    def latest(self):
+        """Return the latest values, keyed by exchange and market"""
+        return {key: indicators.latest
+                for key, indicators in self.indicators.items()}
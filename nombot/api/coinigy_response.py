@@ -3,7 +3,7 @@ Generic API Interface, mixin, and response maps/types
 """
 
 from bors.common.dotobj import DotObj
-from bors.generics import coinigy as X
+from nombot.generics import coinigy as X
 
 
 RESPONSE_MAP = {
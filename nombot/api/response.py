@@ -10,7 +10,7 @@ RESPONSE_MAP = {
     # commented, as they are not implemented
     "fetchBalance": X.BalanceSchema(many=True),
     "fetchMarkets": X.MarketSchema(),
-    # "fetchOHLCV": X.OHLCVSchema(many=True),
+    "fetchOHLCV": X.OHLCVSchema(many=True),
     "fetchOrderBook": X.OrderBookSchema(many=True),
     "fetchOrders": X.OrderSchema(many=True),
     "fetchOpenOrders": X.OrderSchema(many=True),
@@ -1,20 +1,37 @@
 """CCXT API Facade"""
 
 import asyncio
-from itertools import product
+import concurrent.futures
+import threading
+import time
 from dataclasses import dataclass
 
-import ccxt.async as ccxt
-from ccxt.base.errors import ExchangeNotAvailable, ExchangeError
+import ccxt.async_support as ccxt
+from ccxt.base.errors import BaseError, ExchangeNotAvailable
 
 from marshmallow import pre_load
 
 from bors.app.log import LoggerMixin
 
+from nombot.common.health import HealthTable
+from nombot.common.ledger import Ledgers
+from nombot.common.market_cache import MarketCache
+from nombot.common.market_index import MarketIndex
+from nombot.common.ratelimit import RateLimiter
+from nombot.common.response_cache import MISSING, SingleFlight, TTLCache
+from nombot.common.runtime import LoopRuntime
+from nombot.common.timeframe import parse_timeframe
+from nombot.generics.arrays import decode_ohlcv, decode_order_books
+from nombot.generics.records import record_decoders
 from nombot.generics.request import RequestSchema
 from nombot.generics.response import ResponseSchema
 
 
+# Errors that drop an exchange or symbol from a call rather than failing
+# it: all of ccxt's, network errors included, and our own timeouts
+EXCHANGE_ERRORS = (BaseError, asyncio.TimeoutError)
+
+
 class CCXTResponseSchema(ResponseSchema):
     """Generic response class"""
     @pre_load
@@ -30,9 +47,27 @@ class CCXTExchange:
     currencies: list
     rate_limit: int = None
     credentials: dict = None
+    concurrent: bool = False
+    concurrency: int = None
+    market_cache: MarketCache = None
+    rate_burst: int = 1
+    rate_weights: dict = None
+    market_index: MarketIndex = None
+    loop: asyncio.AbstractEventLoop = None
+    health: HealthTable = None
 
     _ex = None
-    loop = asyncio.get_event_loop()
+    _sem = None
+    _load_lock = None
+    _revalidation = None
+    limiter = None
+
+    # Bulk endpoints answering for many symbols in a single request
+    bulk_calls = {
+        "fetchOrderBook": "fetchOrderBooks",
+        "fetchTicker": "fetchTickers",
+    }
+    plan = None
 
     avail_currencies = None
     _currencies = None
@@ -43,30 +78,153 @@ class CCXTExchange:
     avail_symbols = None
     symbols = None
 
+    load_time = None  # seconds spent loading markets
+
     def __post_init__(self):
-        # instantiate exchange object
-        self._ex = getattr(ccxt, self.name)()
+        if self.loop is None:
+            self.loop = asyncio.get_event_loop()
+        self._ex = self._create()
+
+        # Throttle with our own limiter, shared per exchange and credential,
+        # rather than ccxt's fixed sleep between requests
+        self.limiter = RateLimiter((self.name, self._ex.apiKey),
+                                   1000 / self._ex.rateLimit,
+                                   self.rate_burst, self.rate_weights)
+
+        self.plan = {}
+
+        if self.health is None:
+            self.health = HealthTable()
+
+    def _create(self):
+        """Instantiate the ccxt exchange object, bound to our loop"""
+        ex = getattr(ccxt, self.name)({"asyncio_loop": self.loop})
 
         if self.rate_limit is not None:
-            self._ex.rate_limit = self.rate_limit
-        self._ex.enable_rate_limit = True
+            ex.rateLimit = self.rate_limit
 
         if self.credentials is not None:
-            self._ex.apiKey = self.credentials.get("apiKey", None)
-            self._ex.secret = self.credentials.get("secret", None)
-
-        self.loop.run_until_complete(self.load())
+            ex.apiKey = self.credentials.get("apiKey", None)
+            ex.secret = self.credentials.get("secret", None)
+
+        # our limiter throttles the requests instead
+        ex.enableRateLimit = False
+        return ex
+
+    def rebind(self, loop):
+        """
+        Move the exchange to another loop, as a forked process must: the
+        ccxt object's session and our locks belong to the old loop, so they
+        are made anew, keeping the loaded markets
+        """
+        self.loop = loop
+        self._ex = self._create()
+        if self.avail_markets is not None:
+            self._ex.set_markets(self.avail_markets, self.avail_currencies)
+        self._sem = self._load_lock = self._revalidation = None
+
+    @property
+    def account(self):
+        """The account calls are made on, if credentials were given"""
+        return self._ex.apiKey
+
+    def max_concurrency(self):
+        """
+        Number of requests allowed in flight at once; unless configured,
+        this is the number of requests the rate limit allows per second
+        """
+        if self.concurrency is not None:
+            return max(1, self.concurrency)
+        return max(1, int(1000 / self._ex.rateLimit))
+
+    @property
+    def semaphore(self):
+        """Bounds the number of in-flight requests during symbol sweeps"""
+        # created on first use so it belongs to the running loop
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrency())
+        return self._sem
+
+    @property
+    def load_lock(self):
+        """Keeps concurrent callers from loading the markets twice"""
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        return self._load_lock
 
     def has(self, callname):
         """Returns `has` value of exchange"""
         return self._ex.has.get(callname, False)
 
+    def plan_calls(self, overrides):
+        """
+        Pick the cheapest calltype for each overridden callname; a symbol
+        sweep is replaced by a single bulk call when the exchange natively
+        supports one (emulated bulk calls are sweeps in disguise)
+        """
+        for callname, calltype in overrides.items():
+            bulk = self.bulk_calls.get(callname, None)
+            if calltype == "call_over_syms" and bulk is not None \
+                    and self.has(bulk) is True:
+                calltype = "call_bulk"
+            self.plan[callname] = calltype
+
     async def load(self, reload=False, *args, **kwargs):
-        """Load the markets; populating the exchange object with data"""
+        """
+        Load the markets; populating the exchange object with data. Markets
+        are read from the market cache, if configured, unless reloading.
+        """
         if self.markets is not None and not reload:
             return
 
-        self.avail_markets = await self._ex.load_markets(*args, **kwargs)
+        # Markets are loaded by `CCXT.bootstrap` or, lazily, on first use
+        async with self.load_lock:
+            # another caller may have loaded the markets while we waited
+            if self.markets is None or reload:
+                start = time.time()
+                await self._load(reload, *args, **kwargs)
+                self.load_time = time.time() - start
+
+    async def _load(self, reload, *args, **kwargs):
+        """Load the markets from the cache or the exchange"""
+        if self.market_cache is not None and not reload:
+            entry, fresh = self.market_cache.get(self.name)
+            if entry is not None:
+                self._ex.set_markets(entry["markets"], entry["currencies"])
+                self.populate()
+                if not fresh:
+                    self._revalidation = \
+                        asyncio.ensure_future(self.revalidate())
+                return
+
+        await self._ex.load_markets(reload, *args, **kwargs)
+        self.populate()
+        self.store()
+
+    async def revalidate(self):
+        """
+        Fetch the markets from the exchange, swapping them in and refreshing
+        the cache; stale markets stay in use if the exchange fails us
+        """
+        cached = self.avail_markets
+        try:
+            markets = await self._ex.load_markets(True)
+        except EXCHANGE_ERRORS:
+            return
+
+        if markets != cached:
+            self.populate()
+        self.store()
+
+    def store(self):
+        """Write the loaded markets to the market cache, if configured"""
+        if self.market_cache is not None:
+            self.market_cache.put(self.name, self.avail_markets,
+                                  self.avail_currencies)
+
+    def populate(self):
+        """Populate the exchange object with the loaded market data"""
+        self.avail_markets = getattr(self._ex, "markets", {})
 
         self.avail_currencies = getattr(self._ex, "currencies", {})
         if not self.currencies:
@@ -81,11 +239,9 @@ class CCXTExchange:
             }
 
         self.avail_symbols = getattr(self._ex, "symbols", [])
-        currencies = self._currencies.keys()
         self.symbols = [
-            "/".join(pair)
-            for pair in product(currencies, currencies)
-            if "/".join(pair) in self.avail_symbols
+            sym for sym, market in self.avail_markets.items()
+            if {market["base"], market["quote"]} <= self._currencies.keys()
         ]
 
         self.markets = {
@@ -93,18 +249,144 @@ class CCXTExchange:
             for sym in self.symbols
         }
 
+        if self.market_index is not None:
+            self.market_index.add(self.name, self.avail_markets)
+
     async def call_over_syms(self, callname, *args, **kwargs):
         """Cycle through configured exchanges and symbols and make a call"""
+        await self.load()
+        if self.concurrent:
+            return await self.sweep_syms(callname, *args, **kwargs)
+
+        syms = self.healthy_syms()
         results = {}
-        for sym in self.markets.keys():
+        for sym in syms:
             try:
-                results[sym] = await self.call(callname, sym, *args, **kwargs)
-            except (ExchangeNotAvailable, ExchangeError):
+                results[sym] = \
+                    await self.call_sym(callname, sym, *args, **kwargs)
+            except EXCHANGE_ERRORS:
                 pass
+        return self.check_syms(callname, syms, results)
+
+    def check_syms(self, callname, syms, results):
+        """
+        Return the results of a call over symbols, raising when every
+        symbol failed so the exchange's health records the outage
+        """
+        if syms and not results:
+            raise ExchangeNotAvailable(f"Every symbol failed -- "
+                                       f"exchange: {self.name}; "
+                                       f"call: {callname}")
         return results
 
+    async def sweep_syms(self, callname, *args, **kwargs):
+        """
+        Make a call on all configured symbols concurrently, bounded by the
+        exchange's semaphore
+        """
+        async def bounded_call_sym(sym):
+            """Make the call for a single symbol"""
+            async with self.semaphore:
+                return await self.call_sym(callname, sym, *args, **kwargs)
+
+        syms = self.healthy_syms()
+        responses = await asyncio.gather(
+            *[bounded_call_sym(sym) for sym in syms], return_exceptions=True)
+
+        results = {}
+        for sym, response in zip(syms, responses):
+            if isinstance(response, EXCHANGE_ERRORS):
+                continue
+            elif isinstance(response, Exception):
+                raise response
+            results[sym] = response
+        return self.check_syms(callname, syms, results)
+
+    async def backfill_ohlcv(self, timeframe, since, until, limit):
+        """
+        Page `fetchOHLCV` windows of `limit` candles from `since` to `until`
+        (ms) for all configured symbols concurrently, bounded by the
+        exchange's semaphore and rate limiter; overlapping pages are merged
+        on candle timestamp
+        """
+        await self.load()
+        pages = range(since, until, limit * parse_timeframe(timeframe))
+
+        async def bounded_page(sym, page):
+            """Fetch a single page of candles"""
+            async with self.semaphore:
+                return await self.call_sym("fetchOHLCV", sym, timeframe,
+                                           page, limit)
+
+        jobs = [(sym, page) for sym in self.healthy_syms() for page in pages]
+        responses = await asyncio.gather(
+            *[bounded_page(sym, page) for sym, page in jobs],
+            return_exceptions=True)
+
+        merged = {}  # type: dict
+        for (sym, _), response in zip(jobs, responses):
+            if isinstance(response, EXCHANGE_ERRORS):
+                continue
+            elif isinstance(response, Exception):
+                raise response
+            candles = merged.setdefault(sym, {})
+            for candle in response:
+                if since <= candle[0] < until:
+                    candles[candle[0]] = candle
+        return {
+            sym: [candles[stamp] for stamp in sorted(candles)]
+            for sym, candles in merged.items()
+        }
+
+    def healthy_syms(self):
+        """Configured symbols whose circuit would allow a call"""
+        return [sym for sym in self.markets.keys()
+                if self.health.get(self.name, sym).available()]
+
+    async def call_sym(self, callname, sym, *args, **kwargs):
+        """Make a call for a single symbol, recording the symbol's health"""
+        health = self.health.get(self.name, sym)
+        await self.load()
+        await self.limiter.throttle(callname)
+
+        # the probe of a half-open circuit is taken right before the call
+        # whose outcome resolves it, with nothing awaited in between
+        if not health.allow():
+            raise ExchangeNotAvailable(f"Circuit open -- "
+                                       f"exchange: {self.name}; "
+                                       f"symbol: {sym}")
+        start = time.time()
+        try:
+            result = await self.request(callname, sym, *args, **kwargs)
+        except BaseException:
+            # includes cancellation, so half-open circuits never get stuck
+            health.failure()
+            raise
+        health.success(time.time() - start)
+        return result
+
+    async def call_bulk(self, callname, *args, **kwargs):
+        """
+        Make the bulk version of a call, keeping only the configured symbols
+        so the results match those of `call_over_syms`
+        """
+        await self.load()
+        results = await self.call(self.bulk_calls[callname],
+                                  list(self.markets.keys()), *args, **kwargs)
+        return {
+            sym: results[sym]
+            for sym in self.markets.keys()
+            if sym in results
+        }
+
     async def call(self, callname, *args, **kwargs):
         """Generalized async `call` method, pass callname and parameters"""
+        await self.load()
+        await self.limiter.throttle(callname)
+        return await self.request(callname, *args, **kwargs)
+
+    async def request(self, callname, *args, **kwargs):
+        """Send the call to the exchange, bypassing loading and throttling"""
         try:
             return await getattr(self._ex, callname)(*args, **kwargs)
         except TypeError:
@@ -113,23 +395,76 @@ class CCXTExchange:
 
     async def close(self):
         """Close all exchange connections"""
+        if self._revalidation is not None:
+            self._revalidation.cancel()
         await self._ex.close()
 
-    def shutdown(self):
-        """Teardown the aio loop"""
-        self.loop.run_until_complete(self.close())
-        self.loop.close()
-
 
 class CCXT:
     """CCXTExchange wrapper"""
     _ex = {}  # type: dict
 
-    def __init__(self, log, conf, context):
+    # Seconds that responses stay fresh, by callname; others aren't cached
+    cache_ttls = {
+        "fetchOHLCV": 30.0,
+        "fetchOrderBook": 0.5,
+        "fetchTicker": 1.0,
+        "fetchTickers": 1.0,
+        "fetchTrades": 1.0,
+    }
+
+    # Account-specific calls; never served from the cache
+    private_calls = {
+        "fetchBalance",
+        "fetchClosedOrders",
+        "fetchMyTrades",
+        "fetchOpenOrders",
+        "fetchOrder",
+        "fetchOrders",
+    }
+
+    def __init__(self, log, conf, context, overrides=None):
         self.log = log
         self.conf = conf
 
+        # All exchange calls run on a loop owned by the facade, waiting at
+        # most `call_timeout` seconds on each
+        self.runtime = LoopRuntime()
+        self.call_timeout = self.conf.get("call_timeout", 120.0)
+
+        # Markets listed by all exchanges, filled as they are loaded
+        self.index = MarketIndex()
+
+        # Exchanges and symbols that keep failing are skipped for a while
+        self.health = HealthTable(
+            threshold=self.conf.get("error_threshold", 0.5),
+            cooldown=self.conf.get("circuit_cooldown", 30.0))
+
+        # Identical concurrent requests share one response, which is then
+        # cached for the callname's freshness window
+        self.flights = SingleFlight()
+        self.cache = TTLCache(self.conf.get("response_cache_size", 1024))
+        self.cache_ttls = dict(self.cache_ttls,
+                               **self.conf.get("response_ttls", {}))
+
+        # Fan calls out to all exchanges at once, waiting at most `timeout`
+        # seconds on each exchange
+        self.concurrent = self.conf.get("concurrent", False)
+        self.timeout = self.conf.get("timeout", None)
+
+        # Defer loading each exchange's markets until it is first used
+        self.lazy = self.conf.get("lazy", False)
+
+        # Cache loaded markets on disk to speed up restarts
+        market_cache = None
+        if self.conf.get("cache_dir", None) is not None:
+            market_cache = MarketCache(self.conf["cache_dir"],
+                                       self.conf.get("cache_ttl", 86400))
+
+        concurrency = self.conf.get("concurrency", None)
         rate_limit = self.conf.get("rate_limit", None)
+        rate_burst = self.conf.get("rate_burst", 1)
+        rate_weights = self.conf.get("rate_weights", None)
         currencies = self.conf.get("currencies", None)
         exchanges = self.conf.get("exchanges", None)
         credentials = context.get("credentials", None)
@@ -150,7 +485,57 @@ class CCXT:
             # launch exchange
             self._ex[exch] = \
                 CCXTExchange(exch, currencies=currencies,
-                             rate_limit=rate_limit, credentials=creds)
+                             rate_limit=rate_limit, credentials=creds,
+                             concurrent=self.concurrent,
+                             concurrency=concurrency,
+                             market_cache=market_cache,
+                             rate_burst=rate_burst,
+                             rate_weights=rate_weights,
+                             market_index=self.index,
+                             loop=self.runtime.loop,
+                             health=self.health)
+
+            # plan how overridden calls will be executed on the exchange
+            if overrides is not None:
+                self._ex[exch].plan_calls(overrides)
+
+        if not self.lazy:
+            self.bootstrap()
+
+    def bootstrap(self):
+        """
+        Load the markets of all exchanges concurrently, dropping the
+        exchanges that fail to load
+        """
+        exchanges = list(self._ex.values())
+        responses = self.run(self._gather_loads(exchanges))
+
+        for ex, response in zip(exchanges, responses):
+            if isinstance(response, Exception):
+                self.log.error(f"Failed to load markets -- "
+                               f"exchange: {ex.name}; "
+                               f"error: {response}")
+                del self._ex[ex.name]
+                self.index.remove(ex.name)
+            else:
+                self.log.info(f"Loaded markets -- "
+                              f"exchange: {ex.name}; "
+                              f"seconds: {ex.load_time:.3f}")
+
+    @staticmethod
+    async def _gather_loads(exchanges):
+        """Load the markets of the exchanges concurrently"""
+        return await asyncio.gather(*[ex.load() for ex in exchanges],
+                                    return_exceptions=True)
+
+    def accounts(self):
+        """(exchange, account) of every exchange with credentials"""
+        return [(name, ex.account) for name, ex in self._ex.items()
+                if ex.account is not None]
+
+    def load_times(self):
+        """Seconds spent loading markets, by exchange; None if not loaded"""
+        return {name: ex.load_time for name, ex in self._ex.items()}
 
     def call_capable(self, exch, callname):
         """Determine if the exchange supports the call"""
@@ -161,22 +546,196 @@ class CCXT:
                       f"call: {callname}")
         return False
 
+    def own_runtime(self):
+        """
+        Make sure the runtime's loop runs in this process: bors forks a
+        process per scheduled call, and the loop's thread stays behind in
+        the parent, so each child moves the exchanges to a loop of its own
+        """
+        if self.runtime.forked:
+            self.runtime.start()
+            for ex in self._ex.values():
+                ex.rebind(self.runtime.loop)
+        return self.runtime
+
+    def run(self, coro):
+        """Run a coroutine on the runtime, blocking until it completes"""
+        return self.own_runtime().run(coro)
+
     def call_on_exchanges(self, calltype, callname, *args, **kwargs):
         """Cycle through all configured exchanges to make a call"""
+        return self.wait(self.submit(calltype, callname, *args, **kwargs),
+                         callname)
+
+    def wait(self, future, callname):
+        """
+        Return the results of a submitted call, or no results once it ran
+        longer than `call_timeout` seconds
+        """
+        try:
+            return future.result(self.call_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            self.log.error(f"Call timed out -- "
+                           f"call: {callname}; "
+                           f"seconds: {self.call_timeout}")
+            return {}
+
+    def submit(self, calltype, callname, *args, **kwargs):
+        """
+        Schedule a call on all configured exchanges without waiting on it,
+        returning a `concurrent.futures.Future` of the results
+        """
+        if self.concurrent:
+            coro = self.gather_on_exchanges(calltype, callname,
+                                            *args, **kwargs)
+        else:
+            coro = self.cycle_exchanges(calltype, callname, *args, **kwargs)
+        return self.own_runtime().submit(coro)
+
+    def healthy_exchanges(self, callname):
+        """Exchanges capable of the call whose circuit would allow it"""
+        capable = [ex for ex in list(self._ex.values())
+                   if self.call_capable(ex.name, callname)]
+        return [ex for ex in capable if self.health.get(ex.name).available()]
+
+    async def call_exchange(self, ex, calltype, callname, *args, **kwargs):
+        """
+        Make a call on an exchange; fetches are coalesced with identical
+        calls in flight, and public fetches are served from the cache while
+        fresh and the exchange's circuit is closed.  Coalesced and cached
+        callers all share one result, which they must treat as read-only.
+        """
+        if not callname.startswith("fetch"):
+            return await self.request_exchange(
+                ex, calltype, callname, *args, **kwargs)
+
+        key = (callname, ex.name, repr((args, sorted(kwargs.items()))))
+        ttl = None
+        if callname not in self.private_calls:
+            ttl = self.cache_ttls.get(callname, None)
+
+        # a recovering exchange is probed rather than answered from cache
+        health = self.health.get(ex.name)
+        if ttl is not None and health.state == health.CLOSED:
+            result = self.cache.get(key)
+            if result is not MISSING:
+                return result
+
+        result = await self.flights.do(key, self.request_exchange,
+                                       ex, calltype, callname,
+                                       *args, **kwargs)
+        if ttl is not None:
+            self.cache.put(key, result, ttl)
+        return result
+
+    async def request_exchange(self, ex, calltype, callname, *args,
+                               **kwargs):
+        """Make a call on an exchange, recording the exchange's health"""
+        health = self.health.get(ex.name)
+        if not health.allow():
+            raise ExchangeNotAvailable(f"Circuit open -- "
+                                       f"exchange: {ex.name}")
+        start = time.time()
+        try:
+            result = await asyncio.wait_for(
+                getattr(ex, ex.plan.get(callname, calltype))(
+                    callname, *args, **kwargs),
+                self.timeout)
+        except asyncio.TimeoutError:
+            self.log.warning(f"Call timed out -- "
+                             f"exchange: {ex.name}; "
+                             f"call: {callname}")
+            health.failure()
+            raise
+        except BaseException:
+            # includes cancellation, so half-open circuits never get stuck
+            health.failure()
+            raise
+        health.success(time.time() - start)
+        return result
+
+    async def cycle_exchanges(self, calltype, callname, *args, **kwargs):
+        """Make a call on each configured exchange in turn"""
         results = {}
-        for ex in self._ex.values():
-            if self.call_capable(ex.name, callname):
-                try:
-                    results[ex.name] = ex.loop.run_until_complete(
-                        getattr(ex, calltype)(callname, *args, **kwargs))
-                except (ExchangeNotAvailable, ExchangeError):
-                    pass
+        for ex in self.healthy_exchanges(callname):
+            try:
+                results[ex.name] = await self.call_exchange(
+                    ex, calltype, callname, *args, **kwargs)
+            except EXCHANGE_ERRORS as err:
+                self.dropped(ex, callname, err)
         return results
 
+    def dropped(self, ex, callname, err):
+        """Log an exchange left out of a call's results"""
+        self.log.warning(f"Exchange dropped from call -- "
+                         f"exchange: {ex.name}; "
+                         f"call: {callname}; "
+                         f"error: {err!r}")
+
+    async def gather_on_exchanges(self, calltype, callname, *args, **kwargs):
+        """
+        Make a call on all configured exchanges concurrently, returning the
+        results of the exchanges that responded within the timeout
+        """
+        exchanges = self.healthy_exchanges(callname)
+        responses = await asyncio.gather(*[
+            self.call_exchange(ex, calltype, callname, *args, **kwargs)
+            for ex in exchanges
+        ], return_exceptions=True)
+
+        results = {}
+        for ex, response in zip(exchanges, responses):
+            if isinstance(response, EXCHANGE_ERRORS):
+                self.dropped(ex, callname, response)
+                continue
+            elif isinstance(response, Exception):
+                raise response
+            results[ex.name] = response
+        return results
+
+    def backfill_ohlcv(self, timeframe, days, limit):
+        """
+        Fetch `days` of candles from all exchanges at once, returning them
+        as `fetchOHLCV` results
+        """
+        until = int(time.time() * 1000)
+        since = until - int(days * 86400 * 1000)
+        return self.wait(self.own_runtime().submit(
+            self.gather_backfills(timeframe, since, until, limit)),
+            "fetchOHLCV")
+
+    async def gather_backfills(self, timeframe, since, until, limit):
+        """Backfill candles on all capable exchanges concurrently"""
+        exchanges = self.healthy_exchanges("fetchOHLCV")
+        responses = await asyncio.gather(*[
+            ex.backfill_ohlcv(timeframe, since, until, limit)
+            for ex in exchanges
+        ], return_exceptions=True)
+
+        results = {}
+        for ex, response in zip(exchanges, responses):
+            if isinstance(response, EXCHANGE_ERRORS):
+                self.log.error(f"Failed to backfill candles -- "
+                               f"exchange: {ex.name}; "
+                               f"error: {response}")
+                continue
+            elif isinstance(response, Exception):
+                raise response
+            results[ex.name] = response
+        return results
+
+    async def close(self):
+        """Close all exchange connections"""
+        await asyncio.gather(*[ex.close() for ex in self._ex.values()],
+                             return_exceptions=True)
+
     def shutdown(self):
         """Shutdown / cleanup"""
-        for ex in self._ex.values():
-            ex.shutdown()
+        self.run(self.close())
+
+        # Only the facade's own tasks are cancelled
+        self.runtime.shutdown()
 
 
 class CCXTApi(LoggerMixin):  # pylint: disable=R0902
@@ -194,31 +753,170 @@ class CCXTApi(LoggerMixin):  # pylint: disable=R0902
         "fetchTrades": "call_over_syms",
     }
 
+    # Calls listing orders, applied to the balance ledgers
+    order_lists = ("fetchOrders", "fetchOpenOrders", "fetchClosedOrders")
+
+    ledgers = None
+
     def __init__(self, context):
         """Launched by Api when we're ready to connect"""
+        self.context = context
+        self.conf = context.get("conf")
+
         self.request_schema = RequestSchema
         self.result_schema = CCXTResponseSchema
 
-        self.context = context
-        self.conf = context.get("conf")
+        # Opt-in decoders replacing the marshmallow schemas of some calls
+        decoders = {}
+        if self.conf.get("records", False):
+            decoders.update(record_decoders(self.conf.get("keep_info", False)))
+        if self.conf.get("array_books", False):
+            decoders["fetchOrderBook"] = decode_order_books
+        if self.conf.get("array_candles", False):
+            decoders["fetchOHLCV"] = decode_ohlcv
+        if decoders:
+            self.result_schema = type("CCXTDecodingResponseSchema",
+                                      (CCXTResponseSchema,),
+                                      {"decoders": decoders})
 
         self.create_logger()
         self.log.debug(f"Starting API Facade {self.name}")
 
-        self.ccxt = CCXT(self.log, self.conf, self.context)
+        self.ccxt = CCXT(self.log, self.conf, self.context,
+                         self.local_overrides)
+
+        # Follow balances locally from our orders and fills, only calling
+        # fetchBalance to reconcile them
+        if self.conf.get("balance_ledger", False):
+            self.ledgers = Ledgers(self.conf.get("reconcile_interval", 300.0),
+                                   self.conf.get("drift_tolerance", 1e-8))
+        self.ledger_lock = threading.Lock()  # submitted calls record too
+        self.recorders = {
+            "fetchBalance": self.record_balance,
+            "fetchMyTrades": self.record_fills,
+            "createOrder": self.record_order,
+            "fetchOrder": self.record_order,
+            "cancelOrder": self.record_cancel,
+        }
+        self.recorders.update(dict.fromkeys(self.order_lists,
+                                            self.record_orders))
+
+        # Share the market index and exchange health with strategies
+        self.context["shared"]["market_index"] = self.ccxt.index
+        self.context["shared"]["health"] = self.ccxt.health
+        self.context["shared"]["balances"] = self.ledgers
+
+        # Send days of candle history down the pipeline before polling
+        if self.conf.get("backfill_days", None):
+            self.backfill(self.conf["backfill_days"])
+
+    def backfill(self, days, timeframe=None, limit=None):
+        """
+        Fetch `days` of `fetchOHLCV` history in concurrent pages and pass
+        it down the pipeline as a `fetchOHLCV` result
+        """
+        timeframe = timeframe or self.conf.get("backfill_timeframe", "1m")
+        limit = limit or self.conf.get("backfill_limit", 500)
+        self.log.info(f"Backfilling candles -- "
+                      f"days: {days}; timeframe: {timeframe}")
+        result = self.ccxt.backfill_ohlcv(timeframe, days, limit)
+
+        schema = self.result_schema()
+        schema.context["callname"] = "fetchOHLCV"
+        self.context["callback"](schema.load(result), self.context)
 
     def call(self, callname, *args, **kwargs):
         """Substitute for REST api as defined in bors.api.requestor.Req"""
-        return self.ccxt.call_on_exchanges(
+        if callname == "fetchBalance" and self.ledgers is not None:
+            accounts = self.ccxt.accounts()
+            with self.ledger_lock:
+                if accounts and not self.ledgers.stale(accounts):
+                    return {exch: self.ledgers.get(exch, account).balance()
+                            for exch, account in accounts}
+
+        results = self.ccxt.call_on_exchanges(
+            self.local_overrides.get(callname, "call"),
+            callname, *args, **kwargs)
+        if self.ledgers is not None:
+            self.record(callname, results, *args)
+        return results
+
+    def record(self, callname, results, *args):
+        """Apply balances, orders and fills from results to the ledgers"""
+        apply = self.recorders.get(callname, None)
+        if apply is None:
+            return
+        accounts = dict(self.ccxt.accounts())
+        with self.ledger_lock:
+            for exch, result in results.items():
+                if exch not in accounts:
+                    continue
+                drift = apply(self.ledgers.get(exch, accounts[exch]),
+                              result, *args)
+                if drift:
+                    self.log.warning(f"Balances drifted -- "
+                                     f"exchange: {exch}; "
+                                     f"drift: {drift}")
+
+    @staticmethod
+    def record_balance(ledger, balance, *_):
+        """Reconcile a ledger with a fetched balance, returning the drift"""
+        return ledger.reconcile(balance)
+
+    @staticmethod
+    def record_fills(ledger, trades, *_):
+        """Apply our fetched trades to a ledger"""
+        for trade in trades:
+            ledger.fill(trade)
+
+    @staticmethod
+    def record_orders(ledger, orders, *_):
+        """Apply listed orders to a ledger"""
+        for order in orders:
+            ledger.order(order)
+
+    @staticmethod
+    def record_order(ledger, order, *_):
+        """Apply a placed or fetched order to a ledger"""
+        ledger.order(order)
+
+    @staticmethod
+    def record_cancel(ledger, _result, order_id, *_):
+        """Close a canceled order on a ledger"""
+        ledger.order({"id": order_id, "status": "canceled"})
+
+    def submit(self, callname, *args, **kwargs):
+        """
+        Asynchronous counterpart of `call`; returns a future of the results
+        so that several calls may be in flight at once
+        """
+        future = self.ccxt.submit(
             self.local_overrides.get(callname, "call"),
             callname, *args, **kwargs)
+        if self.ledgers is None:
+            return future
+
+        # resolved once the results are applied to the ledgers
+        recorded = concurrent.futures.Future()
+        future.add_done_callback(
+            lambda done: self.record_future(callname, done, recorded, *args))
+        return recorded
+
+    def record_future(self, callname, done, recorded, *args):
+        """Record the results of a submitted call, then pass them on"""
+        if not recorded.set_running_or_notify_cancel():
+            return
+        if done.cancelled():
+            recorded.set_exception(concurrent.futures.CancelledError())
+        elif done.exception() is not None:
+            recorded.set_exception(done.exception())
+        else:
+            try:
+                self.record(callname, done.result(), *args)
+            finally:
+                recorded.set_result(done.result())
 
     def shutdown(self):
         """Perform last-minute stuff"""
         self.log.info(f"Shutting down API interface instance for {self.name}")
-
-        # Take care of any currently running tasks in open loops
-        for task in asyncio.Task.all_tasks():
-            task.cancel()
-
         self.ccxt.shutdown()
@@ -1,14 +1,21 @@
 """Coinigy API Facade"""
 
+import threading
+import time
+
 from marshmallow import fields, pre_load
+from requests.adapters import HTTPAdapter
 
 from bors.app.log import LoggerMixin
 from bors.api.requestor import Req
 from bors.api.websock import SockMixin
-from bors.generics.coinigy import NotificationSchema
 
+from nombot.api.coinigy_response import RESPONSE_MAP
+from nombot.common.response_cache import ThreadedSingleFlight
+from nombot.generics.coinigy import NotificationSchema
 from nombot.generics.request import RequestSchema
-from nombot.generics.response import WSResponseSchema, ResponseSchema
+from nombot.generics.response import ParserRegistry, ResponseSchema
+from nombot.generics.response import WSResponseSchema
 
 
 class CoinigyResponseSchema(ResponseSchema):
@@ -37,11 +44,49 @@ class CoinigyResponseSchema(ResponseSchema):
 
 class CoinigyWSResponseSchema(WSResponseSchema):
     """Schema defining the message type from a websocket"""
+    parsers = ParserRegistry(RESPONSE_MAP)
+
     def get_result(self, data):
         """Return the actual result data"""
         return data
 
 
+# Parts of an "all" market data response each data type is made of
+DATA_PARTS = {
+    "history": ("history",),
+    "asks": ("asks",),
+    "bids": ("bids",),
+    "orders": ("asks", "bids"),
+    "all": ("history", "asks", "bids"),
+}
+
+
+def split_data(response, data_type):
+    """
+    Return the response of a market data request of a type from that of
+    an "all" request, sharing its lists
+    """
+    if not isinstance(response, dict) or \
+            not isinstance(response.get("data"), dict):
+        return response
+    parts = DATA_PARTS.get(data_type, DATA_PARTS["all"])
+    data = {key: value for key, value in response["data"].items()
+            if key not in DATA_PARTS["all"] or key in parts}
+    data["type"] = data_type
+    return dict(response, data=data)
+
+
+def merge_types(types):
+    """Return the narrowest market data type covering all of the types"""
+    if len(types) == 1:
+        return next(iter(types))
+    parts = set().union(*(DATA_PARTS.get(data_type, DATA_PARTS["all"])
+                          for data_type in types))
+    return min((data_type for data_type, covered in DATA_PARTS.items()
+                if parts <= set(covered)),
+               key=lambda data_type: len(DATA_PARTS[data_type]))
+
+
 class Coinigy(LoggerMixin, SockMixin):  # pylint: disable=R0902
     """
         This class implements coinigy's REST api as documented in the
@@ -66,6 +111,11 @@ class Coinigy(LoggerMixin, SockMixin):  # pylint: disable=R0902
 
         self.context = context
 
+        # Resolve the parsers of the configured channels before they publish
+        subscriptions = self.context["conf"].get("subscriptions", {})
+        for res_type in subscriptions.values():
+            self.ws_result_schema.parsers.resolve(res_type)
+
         # Websocket credentials object
         self.creds = self.context.get("credentials")
 
@@ -83,10 +133,91 @@ class Coinigy(LoggerMixin, SockMixin):  # pylint: disable=R0902
                        payload,
                        self.log)
 
+        # Keep-alive connections for as many requests as may be in flight
+        self.in_flight = self.context["conf"].get("concurrency", 4)
+        self.req.session.mount(self.req.url_base, HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.in_flight))
+        self.slots = threading.BoundedSemaphore(self.in_flight)
+        self.flights = ThreadedSingleFlight()
+        self.merge_window = self.context["conf"].get("merge_window", 0.0)
+        self.batches = {}  # type: dict
+        self.batch_lock = threading.Lock()
+
         self.subscribed_chans = None
 
-        # We don't need to deal directly with requests, so we pass them through
-        self.call = self.req.call
+    def request(self, callname, data=None, **args):
+        """Make a REST call once one of the in-flight slots is free"""
+        with self.slots:
+            return self.req.call(callname, data, **args)
+
+    def call(self, callname, data=None, **args):
+        """
+        Make a REST call; market data requests for the same exchange and
+        market are shared between threads, each cut out of the shared
+        response.  Coalescing is per process: under bors, which forks a
+        process per scheduled call, only requests made from threads of one
+        call share a response.
+        """
+        if callname != "data":
+            return self.request(callname, data, **args)
+
+        payload = dict(data or {}, **args)
+        data_type = payload.get("type", "all")
+        market = (payload.get("exchange_code"),
+                  payload.get("exchange_market"))
+        if self.merge_window:
+            response = self.merged(market, data_type, payload)
+        else:
+            response = self.shared(market, data_type, payload)
+        return split_data(response, data_type)
+
+    def shared(self, market, data_type, payload):
+        """
+        Request market data of a type, joining a request in flight for the
+        market whose type covers it (bids are part of orders, everything
+        of all)
+        """
+        parts = set(DATA_PARTS.get(data_type, ()))
+        keys = [market + (data_type,)] + [
+            market + (other,) for other, covered in DATA_PARTS.items()
+            if other != data_type and parts and parts <= set(covered)]
+        return self.flights.do_any(keys, self.request, "data",
+                                   dict(payload, type=data_type))
+
+    def merged(self, market, data_type, payload):
+        """
+        Request market data, first gathering for `merge_window` seconds
+        the types other threads request for the market, so that they are
+        all made as one request of a type covering them (asks and bids as
+        orders, history and bids as all)
+        """
+        with self.batch_lock:
+            batch = self.batches.get(market, None)
+            leader = batch is None
+            if leader:
+                # [types, done, response, error]
+                batch = self.batches[market] = [
+                    {data_type}, threading.Event(), None, None]
+            else:
+                batch[0].add(data_type)
+
+        if not leader:
+            batch[1].wait()
+            if batch[3] is not None:
+                raise batch[3]
+            return batch[2]
+
+        time.sleep(self.merge_window)
+        with self.batch_lock:
+            del self.batches[market]
+        try:
+            batch[2] = self.shared(market, merge_types(batch[0]), payload)
+        except Exception as err:
+            batch[3] = err
+            raise
+        finally:
+            batch[1].set()
+        return batch[2]
 
     def shutdown(self):
         """Perform last-minute stuff"""
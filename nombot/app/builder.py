@@ -3,6 +3,7 @@ Build the context and pipeline; manage the API
 """
 from bors.app.builder import AppBuilder
 
+from nombot.common.ingest import Ingestor, unwrap
 from nombot.generics.context import NomApiContextSchema
 from nombot.generics.context import NomStrategyContextSchema
 
@@ -11,6 +12,7 @@ class NomAppBuilder(AppBuilder):
     """Class that assembles and runs the application"""
     api_context_schema = NomApiContextSchema
     strategy_context_schema = NomStrategyContextSchema
+    ingestors = None  # type: dict
 
     def create_api_context(self, cls):
         """Create and return an API context"""
@@ -26,3 +28,43 @@ class NomAppBuilder(AppBuilder):
             "inst": [],
             "callback": self.receive,
         })
+
+    def ingestor(self, api_context):
+        """
+        Return the websocket ingestor of an API, or None when its
+        configuration sets no `ingest_size`; its queue is shared with
+        strategies as `shared["ingest"]`, for its metrics
+        """
+        if self.ingestors is None:
+            self.ingestors = {}
+        name = api_context["name"]
+        if name not in self.ingestors:
+            conf = api_context.get("conf") or {}
+            size = conf.get("ingest_size", None)
+            self.ingestors[name] = None if not size else Ingestor(
+                super().receive, size, conf.get("ingest_batch", None),
+                self.log, conf.get("ingest_log_interval", 60.0))
+            if size:
+                api_context["shared"]["ingest"] = self.ingestors[name].queue
+        return self.ingestors[name]
+
+    def receive(self, data, api_context):
+        """
+        Pass an API result down the pipeline, through the API's ingestor
+        when it is a websocket result and the API has one
+        """
+        result = unwrap(data)
+        channel = result.get("channel") if isinstance(result, dict) \
+            else None
+        ingestor = None if channel is None else self.ingestor(api_context)
+        if ingestor is None:
+            return super().receive(data, api_context)
+        return ingestor.put(channel, result.get("response_type"), data,
+                            api_context)
+
+    def shutdown(self, signum, frame):
+        """Stop the ingestors, then shut it down"""
+        for ingestor in (self.ingestors or {}).values():
+            if ingestor is not None:
+                ingestor.stop()
+        super().shutdown(signum, frame)
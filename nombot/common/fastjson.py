@@ -0,0 +1,20 @@
+"""
+JSON decoding through the fastest backend installed
+
+orjson is used when it can be imported, the standard library otherwise;
+`BACKEND` names the one in use.
+"""
+
+try:
+    from orjson import loads  # pylint: disable=no-name-in-module
+    BACKEND = "orjson"
+except ImportError:
+    from json import loads
+    BACKEND = "json"
+
+
+def decode(payload):
+    """Decode a payload still in JSON text; pass decoded ones through"""
+    if isinstance(payload, (str, bytes, bytearray, memoryview)):
+        return loads(payload)
+    return payload
@@ -0,0 +1,115 @@
+"""Health tracking and circuit breaking for exchanges and symbols"""
+
+import time
+from collections import deque
+
+
+class Health:
+    """
+    Rolling error rate and latency EWMA of a target, with a circuit breaker:
+    closed circuits allow calls; a circuit opens when the error rate crosses
+    the threshold and, after a cooldown, goes half-open to allow one probe,
+    which closes the circuit on success or opens it again on failure
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, window=20, threshold=0.5, cooldown=30.0, alpha=0.2):
+        self.outcomes = deque(maxlen=window)  # type: deque  # True on error
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.alpha = alpha
+
+        self.state = self.CLOSED
+        self.opened = None  # when the circuit last opened
+        self.latency = None  # EWMA of successful call latency, seconds
+        self.last_success = None  # when the last call succeeded
+
+    @property
+    def error_rate(self):
+        """Share of errors among the calls in the window"""
+        if not self.outcomes:
+            return 0.0
+        return sum(self.outcomes) / len(self.outcomes)
+
+    def available(self):
+        """Whether a call would be allowed, without taking the probe"""
+        if self.state == self.CLOSED:
+            return True
+        # half-open circuits allow only the one probe in flight
+        return self.state == self.OPEN and self.cooled()
+
+    def cooled(self):
+        """Whether an open circuit has waited out its cooldown"""
+        return time.time() - self.opened >= self.cooldown
+
+    def allow(self):
+        """
+        Whether a call may be made; moves open circuits to half-open, so
+        the caller must record the outcome of the probe it was allowed
+        """
+        if self.state == self.OPEN and self.cooled():
+            self.state = self.HALF_OPEN
+            return True
+        return self.state == self.CLOSED
+
+    def success(self, latency):
+        """Record a successful call and its latency in seconds"""
+        self.outcomes.append(False)
+        self.last_success = time.time()
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.alpha * (latency - self.latency)
+
+        if self.state == self.HALF_OPEN:
+            self.state = self.CLOSED
+            self.outcomes.clear()
+
+    def failure(self):
+        """Record a failed call"""
+        self.outcomes.append(True)
+        full = len(self.outcomes) == self.outcomes.maxlen
+        if self.state == self.HALF_OPEN or (
+                full and self.error_rate >= self.threshold):
+            self.state = self.OPEN
+            self.opened = time.time()
+
+    def dump(self):
+        """Dump the health as a dict"""
+        return {
+            "state": self.state,
+            "error_rate": self.error_rate,
+            "latency": self.latency,
+            "last_success": self.last_success,
+        }
+
+
+class HealthTable:
+    """Health of each exchange, and of each symbol on an exchange"""
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs  # passed to each new Health
+        self.exchanges = {}  # type: dict
+        self.symbols = {}  # type: dict
+
+    def get(self, exchange, symbol=None):
+        """Health of an exchange or, given a symbol, of a symbol on it"""
+        if symbol is None:
+            table, key = self.exchanges, exchange
+        else:
+            table, key = self.symbols, (exchange, symbol)
+        if key not in table:
+            table[key] = Health(**self.kwargs)
+        return table[key]
+
+    def dump(self):
+        """Dump the table as {exchange: {..., "symbols": {symbol: {...}}}}"""
+        table = {
+            exchange: dict(health.dump(), symbols={})
+            for exchange, health in self.exchanges.items()
+        }
+        for (exchange, symbol), health in self.symbols.items():
+            table.setdefault(exchange, {"symbols": {}})["symbols"][symbol] = \
+                health.dump()
+        return table
@@ -0,0 +1,214 @@
+"""
+Bounded ingestion of websocket results, ahead of the strategy pipeline
+
+Results are queued per channel and conflated while they wait: a channel
+holding whole states (an order channel's book) keeps only its latest
+result, while a channel of events (a trade channel) gathers its results
+into one batch.  Consumers drain the queue in batches, so the pipeline
+runs once per channel and drain rather than once per message.  When more
+than `maxsize` results are pending, the oldest channel's entry is dropped.
+"""
+
+from collections import OrderedDict
+import copy
+import logging
+import threading
+import time
+
+
+LATEST = "latest"
+APPEND = "append"
+
+# How results are conflated, by response type
+CONFLATION = {
+    "orders": LATEST,
+    "trade": APPEND,
+}
+
+
+def unwrap(loaded):
+    """
+    Return the result object of a schema load, unwrapping the
+    UnmarshalResult of marshmallow 2
+    """
+    if isinstance(loaded, dict):  # DotObj results raise KeyError on getattr
+        return loaded
+    return getattr(loaded, "data", loaded)
+
+
+def merge_results(results):
+    """
+    Merge the websocket results of one channel, oldest first, into one
+    result carrying the list of their data
+    """
+    last = results[-1]
+    inner = unwrap(last)
+    merged = copy.copy(inner)
+    merged.result = [unwrap(res).get("result") for res in results]
+    if inner is not last:
+        return last._replace(data=merged)
+    return merged
+
+
+class IngestQueue:
+    """A bounded, thread-safe queue conflating results per channel"""
+    def __init__(self, maxsize=1000, conflation=None):
+        self.maxsize = maxsize
+        self.conflation = CONFLATION if conflation is None else conflation
+        self.entries = OrderedDict()  # type: OrderedDict
+        self.depth = 0  # results pending
+        self.closed = False
+        self.stats = {
+            "received": 0,  # results put
+            "conflated": 0,  # results replaced by a newer one
+            "batched": 0,  # results joined to a pending batch
+            "dropped": 0,  # results dropped on overflow
+            "drained": 0,  # results handed to consumers
+            "drains": 0,  # batches handed to consumers
+            "high_water": 0,  # most results pending at once
+        }
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def put(self, channel, response_type, result, extra=None):
+        """
+        Queue a result of a channel, conflating it with the pending one
+        according to its response type
+        """
+        mode = self.conflation.get(response_type, None)
+        with self._cond:
+            self.stats["received"] += 1
+            entry = self.entries.get(channel, None) \
+                if mode is not None else None
+            if entry is None:
+                if mode is None:
+                    # unconflated results each take their own entry
+                    self._seq += 1
+                    key = (channel, self._seq)
+                else:
+                    key = channel
+                self.entries[key] = [channel, response_type, mode,
+                                     [result], extra, time.time()]
+                self.depth += 1
+                self._shed()
+            elif mode == LATEST:
+                entry[3][0] = result
+                entry[4] = extra
+                self.stats["conflated"] += 1
+            else:
+                entry[3].append(result)
+                entry[4] = extra
+                self.depth += 1
+                self.stats["batched"] += 1
+                self._shed()
+            self.stats["high_water"] = max(self.stats["high_water"],
+                                           self.depth)
+            self._cond.notify()
+
+    def _shed(self):
+        """Drop the oldest entries while more than `maxsize` are pending"""
+        while self.depth > self.maxsize and len(self.entries) > 1:
+            _, entry = self.entries.popitem(last=False)
+            self.depth -= len(entry[3])
+            self.stats["dropped"] += len(entry[3])
+        if self.depth > self.maxsize:
+            # a single batch has outgrown the queue: keep its newest
+            results = next(iter(self.entries.values()))[3]
+            excess = self.depth - self.maxsize
+            del results[:excess]
+            self.depth -= excess
+            self.stats["dropped"] += excess
+
+    def drain(self, max_entries=None, timeout=None):
+        """
+        Return up to `max_entries` pending entries, oldest first, as
+        (channel, response_type, result, extra) tuples; batched results
+        are merged into one.  Waits up to `timeout` seconds (forever when
+        None) for an entry, returning an empty list if none came.
+        """
+        with self._cond:
+            if not self.entries and not self.closed:
+                self._cond.wait(timeout)
+            count = len(self.entries) if max_entries is None \
+                else min(max_entries, len(self.entries))
+            taken = [self.entries.popitem(last=False)[1]
+                     for _ in range(count)]
+            drained = sum(len(entry[3]) for entry in taken)
+            self.depth -= drained
+            self.stats["drained"] += drained
+            if taken:
+                self.stats["drains"] += 1
+
+        return [(channel, res_type, results[0] if mode != APPEND else
+                 merge_results(results), extra)
+                for channel, res_type, mode, results, extra, _ in taken]
+
+    def close(self):
+        """Wake any waiting consumer; the queue accepts no more waits"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def metrics(self):
+        """Return the counters, with the current depth and lag"""
+        with self._cond:
+            oldest = next(iter(self.entries.values()), None)
+            metrics = dict(self.stats)
+            metrics.update({
+                "depth": self.depth,
+                "channels": len(self.entries),
+                "lag": 0.0 if oldest is None else time.time() - oldest[5],
+            })
+        return metrics
+
+
+class Ingestor:
+    """
+    Feed a queue's drained results to a consumer from a daemon thread,
+    started on the first result put so it lives in the putting process;
+    given a logger, the queue's metrics are logged every `log_interval`
+    seconds.  A consumer raising is logged and the thread keeps draining.
+    """
+    def __init__(self, consume, maxsize=1000, batch_size=None, log=None,
+                 log_interval=60.0):
+        self.consume = consume
+        self.queue = IngestQueue(maxsize)
+        self.batch_size = batch_size
+        self.log = log
+        self.log_interval = log_interval
+        self.thread = None
+        self._lock = threading.Lock()
+
+    def put(self, channel, response_type, result, extra=None):
+        """Queue a result, starting the consuming thread when needed"""
+        if self.thread is None:
+            with self._lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run,
+                                                   daemon=True)
+                    self.thread.start()
+        self.queue.put(channel, response_type, result, extra)
+
+    def _run(self):
+        """Drain the queue until it is closed"""
+        timeout = None if self.log is None else self.log_interval
+        logged = time.time()
+        while not self.queue.closed:
+            drained = self.queue.drain(self.batch_size, timeout)
+            for channel, _, result, extra in drained:
+                try:
+                    self.consume(result, extra)
+                except Exception:  # pylint: disable=broad-except
+                    log = self.log or logging.getLogger(__name__)
+                    log.exception(f"Ingest consumer failed -- "
+                                  f"channel: {channel}")
+            if timeout is not None and time.time() - logged >= timeout:
+                logged = time.time()
+                self.log.info(f"Ingest metrics -- {self.queue.metrics()}")
+
+    def stop(self):
+        """Stop consuming"""
+        self.queue.close()
@@ -0,0 +1,194 @@
+"""
+Local balance ledgers, kept per exchange and account
+
+A ledger is seeded from a `fetchBalance` result, then follows our own
+orders and fills: placing an order moves funds from free to used, fills
+move totals between the base and quote currencies (less fees), and closing
+an order releases what it still held.  It asks for a full reconcile once
+its seed is older than the reconcile interval, or as soon as it notices a
+drift: a negative balance, or an order filled further than the fills seen.
+A ledger only follows the orders and fills of the process it was seeded in,
+so it is stale anywhere else, such as in the processes bors forks per call,
+and stays stale until that process applies an order or fill of its own:
+without one, nothing shows the seeding process is the one trading.
+"""
+
+import os
+import time
+
+
+def split_symbol(symbol):
+    """Return the (base, quote) currencies of a 'BASE/QUOTE' symbol"""
+    base, _, quote = symbol.partition("/")
+    return base, quote
+
+
+class Ledger:
+    """The balances of one account on one exchange"""
+    def __init__(self, tolerance=1e-8):
+        self.tolerance = tolerance
+        self.total = {}  # type: dict
+        self.used = {}  # type: dict
+        self.orders = {}  # type: dict  # id -> [currency, held, per unit]
+        self.filled = {}  # type: dict  # order id -> amount filled
+        self.fills = set()  # type: set
+        self.seeded = None  # time of the last seed
+        self.pid = None  # process the ledger was seeded in
+        self.events = 0  # orders and fills applied since the seed
+        self.drifted = False
+
+    def free(self, currency):
+        """Return the free balance of a currency"""
+        return self.total.get(currency, 0.0) - self.used.get(currency, 0.0)
+
+    def _add(self, book, currency, amount):
+        """Add an amount to a currency of `total` or `used`"""
+        book[currency] = book.get(currency, 0.0) + amount
+        if min(book[currency], self.free(currency)) < -self.tolerance:
+            self.drifted = True
+
+    def seed(self, balance, now=None):
+        """Replace the balances with those of a `fetchBalance` result"""
+        self.total = {cur: amount for cur, amount in
+                      (balance.get("total") or {}).items()
+                      if amount is not None}
+        self.used = {cur: amount for cur, amount in
+                     (balance.get("used") or {}).items()
+                     if amount is not None}
+        self.seeded = time.time() if now is None else now
+        self.pid = os.getpid()
+        self.events = 0
+        self.drifted = False
+
+    def reconcile(self, balance, now=None):
+        """
+        Reseed from a `fetchBalance` result, returning how far each
+        currency's total had drifted from it
+        """
+        drift = {}
+        for cur, amount in (balance.get("total") or {}).items():
+            diff = (amount or 0.0) - self.total.get(cur, 0.0)
+            if abs(diff) > self.tolerance:
+                drift[cur] = diff
+        self.seed(balance, now)
+        return drift
+
+    def stale(self, interval, now=None):
+        """Whether the ledger must be reconciled with the exchange"""
+        if self.seeded is None or self.drifted or not self.events or \
+                self.pid != os.getpid():
+            return True
+        now = time.time() if now is None else now
+        return now - self.seeded >= interval
+
+    def order(self, order):
+        """Apply an order event: a placement, an update or its closing"""
+        order_id = order["id"]
+        self.events += 1
+        if order.get("status") in ("closed", "canceled", "expired"):
+            self._check_filled(order_id, order.get("filled"))
+            held = self.orders.pop(order_id, None)
+            self.filled.pop(order_id, None)
+            if held is not None:
+                self._add(self.used, held[0], -held[1])
+            return
+
+        if order_id not in self.orders:
+            base, quote = split_symbol(order["symbol"])
+            remaining = order.get("remaining")
+            if remaining is None:
+                remaining = order.get("amount") or 0.0
+            if order.get("side") == "buy":
+                if order.get("price") is None:
+                    return  # market buys hold nothing we can price
+                held = [quote, remaining * order["price"], order["price"]]
+            else:
+                held = [base, remaining, 1.0]
+            self.orders[order_id] = held
+            self.filled.setdefault(order_id, order.get("filled") or 0.0)
+            if not self._settled(order):
+                self._add(self.used, held[0], held[1])
+        else:
+            self._check_filled(order_id, order.get("filled"))
+
+    def _check_filled(self, order_id, filled):
+        """Flag a drift when an order filled further than fills we saw"""
+        seen = self.filled.get(order_id, None)
+        if seen is not None and filled is not None and \
+                filled - seen > self.tolerance:
+            self.drifted = True
+
+    def _settled(self, event):
+        """Whether an event predates, so is part of, the seeded balances"""
+        return self.seeded is not None and \
+            event.get("timestamp") is not None and \
+            event["timestamp"] / 1000 <= self.seeded
+
+    def fill(self, trade):
+        """Apply one of our fills, once; return whether it was applied"""
+        if trade["id"] in self.fills:
+            return False
+        self.fills.add(trade["id"])
+        self.events += 1
+
+        amount = trade["amount"]
+        settled = self._settled(trade)
+        order_id = trade.get("order")
+        held = self.orders.get(order_id, None)
+        if held is not None:
+            release = min(held[1], amount * held[2])
+            held[1] -= release
+            if not settled:
+                self._add(self.used, held[0], -release)
+        if order_id in self.filled:
+            self.filled[order_id] += amount
+        if settled:
+            return False
+
+        base, quote = split_symbol(trade["symbol"])
+        cost = trade.get("cost")
+        if cost is None:
+            cost = amount * trade["price"]
+        sign = 1 if trade["side"] == "buy" else -1
+        self._add(self.total, base, sign * amount)
+        self._add(self.total, quote, -sign * cost)
+
+        fee = trade.get("fee") or {}
+        if fee.get("cost"):
+            self._add(self.total, fee["currency"], -fee["cost"])
+        return True
+
+    def balance(self):
+        """Dump the balances as `fetchBalance` returns them"""
+        currencies = set(self.total) | set(self.used)
+        result = {"info": [], "free": {}, "used": {}, "total": {}}
+        for cur in currencies:
+            entry = {
+                "free": self.free(cur),
+                "used": self.used.get(cur, 0.0),
+                "total": self.total.get(cur, 0.0),
+            }
+            result[cur] = entry
+            for key, amount in entry.items():
+                result[key][cur] = amount
+        return result
+
+
+class Ledgers:
+    """Balance ledgers keyed by exchange and account"""
+    def __init__(self, interval=300.0, tolerance=1e-8):
+        self.interval = interval
+        self.tolerance = tolerance
+        self.ledgers = {}  # type: dict
+
+    def get(self, exchange, account=None):
+        """Return the ledger of an account, creating it when new"""
+        key = (exchange, account)
+        ledger = self.ledgers.get(key, None)
+        if ledger is None:
+            ledger = self.ledgers[key] = Ledger(self.tolerance)
+        return ledger
+
+    def stale(self, keys, now=None):
+        """Whether any of the (exchange, account) ledgers is stale"""
+        return any(self.get(*key).stale(self.interval, now) for key in keys)
@@ -0,0 +1,43 @@
+"""On-disk cache of exchange market metadata"""
+
+import json
+import os
+import time
+
+
+class MarketCache:
+    """Stores the loaded markets of each exchange in its own JSON file"""
+    def __init__(self, path, ttl=86400):
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+
+    def _filename(self, name):
+        """Path to the cache file of an exchange"""
+        return os.path.join(self.path, f"{name}.json")
+
+    def get(self, name):
+        """
+        Return a tuple of the cached entry of an exchange and whether it is
+        still within the TTL; the entry is None on a cache miss
+        """
+        try:
+            with open(self._filename(name)) as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return None, False
+        return entry, time.time() - entry.get("timestamp", 0) < self.ttl
+
+    def put(self, name, markets, currencies):
+        """Store the markets and currencies of an exchange"""
+        os.makedirs(self.path, exist_ok=True)
+        entry = {
+            "timestamp": time.time(),
+            "markets": markets,
+            "currencies": currencies,
+        }
+
+        # write, then move, so readers never see a partial file
+        filename = self._filename(name)
+        with open(f"{filename}.tmp", "w") as cache_file:
+            json.dump(entry, cache_file, default=str)
+        os.replace(f"{filename}.tmp", filename)
@@ -0,0 +1,59 @@
+"""Hashed index of the markets listed across exchanges"""
+
+
+class MarketIndex:
+    """Look up markets by symbol, base currency, quote currency or exchange"""
+    def __init__(self):
+        self.by_exchange = {}  # type: dict  # exchange -> {symbol: market}
+        self.by_symbol = {}  # type: dict  # symbol -> {exchange}
+        self.by_base = {}  # type: dict  # base -> {symbol}
+        self.by_quote = {}  # type: dict  # quote -> {symbol}
+
+    def add(self, exchange, markets):
+        """Index the markets of an exchange, replacing any indexed before"""
+        self.remove(exchange)
+        self.by_exchange[exchange] = markets
+        for sym, market in markets.items():
+            self.by_symbol.setdefault(sym, set()).add(exchange)
+            self.by_base.setdefault(market["base"], set()).add(sym)
+            self.by_quote.setdefault(market["quote"], set()).add(sym)
+
+    def remove(self, exchange):
+        """Drop the markets of an exchange from the index"""
+        for sym, market in self.by_exchange.pop(exchange, {}).items():
+            exchanges = self.by_symbol[sym]
+            exchanges.discard(exchange)
+            if exchanges:
+                continue
+
+            # no exchange lists the symbol anymore
+            del self.by_symbol[sym]
+            for index, curr in [(self.by_base, market["base"]),
+                                (self.by_quote, market["quote"])]:
+                index[curr].discard(sym)
+                if not index[curr]:
+                    del index[curr]
+
+    def market(self, exchange, symbol):
+        """The market of a symbol on an exchange, if listed"""
+        return self.by_exchange.get(exchange, {}).get(symbol, None)
+
+    def exchanges(self, base, quote):
+        """Exchanges listing the base/quote pair"""
+        return self.by_symbol.get(f"{base}/{quote}", set())
+
+    def symbols(self, base=None, quote=None, exchange=None):
+        """Symbols matching all of the given base, quote and exchange"""
+        matches = []
+        if base is not None:
+            matches.append(self.by_base.get(base, set()))
+        if quote is not None:
+            matches.append(self.by_quote.get(quote, set()))
+        if exchange is not None:
+            matches.append(self.by_exchange.get(exchange, {}).keys())
+        if not matches:
+            return set(self.by_symbol)
+
+        # intersect starting from the smallest set
+        matches.sort(key=len)
+        return set(matches[0]).intersection(*matches[1:])
@@ -0,0 +1,173 @@
+"""
+Incremental L2 order books, kept per exchange and market
+
+Each side of a book holds its price levels in a sorted dict (price ->
+amount) ordered from best to worst, so level updates take logarithmic time,
+the best level is always the first item, and depth queries are slices.
+"""
+
+from sortedcontainers import SortedDict
+
+
+def _negate(price):
+    """Sort key of bid prices, best (highest) first"""
+    return -price
+
+
+class BookSide:
+    """One side of an order book: price levels sorted best first"""
+    def __init__(self, descending):
+        self.descending = descending
+        self.levels = SortedDict(_negate) if descending else SortedDict()
+
+    def __len__(self):
+        return len(self.levels)
+
+    def __contains__(self, price):
+        return price in self.levels
+
+    def clear(self):
+        """Remove every level"""
+        self.levels.clear()
+
+    def load(self, levels):
+        """Replace every level from an iterable of [price, amount, ...]"""
+        self.clear()
+        for level in levels:
+            price, amount = float(level[0]), float(level[1])
+            if amount > 0:
+                self.levels[price] = amount
+
+    def update(self, price, amount):
+        """Set the amount at a price level, removing it when zero"""
+        price, amount = float(price), float(amount)
+        if amount > 0:
+            self.levels[price] = amount
+        else:
+            self.levels.pop(price, None)
+
+    def best(self):
+        """Return the best (price, amount), or None when empty"""
+        if not self.levels:
+            return None
+        return self.levels.peekitem(0)
+
+    def depth(self, levels=None):
+        """Return the best `levels` levels as [[price, amount], ...]"""
+        items = self.levels.items()
+        if levels is not None:
+            items = items[:levels]
+        return [[price, amount] for price, amount in items]
+
+
+class OrderBook:
+    """An L2 order book for one market of one exchange"""
+    def __init__(self, exchange, market):
+        self.exchange = exchange
+        self.market = market
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.timestamp = None
+
+    def side(self, side):
+        """Return a side by name: bids/buy or asks/sell"""
+        side = side.lower()
+        if side in ("bids", "bid", "buy"):
+            return self.bids
+        if side in ("asks", "ask", "sell"):
+            return self.asks
+        raise ValueError(f"Unknown order book side: {side}")
+
+    def snapshot(self, bids, asks, timestamp=None):
+        """Replace the book with a full snapshot"""
+        self.bids.load(bids)
+        self.asks.load(asks)
+        self.timestamp = timestamp
+
+    def update(self, side, price, amount, timestamp=None):
+        """Apply a level delta; an amount of zero removes the level"""
+        self.side(side).update(price, amount)
+        if timestamp is not None:
+            self.timestamp = timestamp
+
+    def best_bid(self):
+        """Return the best (price, amount) bid"""
+        return self.bids.best()
+
+    def best_ask(self):
+        """Return the best (price, amount) ask"""
+        return self.asks.best()
+
+    def spread(self):
+        """Return the difference between the best ask and bid"""
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return ask[0] - bid[0]
+
+    def depth(self, levels=None):
+        """Return the top levels of both sides, as ccxt does"""
+        return {
+            "bids": self.bids.depth(levels),
+            "asks": self.asks.depth(levels),
+            "timestamp": self.timestamp,
+        }
+
+
+class OrderBookEngine:
+    """Order books keyed by exchange and market, fed snapshots and deltas"""
+    def __init__(self):
+        self.books = {}  # type: dict
+
+    def book(self, exchange, market):
+        """Return the book of a market, creating it when new"""
+        key = (exchange, market)
+        book = self.books.get(key, None)
+        if book is None:
+            book = self.books[key] = OrderBook(exchange, market)
+        return book
+
+    def get(self, exchange, market):
+        """Return the book of a market, or None if it was never fed"""
+        return self.books.get((exchange, market), None)
+
+    def snapshot(self, exchange, market, bids, asks, timestamp=None):
+        """Replace a market's book with a full snapshot"""
+        book = self.book(exchange, market)
+        book.snapshot(bids, asks, timestamp)
+        return book
+
+    def update(self, exchange, market, side, price, amount, timestamp=None):
+        """Apply a level delta to a market's book"""
+        book = self.book(exchange, market)
+        book.update(side, price, amount, timestamp)
+        return book
+
+    def apply_order_books(self, books):
+        """
+        Apply `fetchOrderBook` results, as prepared by `OrderBookSchema`
+        (or decoded into arrays), as snapshots
+        """
+        for book in books:
+            bids, asks = book.get("bids", None), book.get("asks", None)
+            self.snapshot(book["exchange"], book["market"],
+                          () if bids is None else bids,
+                          () if asks is None else asks,
+                          book.get("timestamp", None))
+
+    def apply_ws_orders(self, orders):
+        """
+        Apply the items of Coinigy order channel messages; each message
+        carries the current book of its market, so it is a snapshot
+        """
+        markets = {}  # type: dict
+        for order in orders:
+            key = (order["exchange"], order["label"])
+            bids, asks = markets.setdefault(key, ([], []))
+            level = (order["price"], order["quantity"])
+            if order["ordertype"].lower() in ("buy", "bid", "bids"):
+                bids.append(level)
+            else:
+                asks.append(level)
+        for (exchange, market), (bids, asks) in markets.items():
+            self.snapshot(exchange, market, bids, asks)
@@ -0,0 +1,73 @@
+"""
+Weighted token-bucket rate limiting
+
+Buckets live in the memory of one process.  bors runs each scheduled call
+in a process of its own, so the calls of different processes do not share
+a bucket: each process keeps to the limit on its own.
+"""
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Holds up to `capacity` tokens, refilled at `rate` tokens per second"""
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = None
+        self._loop = None  # loop the lock belongs to
+
+    def refill(self):
+        """Add the tokens accrued since the last refill"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, weight=1):
+        """
+        Wait until `weight` tokens are available, then take them; a call
+        heavier than the bucket only waits for a full bucket and leaves it
+        in debt, which the next callers wait out
+        """
+        needed = min(weight, self.capacity)
+
+        # created here so the lock belongs to the running loop, and anew
+        # when a forked process runs a loop of its own
+        loop = asyncio.get_event_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock, self._loop = asyncio.Lock(), loop
+
+        # callers are served in order; nobody jumps the queue
+        async with self._lock:
+            self.refill()
+            if self.tokens < needed:
+                await asyncio.sleep((needed - self.tokens) / self.rate)
+                self.refill()
+            self.tokens -= weight
+
+
+class RateLimiter:
+    """
+    Draws the weight of each call from a token bucket; buckets are shared
+    by all limiters of a process created with the same key (exchange and
+    credential)
+    """
+    _buckets = {}  # type: dict
+
+    def __init__(self, key, rate, capacity=1, weights=None):
+        self.weights = weights or {}
+        if key not in self._buckets:
+            self._buckets[key] = TokenBucket(rate, capacity)
+        self.bucket = self._buckets[key]
+
+    def weight(self, callname):
+        """Cost of a call in tokens"""
+        return self.weights.get(callname, 1)
+
+    async def throttle(self, callname):
+        """Wait until the call is allowed to proceed"""
+        await self.bucket.acquire(self.weight(callname))
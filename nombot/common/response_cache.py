@@ -0,0 +1,108 @@
+"""Response caching and request coalescing"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+
+MISSING = object()  # cache miss sentinel; None is a valid response
+
+
+class TTLCache:
+    """Least-recently-used cache whose entries expire after their own TTL"""
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # type: OrderedDict
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=MISSING):
+        """Return the value of a live entry, or the default"""
+        try:
+            expires, value = self._entries[key]
+        except KeyError:
+            return default
+
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return default
+
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value, ttl):
+        """Store a value for `ttl` seconds, evicting the least recently used"""
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class SingleFlight:
+    """Shares one in-flight call among concurrent callers using the same key"""
+    def __init__(self):
+        self._flights = {}  # type: dict
+
+    async def do(self, key, func, *args, **kwargs):
+        """
+        Await the coroutine function, unless a call with the same key is
+        already in flight, in which case its result is shared
+        """
+        if key in self._flights:
+            return await asyncio.shield(self._flights[key])
+
+        flight = asyncio.ensure_future(func(*args, **kwargs))
+        self._flights[key] = flight
+        try:
+            # shielded, so one caller giving up does not fail the others
+            return await asyncio.shield(flight)
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+
+class ThreadedSingleFlight:
+    """`SingleFlight` for blocking calls made from concurrent threads"""
+    def __init__(self):
+        self._flights = {}  # type: dict
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Call the function, unless a call with the same key is already in
+        flight, in which case wait for it and share its result
+        """
+        return self.do_any((key,), func, *args, **kwargs)
+
+    def do_any(self, keys, func, *args, **kwargs):
+        """
+        `do` under the first of the keys, unless a call under any of them
+        is already in flight, in which case its result is shared
+        """
+        key = keys[0]
+        with self._lock:
+            flight = next((self._flights[other] for other in keys
+                           if other in self._flights), None)
+            leader = flight is None
+            if leader:
+                # [done, result, error]
+                flight = self._flights[key] = [threading.Event(), None, None]
+
+        if not leader:
+            flight[0].wait()
+            if flight[2] is not None:
+                raise flight[2]
+            return flight[1]
+
+        try:
+            flight[1] = func(*args, **kwargs)
+        except Exception as err:
+            flight[2] = err
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight[0].set()
+        return flight[1]
@@ -0,0 +1,72 @@
+"""An event loop running in a background thread"""
+
+import asyncio
+import os
+import threading
+
+
+# asyncio.Task.all_tasks and current_task were removed in Python 3.9
+ALL_TASKS = getattr(asyncio, "all_tasks", None) or asyncio.Task.all_tasks
+CURRENT_TASK = getattr(asyncio, "current_task", None) or \
+    asyncio.Task.current_task
+
+
+class LoopRuntime:
+    """
+    Owns an event loop that runs forever in a daemon thread; coroutines are
+    submitted from other threads and their results collected from futures.
+    Threads do not survive a fork, so a forked process starts a loop and
+    thread of its own on its first submission.
+    """
+    def __init__(self, name="nombot-loop"):
+        self.name = name
+        self.pid = None  # process the loop's thread runs in
+        self.loop = self.thread = None
+        self.start()
+
+    def start(self):
+        """Start a new loop, in a thread of the current process"""
+        self.pid = os.getpid()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=self.name,
+                                       daemon=True)
+        self.thread.start()
+
+    @property
+    def forked(self):
+        """Whether the loop's thread was left behind in a parent process"""
+        return self.pid != os.getpid()
+
+    def _run(self):
+        """Thread target; run the loop until stopped"""
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedule a coroutine on the loop, returning a future"""
+        if self.forked:
+            # the parent's loop is copied, but nothing runs it here
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the loop, blocking until it completes"""
+        return self.submit(coro).result(timeout)
+
+    async def _cancel_tasks(self):
+        """Cancel every task on the loop, other than this one"""
+        current = CURRENT_TASK(self.loop)
+        tasks = [task for task in ALL_TASKS(self.loop)
+                 if task is not current and not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def shutdown(self, timeout=None):
+        """Cancel the loop's own tasks, then stop and close the loop"""
+        if self.loop.is_closed() or self.forked:
+            return
+        self.run(self._cancel_tasks(), timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+        self.loop.close()
@@ -0,0 +1,133 @@
+"""
+Columnar trade tapes backed by preallocated NumPy ring buffers
+
+Every column is allocated twice its capacity and each trade is written at
+both `i` and `i + capacity`, so the most recent `n` trades are always one
+contiguous slice: windows are views of the buffers, never copies.
+"""
+
+import numpy as np
+
+
+SIDES = {"buy": 1, "sell": -1}
+
+
+class TradeTape:
+    """
+    The most recent trades of one market in time order, de-duplicated on
+    trade id; trades older than the newest one are dropped, as their ids
+    may have been evicted already
+    """
+    columns = ("timestamp", "price", "amount", "side")
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.timestamp = np.zeros(2 * capacity, dtype=np.int64)
+        self.price = np.zeros(2 * capacity, dtype=np.float64)
+        self.amount = np.zeros(2 * capacity, dtype=np.float64)
+        self.side = np.zeros(2 * capacity, dtype=np.int8)
+        self._ids = [None] * capacity  # type: list
+        self._seen = set()  # type: set
+        self._next = 0  # slot the next trade is written to
+        self.count = 0
+        self.newest = 0  # timestamp of the newest trade
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, trade_id):
+        return trade_id in self._seen
+
+    def append(self, trade):
+        """
+        Add a trade unless its id was seen or it is older than the newest
+        trade; return whether it was added
+        """
+        # trades without a timestamp are taken to be the newest
+        timestamp = trade["timestamp"] or self.newest
+        if timestamp < self.newest:
+            return False
+
+        trade_id = trade["id"]
+        if trade_id is not None:
+            if trade_id in self._seen:
+                return False
+            self._seen.add(trade_id)
+
+        slot = self._next
+        evicted = self._ids[slot]
+        if evicted is not None:
+            self._seen.discard(evicted)
+        self._ids[slot] = trade_id
+
+        self.newest = timestamp
+        row = (timestamp, trade["price"], trade["amount"],
+               SIDES.get(trade["side"], 0))
+        for column, value in zip(self.columns, row):
+            buf = getattr(self, column)
+            buf[slot] = buf[slot + self.capacity] = value
+
+        self._next = (slot + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        return True
+
+    def extend(self, trades):
+        """Add trades in order, returning how many were new"""
+        return sum(self.append(trade) for trade in trades)
+
+    def _bounds(self, size):
+        """Buffer bounds of the `size` most recent trades"""
+        end = self._next + self.capacity
+        return end - size, end
+
+    def window(self, size=None):
+        """
+        Return read-only views of the `size` most recent trades (all of
+        them by default), oldest first, keyed by column; views share the
+        tape's buffers and are only stable until the next append
+        """
+        size = self.count if size is None else min(size, self.count)
+        start, end = self._bounds(size)
+        views = {}
+        for column in self.columns:
+            view = getattr(self, column)[start:end]
+            view.flags.writeable = False
+            views[column] = view
+        return views
+
+    def since(self, timestamp):
+        """Return the window of trades at or after a timestamp"""
+        # trades are kept in time order, see `append`
+        start, end = self._bounds(self.count)
+        times = self.timestamp[start:end]
+        return self.window(self.count - int(np.searchsorted(times, timestamp)))
+
+
+class TradeTapes:
+    """Trade tapes keyed by exchange and market"""
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.tapes = {}  # type: dict
+
+    def tape(self, exchange, market):
+        """Return the tape of a market, creating it when new"""
+        key = (exchange, market)
+        tape = self.tapes.get(key, None)
+        if tape is None:
+            tape = self.tapes[key] = TradeTape(self.capacity)
+        return tape
+
+    def get(self, exchange, market):
+        """Return the tape of a market, or None if it has no trades"""
+        return self.tapes.get((exchange, market), None)
+
+    def apply_trades(self, trades):
+        """
+        Add `fetchTrades` results, as prepared by `TradeSchema` or decoded
+        into records, returning how many trades were new
+        """
+        added = 0
+        for trade in trades:
+            added += self.tape(trade["exchange"], trade["symbol"]) \
+                .append(trade)
+        return added
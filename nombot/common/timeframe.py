@@ -0,0 +1,19 @@
+"""Timeframes, as ccxt names them ("1m", "4h", ...)"""
+
+
+# Milliseconds per timeframe unit
+TIMEFRAME_UNITS = {
+    "s": 1000,
+    "m": 60 * 1000,
+    "h": 60 * 60 * 1000,
+    "d": 24 * 60 * 60 * 1000,
+    "w": 7 * 24 * 60 * 60 * 1000,
+}
+
+
+def parse_timeframe(timeframe):
+    """Return the length of a timeframe in milliseconds"""
+    try:
+        return int(timeframe[:-1]) * TIMEFRAME_UNITS[timeframe[-1]]
+    except (KeyError, ValueError):
+        raise ValueError(f"Unknown timeframe: {timeframe}")
@@ -0,0 +1,62 @@
+"""NumPy-backed decoders for exchange results"""
+
+import numpy as np
+
+
+OHLCV_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def levels(side):
+    """Decode the [[price, amount], ...] levels of a book side"""
+    if not side:
+        return np.empty((0, 2), dtype=np.float64)
+    # ccxt may append extra fields (e.g. order count) to some levels only
+    return np.array([level[:2] for level in side], dtype=np.float64)
+
+
+def decode_order_books(data):
+    """
+    Decode order book results into one dict per exchange and market, as
+    `OrderBookSchema.prepare` does, with `bids` and `asks` as contiguous
+    float64 arrays of shape (n, 2)
+    """
+    books = []
+    for exch, result in data["result"].items():
+        if exch == "result":
+            continue
+        for market, orderbook in result.items():
+            if market == "result":
+                continue
+            books.append({
+                "exchange": exch,
+                "market": market,
+                "bids": levels(orderbook.get("bids")),
+                "asks": levels(orderbook.get("asks")),
+                "timestamp": orderbook.get("timestamp"),
+                "datetime": orderbook.get("datetime"),
+                "nonce": orderbook.get("nonce"),
+            })
+    return books
+
+
+def decode_ohlcv(data):
+    """
+    Decode candle results into one dict per exchange and market, as
+    `OHLCVSchema.prepare` does, with each column a float64 array (int64 for
+    `timestamp`)
+    """
+    decoded_candles = []
+    for exch, result in data["result"].items():
+        if exch == "result":
+            continue
+        for market, candles in result.items():
+            if market in ("exchange", "result"):
+                continue
+            # ccxt candles are rows of [timestamp, o, h, l, c, v]
+            rows = np.asarray(candles, dtype=np.float64).reshape(-1, 6)
+            decoded = {"exchange": exch, "market": market,
+                       "timestamp": rows[:, 0].astype(np.int64)}
+            for index, column in enumerate(OHLCV_COLUMNS, 1):
+                decoded[column] = rows[:, index]
+            decoded_candles.append(decoded)
+    return decoded_candles
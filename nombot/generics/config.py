@@ -25,6 +25,37 @@ class ApiServiceConfSchema(Schema):
     credentials = fields.List(fields.Nested(ApiCredConfSchema))
     subscriptions = fields.Dict()
     exchanges = fields.List(fields.Str())
+    rate_limit = fields.Int()  # milliseconds per request of weight 1
+    rate_burst = fields.Int()  # requests allowed in a burst
+    rate_weights = fields.Dict()  # per-callname request weights
+    concurrent = fields.Bool()  # fan calls out over exchanges and symbols
+    timeout = fields.Float()  # seconds to wait on each exchange
+    call_timeout = fields.Float()  # seconds to wait on a whole call
+    concurrency = fields.Int()  # max in-flight requests per exchange
+    merge_window = fields.Float()  # seconds to gather data requests
+    lazy = fields.Bool()  # load exchange markets on first use
+    cache_dir = fields.Str()  # directory to cache loaded markets in
+    cache_ttl = fields.Int()  # seconds before cached markets are refetched
+    error_threshold = fields.Float()  # error rate opening a circuit
+    circuit_cooldown = fields.Float()  # seconds before probing open circuits
+    response_cache_size = fields.Int()  # max responses kept cached
+    response_ttls = fields.Dict()  # seconds responses stay fresh, by call
+    array_books = fields.Bool()  # decode order books into NumPy arrays
+    array_candles = fields.Bool()  # decode candles into NumPy arrays
+    records = fields.Bool()  # decode tickers, trades, orders into records
+    keep_info = fields.Bool()  # keep raw exchange payloads in records
+    backfill_days = fields.Float()  # days of candles to fetch at startup
+    backfill_timeframe = fields.Str()  # timeframe of backfilled candles
+    backfill_limit = fields.Int()  # candles per backfill request
+    balance_ledger = fields.Bool()  # follow balances from orders and fills
+    reconcile_interval = fields.Float()  # seconds between balance fetches
+    drift_tolerance = fields.Float()  # balance error tolerated by ledgers
+    subscribe_batch = fields.Int()  # channels (un)subscribed per batch
+    subscribe_interval = fields.Float()  # seconds between channel batches
+    channel_refresh = fields.Float()  # seconds between channel refetches
+    ingest_size = fields.Int()  # websocket results queued before dropping
+    ingest_batch = fields.Int()  # channels handed to the pipeline per drain
+    ingest_log_interval = fields.Float()  # seconds between metrics logs
     endpoints = fields.Nested(ApiEndpointConfSchema())
 
 
@@ -10,17 +10,28 @@ class ExchangeSchema(ResultSchema):
     """A generic schema for exchange meta-interfaces"""
     exchange = f.Str(required=True)
 
-    def prepare(self, data):
-        _data = []  # type: list
+    @staticmethod
+    def results(data):
+        """Yield (exchange, result) for each exchange of a CCXTApi response"""
         for exch, result in data["result"].items():
             if exch != "result":
-                _result = {}
-                _result["exchange"] = exch
-                for key, item in result.items():
-                    if key != "result":
-                        _result[key] = item
-                _data.append(_result)
-        return _data
+                yield exch, result
+
+    @staticmethod
+    def tag(exchange, result):
+        """
+        Return a shallow copy of a result tagged with its exchange; nested
+        values are shared, never copied, and the result is left untouched
+        """
+        _result = {key: item for key, item in result.items()
+                   if key != "result"}
+        _result["exchange"] = exchange
+        return _result
+
+    def prepare(self, data):
+        """Yield one record per exchange"""
+        for exch, result in self.results(data):
+            yield self.tag(exch, result)
 
 
 class LimitSchema(ExchangeSchema):
@@ -62,17 +73,15 @@ class OrderSchema(ExchangeSchema):
     info = f.Dict(required=True)
 
     def prepare(self, data):
-        _data = []  # type: list
-        for exch, result in data["result"].items():
-            print(f"""EXCH: {exch}; RESULT: {result}""")
-            if exch != "result":
-                _result = {}
-                _result["exchange"] = exch
-                for key, item in result.items():
-                    if key != "result":
-                        _result[key] = item
-                _data.append(_result)
-        return _data
+        """Yield one record per order, whether listed or keyed by symbol"""
+        for exch, result in self.results(data):
+            if isinstance(result, list):
+                orders = result  # type: ignore
+            else:
+                orders = (order for key, items in result.items()
+                          if key != "result" for order in items)
+            for order in orders:
+                yield self.tag(exch, order)
 
 
 class OrderBookSchema(ExchangeSchema):
@@ -85,18 +94,39 @@ class OrderBookSchema(ExchangeSchema):
     market = f.Str()
 
     def prepare(self, data):
-        data = super().prepare(data)
-        _data = []
-        for result in data:
+        """Yield one record per exchange and market"""
+        for exch, result in self.results(data):
             for market, orderbook in result.items():
-                if market != "exchange":
-                    _result = {"exchange": result["exchange"]}
+                if market not in ("exchange", "result"):
+                    _result = self.tag(exch, orderbook)
                     _result["market"] = market
-                    for key, item in orderbook.items():
-                        if key != "market":
-                            _result[key] = item
-                    _data.append(_result)
-        return _data
+                    yield _result
+
+
+class OHLCVSchema(ExchangeSchema):
+    """Candles of a market, as columns: [timestamp, ...], [open, ...], ..."""
+    market = f.Str(required=True)
+    timestamp = f.List(f.Int(), required=True)
+    open = f.List(f.Float(), required=True)
+    high = f.List(f.Float(), required=True)
+    low = f.List(f.Float(), required=True)
+    close = f.List(f.Float(), required=True)
+    volume = f.List(f.Float(), required=True)
+
+    columns = ("timestamp", "open", "high", "low", "close", "volume")
+
+    def prepare(self, data):
+        """Yield one record per exchange and market"""
+        for exch, result in self.results(data):
+            for market, candles in result.items():
+                if market in ("exchange", "result"):
+                    continue
+                # ccxt candles are rows of [timestamp, o, h, l, c, v]
+                _result = {"exchange": exch, "market": market}
+                columns = zip(*candles) if candles else [()] * 6
+                for column, values in zip(self.columns, columns):
+                    _result[column] = list(values)
+                yield _result
 
 
 class MarketSchema(ExchangeSchema):
@@ -142,15 +172,11 @@ class TickerSchema(ExchangeSchema):
     quoteVolume = f.Float()
 
     def prepare(self, data):
-        _data = []
-        for result in super().prepare(data):
-            exchange = result["exchange"]
-            del result["exchange"]
-            for tick in result.values():
-                _result = tick
-                _result["exchange"] = exchange
-                _data.append(_result)
-        return _data
+        """Yield one record per ticker"""
+        for exch, result in self.results(data):
+            for key, tick in result.items():
+                if key not in ("exchange", "result"):
+                    yield self.tag(exch, tick)
 
 
 class TradeSchema(ExchangeSchema):
@@ -167,16 +193,12 @@ class TradeSchema(ExchangeSchema):
     amount = f.Float(required=True)
 
     def prepare(self, data):
-        _data = []
-        for result in super().prepare(data):
-            exchange = result["exchange"]
-            del result["exchange"]
-            for market in result.values():
-                for trade in market:
-                    _result = trade
-                    _result["exchange"] = exchange
-                    _data.append(_result)
-        return _data
+        """Yield one record per trade"""
+        for exch, result in self.results(data):
+            for key, trades in result.items():
+                if key not in ("exchange", "result"):
+                    for trade in trades:
+                        yield self.tag(exch, trade)
 
 
 class MyTradeSchema(ExchangeSchema):
@@ -204,14 +226,12 @@ class BalanceSchema(ExchangeSchema):
     by_sym = f.Dict()
 
     def prepare(self, data):
-        _data = []  # type: list
-        for exch, result in data["result"].items():
-            if exch != "result":
-                _result = {"exchange": exch, "by_sym": {}}  # type: dict
-                for key, item in result.items():
-                    if key in ["info", "free", "used", "total"]:
-                        _result[key] = item
-                    elif key != "result":
-                        _result["by_sym"][key] = item
-                _data.append(_result)
-        return _data
+        """Yield one record per exchange, with currencies under by_sym"""
+        for exch, result in self.results(data):
+            _result = {"exchange": exch, "by_sym": {}}  # type: dict
+            for key, item in result.items():
+                if key in ["info", "free", "used", "total"]:
+                    _result[key] = item
+                elif key != "result":
+                    _result["by_sym"][key] = item
+            yield _result
@@ -0,0 +1,122 @@
+"""Compact, slotted record types for exchange results"""
+
+from nombot.generics.exchange import \
+    MyTradeSchema, OrderSchema, TickerSchema, TradeSchema
+
+
+class Record:
+    """
+    A result stored in `__slots__` rather than a dict; the raw `info`
+    payload of the exchange is only kept when asked for
+    """
+    __slots__ = ("info",)
+    _fields = ()  # type: tuple
+
+    def __init__(self, info=None, **kwargs):
+        self.info = info
+        for field in self._fields:
+            setattr(self, field, kwargs.get(field, None))
+
+    @classmethod
+    def from_dict(cls, data, exchange=None, keep_info=False):
+        """Create a record from a ccxt result"""
+        record = cls.__new__(cls)
+        record.info = data.get("info") if keep_info else None
+        for field in cls._fields:
+            setattr(record, field, data.get(field, None))
+        if exchange is not None:
+            record.exchange = exchange
+        return record
+
+    def __getitem__(self, key):
+        """Dict-style access, for strategies written against dict results"""
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        """Dict-style access with a default"""
+        return getattr(self, key, default)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and \
+            self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}"
+                           for field in self._fields)
+        return f"{type(self).__name__}({fields})"
+
+    def as_dict(self):
+        """Dump the record as a dict, with `info` if it was kept"""
+        data = {field: getattr(self, field) for field in self._fields}
+        if self.info is not None:
+            data["info"] = self.info
+        return data
+
+
+def record_type(name, schema):
+    """Create a record type with the fields of a schema, less `info`"""
+    # pylint: disable=protected-access
+    fields = tuple(field for field in schema._declared_fields
+                   if field != "info")
+    return type(name, (Record,), {
+        "__slots__": fields,
+        "__doc__": f"Compact {schema.__name__} result",
+        "_fields": fields,
+    })
+
+
+Ticker = record_type("Ticker", TickerSchema)
+Trade = record_type("Trade", TradeSchema)
+MyTrade = record_type("MyTrade", MyTradeSchema)
+Order = record_type("Order", OrderSchema)
+
+
+def iter_results(data):
+    """
+    Yield (exchange, item) for each item of a result, whether exchanges
+    returned a single item, a list, or items keyed by symbol
+    """
+    for exch, result in data["result"].items():
+        if exch == "result":
+            continue
+        if isinstance(result, list):
+            items = result
+        elif "symbol" in result:
+            items = [result]
+        else:
+            # results of `call_over_syms` and `call_bulk`
+            items = []
+            for sym, item in result.items():
+                if sym == "result":
+                    continue
+                if isinstance(item, list):
+                    items.extend(item)
+                else:
+                    items.append(item)
+        for item in items:
+            yield exch, item
+
+
+def record_decoder(record, keep_info=False):
+    """Create a decoder of results into records of a type"""
+    def decode(data):
+        """Decode the results into records"""
+        return [record.from_dict(item, exch, keep_info)
+                for exch, item in iter_results(data)]
+    return decode
+
+
+def record_decoders(keep_info=False):
+    """Decoders of results into records, by callname"""
+    return {
+        "fetchTicker": record_decoder(Ticker, keep_info),
+        "fetchTickers": record_decoder(Ticker, keep_info),
+        "fetchTrades": record_decoder(Trade, keep_info),
+        "fetchMyTrades": record_decoder(MyTrade, keep_info),
+        "fetchOrders": record_decoder(Order, keep_info),
+        "fetchOpenOrders": record_decoder(Order, keep_info),
+        "fetchClosedOrders": record_decoder(Order, keep_info),
+    }
@@ -4,6 +4,8 @@ Generic response types
 
 from marshmallow import fields, Schema, post_load, pre_load
 from nombot.api.response import Result, RESPONSE_MAP
+from nombot.common.fastjson import decode
+from nombot.generics.serializers import compile_schema, compile_schemas
 
 
 class DefaultSchema(Schema):
@@ -22,6 +24,49 @@ class DefaultSchema(Schema):
 
 RESPONSE_MAP["default"] = DefaultSchema()
 
+# Specialized dump functions for each RESPONSE_MAP schema, compiled once
+SERIALIZERS = compile_schemas(RESPONSE_MAP)
+
+
+class ParserRegistry:
+    """
+    Websocket payload parsers by response type, each resolved once (when
+    its channels are subscribed) into a function decoding JSON text, if
+    need be, and serializing it through the compiled schema of the type
+    """
+    def __init__(self, response_map, default=None, serializers=None):
+        self.response_map = response_map
+        self.default = default
+        self.serializers = {} if serializers is None else serializers
+        self.parsers = {}  # type: dict
+
+    def _serializer(self, response_type):
+        """Return the compiled serializer of a type, or None if unknown"""
+        serialize = self.serializers.get(response_type, None)
+        if serialize is None and response_type in self.response_map:
+            serialize = self.serializers[response_type] = \
+                compile_schema(self.response_map[response_type])
+        return serialize
+
+    def resolve(self, response_type):
+        """Return the parser of a response type, building it when new"""
+        parser = self.parsers.get(response_type, None)
+        if parser is None:
+            serialize = self._serializer(response_type)
+            if serialize is None and self.default is not None:
+                serialize = self._serializer(self.default)
+            if serialize is None:
+                parser = decode
+            else:
+                def parser(payload):
+                    """Decode and serialize a payload"""
+                    return serialize(decode(payload))
+            self.parsers[response_type] = parser
+        return parser
+
+
+PARSERS = ParserRegistry(RESPONSE_MAP, "default", SERIALIZERS)
+
 
 class CommonResponseSchema(Schema):
     """Common response schema"""
@@ -41,16 +86,24 @@ class CommonResponseSchema(Schema):
 
 class ResponseSchema(CommonResponseSchema):
     """Schema defining the data structure the API will respond with"""
+    # Functions decoding a callname's data in place of its schema
+    decoders = {}  # type: dict
+
     @post_load
     def populate_data(self, data):
         """Parse the incoming schema"""
         if "errors" in data:
             return Result(errors=data["errors"])
         callname = self.context.get("callname")
+        decoder = self.decoders.get(callname, None)
+        if decoder is not None:
+            return Result(callname=callname, results=decoder(data))
+        serialize = SERIALIZERS.get(callname, None)
+        if serialize is None:
+            serialize = RESPONSE_MAP[callname].dump  # type: ignore
         results = {
             "callname": callname,
-            "results": RESPONSE_MAP[callname]  # type: ignore
-                .dump(self.get_results(callname, data))  # NOQA
+            "results": serialize(self.get_results(callname, data))
         }
         return Result(**results)
 
@@ -65,18 +118,20 @@ class WSResponseSchema(CommonResponseSchema):
     Schema defining the data structure from published messages on the websock
     """
     channel = fields.Str()
+    parsers = PARSERS  # payload parsers by response type
+
+    def get_result(self, data):  # pylint: disable=no-self-use
+        """
+        Return the actual result data
+          ~~ Override this to match your API. ~~
+        """
+        return data
 
     @pre_load
     def prep_data(self, data):
         """Prepare the data for ingestion"""
-        # pylint: disable=E1101
-        res_type = self.context.get("response_type")
-        try:
-            sch = RESPONSE_MAP[res_type]
-        except KeyError:
-            sch = RESPONSE_MAP["default"]
-
-        self.context["result"] = sch.dump(self.get_result(callname, data)).data  # NOQA
+        parse = self.parsers.resolve(self.context.get("response_type"))
+        self.context["result"] = parse(self.get_result(data))
         return self.context
 
     @post_load
@@ -0,0 +1,137 @@
+"""
+Response serializers compiled from marshmallow schemas
+
+`Schema.dump` walks every field of a schema, resolving accessors, defaults
+and formatters for each value of each object it serializes.  The response
+schemas never change once the application has started, so all of that
+introspection is done once here: each schema is turned into a specialized
+function that produces the same output as its `dump`.
+
+Fields without a known fast path (methods, functions, booleans, custom
+fields...) keep calling the field's own formatter, and schemas with dump
+hooks or a custom accessor are left to marshmallow entirely.
+"""
+
+from marshmallow import fields as f
+from marshmallow import Schema
+from marshmallow.decorators import PRE_DUMP, POST_DUMP
+from marshmallow.utils import ensure_text_type, get_value, missing
+
+
+def _has_hooks(schema):
+    """Whether compiling the schema would skip processors or accessors"""
+    return schema._has_processors(PRE_DUMP) \
+        or schema._has_processors(POST_DUMP) \
+        or type(schema).get_attribute is not Schema.get_attribute
+
+
+class _Compiler:
+    """Generates the source of a single-object dump function"""
+    def __init__(self):
+        self.names = {
+            "missing": missing,
+            "get_value": get_value,
+            "text": ensure_text_type,
+        }
+
+    def bind(self, prefix, value):
+        """Make a value available to the generated code, returning its name"""
+        name = f"{prefix}{len(self.names)}"
+        self.names[name] = value
+        return name
+
+    def expr(self, field, var, depth=0):
+        """
+        Return an expression formatting `var` the way the field's
+        `_serialize` does, or None when there is no fast path for it
+        """
+        kind = type(field)
+        if field.default is not missing:
+            return None
+        if kind is f.String:
+            return f"({var} if type({var}) is str " \
+                f"else None if {var} is None else text({var}))"
+        if kind in (f.Float, f.Integer) and not field.as_string:
+            return f"(None if {var} is None else {field.num_type.__name__}" \
+                f"({var}))"
+        untyped = getattr(field, "key_field", None) is None and \
+            getattr(field, "value_field", None) is None
+        if kind is f.Raw or (kind is f.Dict and untyped):
+            return var
+        if kind is f.List:
+            each = f"v{depth}"
+            inner = self.expr(field.inner, each, depth + 1)
+            if inner is None:
+                return None
+            return f"(None if {var} is None " \
+                f"else [{inner} for {each} in {var}])"
+        if kind is f.Nested and not _has_hooks(field.schema):
+            nested = self.bind("n", self.function(field.schema))
+            if field.many or field.schema.many:
+                each = f"v{depth}"
+                return f"(None if {var} is None " \
+                    f"else [{nested}({each}) for {each} in {var}])"
+            return f"(None if {var} is None else {nested}({var}))"
+        return None
+
+    def function(self, schema):
+        """Compile a function dumping a single object with the schema"""
+        dict_class = self.bind("d", schema.dict_class)
+        lines = [
+            "def dump(obj):",
+            f"    ret = {dict_class}()",
+            "    if type(obj) is dict:",
+            "        get = obj.get",
+            "    else:",
+            "        def get(key, default):",
+            "            return get_value(obj, key, default)",
+        ]
+        for name, field in schema.dump_fields.items():
+            key = field.data_key if field.data_key is not None else name
+            attr = getattr(field, "attribute", None) or name
+            fast = field._CHECK_ATTRIBUTE \
+                and type(field).get_value is f.Field.get_value
+            expr = self.expr(field, "value") if fast else None
+            if expr is None:
+                ser = self.bind("s", field.serialize)
+                lines += [
+                    f"    value = {ser}({name!r}, obj, accessor=get_value)",
+                    "    if value is not missing:",
+                    f"        ret[{key!r}] = value",
+                ]
+                continue
+            if "." in attr or hasattr(dict, attr):
+                lines.append(f"    value = get_value(obj, {attr!r}, missing)")
+            else:
+                lines.append(f"    value = get({attr!r}, missing)")
+            lines += [
+                "    if value is not missing:",
+                f"        ret[{key!r}] = {expr}",
+            ]
+        lines.append("    return ret")
+
+        namespace = dict(self.names)
+        exec("\n".join(lines), namespace)  # pylint: disable=exec-used
+        return namespace["dump"]
+
+
+def compile_schema(schema):
+    """
+    Return a function serializing objects exactly as `schema.dump(obj)`
+    """
+    if _has_hooks(schema):
+        return schema.dump
+    dump_one = _Compiler().function(schema)
+    if not schema.many:
+        return dump_one
+
+    def dump_many(obj):
+        if obj is None:
+            return dump_one(obj)
+        return [dump_one(item) for item in obj]
+    return dump_many
+
+
+def compile_schemas(schemas):
+    """Compile every schema of a callname -> schema map"""
+    return {name: compile_schema(schema) for name, schema in schemas.items()}
@@ -4,10 +4,22 @@ Supplementary trading strategy
 
 from bors.app.strategy import IStrategy
 
+from nombot.algorithms.indicators import IndicatorTable
+
 
 class StockSupplement(IStrategy):
-    """Print Strategy implementation"""
-    history = StockDataFrame()
+    """
+    Supplement the context with technical indicators per exchange and
+    market, computed from the closed candles of one timeframe of the OHLCV
+    strategy (placed before this one): a backlog of candles, such as a
+    backfill, warms them up in a batch, and each newly closed candle is
+    then folded in on its own
+    """
+    name = "stock_supplement"
+
+    def __init__(self, timeframe="1m", **settings):
+        self.timeframe = timeframe
+        self.history = IndicatorTable(**settings)
 
     def bind(self, context):
         """
@@ -20,9 +32,18 @@ class StockSupplement(IStrategy):
         return context
 
     def supplement(self, context):
-        """Supplement the context with stockstats"""
-        self.history.append(self.parse(context.get('result')))
+        """Supplement the context with the latest indicators"""
+        for exchange, market, bars in self.parse(context):
+            self.history.get(exchange, market).feed(bars)
+
+        context["strategy"].update({
+            "indicators": self.history.latest(),
+        })
 
-    def parse(self, result):
-        """Parse the results to generate stock data as exchange->src->dest"""
-        return result
+    def parse(self, context):
+        """Yield (exchange, market, bars) of the timeframe in the context"""
+        for (exchange, market), series in \
+                context["strategy"].get("ohlc", {}).items():
+            candles = series.get(self.timeframe, None)
+            if candles is not None and len(candles) > 1:
+                yield exchange, market, candles.closed()
@@ -1,9 +1,151 @@
 """Coinigy strategy, subscribes to all favorited channels"""
+import threading
+
 from bors.app.strategy import IStrategy
 from bors.app.log import LoggerMixin
 
-from bors.common.factory import Creator, Product
-from bors.common.dotobj import DotObj
+
+from nombot.common.ingest import unwrap
+
+
+def channel_response_type(chan):
+    """Response type of a channel's messages, by its kind"""
+    if chan.startswith("ORDER"):
+        return "orders"
+    if chan.startswith("TRADE"):
+        return "trade"
+    return None
+
+
+class ChannelSubscriptions:
+    """
+    Keeps the channels the server offers, the channels we want and the
+    channels we are subscribed to as sets, and only (un)subscribes the
+    difference between them, in batches of `batch_size` channels sent
+    `interval` seconds apart; `subscribed` are the channels the socket
+    subscribed to when it connected
+    """
+    kinds = ("ORDER", "TRADE")
+
+    def __init__(self, subscribe, unsubscribe, batch_size=10, interval=1.0,
+                 subscribed=()):
+        # pylint: disable=too-many-arguments
+        self.subscribe = subscribe
+        self.unsubscribe = unsubscribe
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+
+        self.available = set()  # type: set
+        self.configured = set()  # type: set
+        self.exchanges = set()  # type: set
+        self.currencies = set()  # type: set
+        self.desired = set()  # type: set
+        self.subscribed = set(subscribed)
+
+        self._adds = []  # type: list
+        self._removes = []  # type: list
+        self._lock = threading.RLock()
+        self._timer = None
+
+    def configure(self, subscriptions, exchanges, currencies,
+                  channels=None):
+        """
+        Set the configured channels, exchanges and currencies, and the
+        channels the server offers when given, queueing the differences
+        when they changed
+        """
+        configured = set(subscriptions)
+        exchanges = {exch.upper() for exch in exchanges}
+        currencies = {curr.upper() for curr in currencies}
+        with self._lock:
+            available = self.available if channels is None \
+                else set(channels)
+            if (configured, exchanges, currencies, available) == \
+                    (self.configured, self.exchanges, self.currencies,
+                     self.available):
+                return set(), set()
+            self.configured = configured
+            self.exchanges = exchanges
+            self.currencies = currencies
+            self.available = available
+            return self._update()
+
+    def set_available(self, channels):
+        """
+        Set the channels the server offers, queueing the differences when
+        they changed
+        """
+        available = set(channels)
+        with self._lock:
+            if available == self.available:
+                return set(), set()
+            self.available = available
+            return self._update()
+
+    def wanted(self, chan):
+        """Whether an available channel matches the configuration"""
+        # e.g. ORDER-BTRX--BTC--USD
+        kind, _, rest = chan.partition("-")
+        exch, _, pair = rest.partition("--")
+        curr1, _, curr2 = pair.partition("--")
+        return kind in self.kinds and exch in self.exchanges and \
+            curr1 in self.currencies and curr2 in self.currencies and \
+            curr1 != curr2
+
+    def _update(self):
+        """Recompute the wanted channels, queueing the differences"""
+        self.desired = self.configured | \
+            {chan for chan in self.available if self.wanted(chan)}
+        adds = self.desired - self.subscribed
+        removes = self.subscribed - self.desired
+        self._adds = sorted(adds)
+        self._removes = sorted(removes)
+        self.flush()
+        return adds, removes
+
+    def pending(self):
+        """Number of channels still waiting to be (un)subscribed"""
+        with self._lock:
+            return len(self._adds) + len(self._removes)
+
+    def flush(self):
+        """Send one batch, scheduling the next while channels remain"""
+        with self._lock:
+            if self._timer is not None:
+                return
+            while self._adds or self._removes:
+                removes = self._removes[:self.batch_size]
+                del self._removes[:len(removes)]
+                adds = self._adds[:self.batch_size - len(removes)]
+                del self._adds[:len(adds)]
+
+                if removes:
+                    self.unsubscribe(removes)
+                    self.subscribed.difference_update(removes)
+                if adds:
+                    self.subscribe({chan: channel_response_type(chan)
+                                    for chan in adds})
+                    self.subscribed.update(adds)
+
+                if self.interval and (self._adds or self._removes):
+                    self._timer = threading.Timer(self.interval,
+                                                  self._next_batch)
+                    self._timer.daemon = True
+                    self._timer.start()
+                    return
+
+    def _next_batch(self):
+        """Timer callback sending the next batch"""
+        with self._lock:
+            self._timer = None
+        self.flush()
+
+    def cancel(self):
+        """Stop sending batches"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
 
 
 class CoinigyFacade(LoggerMixin):
@@ -19,15 +161,37 @@ class CoinigyFacade(LoggerMixin):
 
         self.create_logger()
 
+        # configured channels are subscribed when the socket connects
+        self.subscriptions = ChannelSubscriptions(
+            self._add_channels, self._remove_channels,
+            self.conf.get("subscribe_batch", 10),
+            self.conf.get("subscribe_interval", 1.0),
+            self.conf.get("subscriptions", {}).keys())
+        self.refresh_interval = self.conf.get("channel_refresh", 300.0)
+        self._refresh = None
+
     def get_channels(self, callback):
-        """Setup possible channels"""
+        """
+        Setup possible channels, refetching the server's channels every
+        `channel_refresh` seconds to follow its changes
+        """
         self.chan_callback = callback
+        self.refresh_channels()
+
+    def refresh_channels(self):
+        """Request the channels the server offers"""
         self.api.wscall("channels", None, self._connect_channels)
+        if self.refresh_interval:
+            self._refresh = threading.Timer(self.refresh_interval,
+                                            self.refresh_channels)
+            self._refresh.daemon = True
+            self._refresh.start()
 
     def _connect_channels(self, ename, error, data):   # pylint: disable=W0613
         """
-        Dynamically generate the websocket channels based on exchange and
-        currency configurations and what the server reports available.
+        Subscribe to the channels the server offers for the configured
+        exchanges and currencies, and drop those it no longer offers or
+        the configuration no longer wants
         """
         if error:
             self.log.error(f"Channel request error: {error}")
@@ -35,98 +199,72 @@ class CoinigyFacade(LoggerMixin):
 
         # We've reached this point if we have a list of channels
         possible_channels = [item["channel"] for item in data[0]]
-
-        # Assemble a list of configured channels
-        channels = {chan: True for chan in
-                    self.conf.get("subscriptions").keys()}
-
-        # Assemble a list of possibilities based on the config exch/currency
-        ecc = []
-        for exch in self.conf["exchanges"]:
-            for curr1 in self.context["currencies"]:
-                for curr2 in self.context["currencies"]:
-                    if curr1 != curr2:
-                        ecc.append((exch, curr1, curr2))
-
-        for exch, curr1, curr2 in ecc:
-            for ortra in ["order", "trade"]:
-                for chan in [
-                        f"{ortra}-{exch}--{curr1}--{curr2}".upper(),
-                        f"{ortra}-{exch}--{curr2}--{curr1}".upper()
-                ]:
-                    if chan in possible_channels:
-                        if chan not in channels:
-                            channels[chan] = False
-
-        self.context["shared"]["channels"] = channels
-
-        # Subscribe to channels that haven't been subscribed to yet
-        chan_resp = {}
-        for chan in [k for k, v in channels.items() if not v]:
-            restype = None
-            if chan.startswith("ORDER"):
-                restype = "orders"
-            elif chan.startswith("TRADE"):
-                restype = "trade"
-            if restype is not None:
-                chan_resp[chan] = restype
-                self.log.info(f"""CONNECTING CHANNEL!{chan}""")
-
-        # Connect to channels
-        self.api.add_channels(chan_resp)
+        self.update_channels(possible_channels)
         self.chan_callback(possible_channels)
 
+    def update_channels(self, possible_channels=None):
+        """
+        Recompute the wanted channels from the configuration and, when
+        given, the channels the server offers, (un)subscribing the
+        differences; call it whenever either changes
+        """
+        subs = self.subscriptions
+        adds, removes = subs.configure(
+            self.conf.get("subscriptions", {}).keys(),
+            self.conf["exchanges"], self.context["currencies"],
+            possible_channels)
+        if adds or removes:
+            self.log.info(f"Channel changes -- "
+                          f"subscribing: {len(adds)}; "
+                          f"unsubscribing: {len(removes)}")
+        self.context["shared"]["channels"] = {
+            chan: chan in subs.configured for chan in subs.desired}
+        return adds, removes
+
+    def stop(self):
+        """Stop refreshing and (un)subscribing channels"""
+        if self._refresh is not None:
+            self._refresh.cancel()
+        self.subscriptions.cancel()
+
+    def _add_channels(self, channels):
+        """Subscribe to a batch of {channel: response type}"""
+        parsers = self.api.api.ws_result_schema.parsers
+        for chan, res_type in channels.items():
+            self.log.info(f"""CONNECTING CHANNEL!{chan}""")
+            parsers.resolve(res_type)
+        self.api.add_channels(channels)
+
+    def _remove_channels(self, channels):
+        """Unsubscribe from a batch of channels"""
+        sock_api = self.api.api
+        for chan in channels:
+            self.log.info(f"""DISCONNECTING CHANNEL!{chan}""")
+            sock_api.sock.unsubscribe(chan)
+        removed = set(channels)
+        sock_api.channels = [chan for chan in sock_api.channels
+                             if chan.channel not in removed]
+
+
+class ChannelSlot:
+    """The latest result of a callname or channel"""
+    __slots__ = ("result", "count")
 
-class CoinigyResultParserFactory(Creator):
-    """Generator of parser objects"""
-    def _factory_method(self, *args, **kwargs):
-        return CoinigyParser(*args, **kwargs)
-
-
-class CoinigyParser(Product):
-    """Result parsing class"""
-    _call_lookup = {}  # type: dict
-
-    def __init__(self, strategy_data, context):
-        self.strategy_data = strategy_data
-        self.context = context
-        self.result = self.context.get("result").data
-        self.api_ctx = self.context.get("conf")
-        self.api_ctxs = self.context.get("api_contexts")
-
-    def _lookup(self, callname):
-        """Return a callable function based on the name"""
-        return self._call_lookup.get(callname, self._default_parser)
-
-    def _default_parser(self):
-        """Return a result object for supplementation"""
-        update = {}
-        if self.result.callname is not None:
-            update[self.result.callname] = self.result
-        elif self.result.response_type is not None:
-            update[self.result.response_type] = self.result
-        elif self.result.channel is not None:
-            update[self.result.channel] = self.result
-
-        return self.strategy_data.coinigy.update({"data": update})
-
-    def interface(self):
-        """Call the update to the context based on the result received"""
-        if self.result.callname is not None:
-            self._lookup(self.result.callname)()
-        elif self.result.channel is not None:
-            self._lookup(self.result.channel)()
+    def __init__(self):
+        self.result = None
+        self.count = 0
 
+    def __repr__(self):
+        return f"ChannelSlot({self.result!r}, count={self.count})"
 
-class CoinigyStrategyData(DotObj):
-    """Object to hold all strategy data"""
-    coinigy = {
-        "apiname": "coinigy",
-        "data": {}
-    }
 
-    def __str__(self):
-        return self.coinigy.__str__()
+def store(slots, key, result):
+    """Default handler: keep a result in the slot of its key"""
+    slot = slots.get(key, None)
+    if slot is None:
+        slot = slots[key] = ChannelSlot()
+    slot.result = result
+    slot.count += 1
 
 
 class CoinigyStrategy(IStrategy):
@@ -136,39 +274,62 @@ class CoinigyStrategy(IStrategy):
     api_facade = None
     ws_facade = None
 
+    # Handlers by callname or channel response type, taking the slots, the
+    # result's slot key and the result; others are stored as they come
+    handlers = {}  # type: dict
+
     def __init__(self):
-        self._strategy_data = CoinigyStrategyData()
+        self.slots = {}  # type: dict
+        self.dispatch = dict(self.handlers)
+
+    def allocate(self, keys):
+        """Preallocate the slots of callnames or channels"""
+        for key in keys:
+            if key not in self.slots:
+                self.slots[key] = ChannelSlot()
 
     def bind(self, context):
         """Bind actions to the strategy context for a given result"""
         if self.ws_facade is None or self.api_facade is None:
-            api_context = context.get("api_context")
-            for inst in api_context.get("inst"):
-                if inst.is_connected_ws:
+            self.connect(context.get("api_context"))
+
+        result = unwrap(context.get("result"))
+        callname = result.get("callname")
+        if callname is not None:
+            key = kind = callname
+        else:
+            key = result.get("channel")
+            kind = result.get("response_type")
+        if key is not None:
+            self.dispatch.get(kind, store)(self.slots, key, result)
 
-                    self.ws_facade = CoinigyFacade(inst, api_context)
-                    if not self.possible_channels:
+        # initialze supplemented data
+        context["strategy"]["coinigy"] = {
+            "data": result,
+            "slots": self.slots,
+            "api": self.api_facade,
+            "ws": self.ws_facade,
+        }
 
-                        def pop_chans(chans):
-                            """Populate the channels on success"""
-                            self.possible_channels = chans
+        return context
 
-                        self.ws_facade.get_channels(pop_chans)
+    def connect(self, api_context):
+        """Build the facades of the API's connected instances"""
+        self.allocate(api_context["conf"].get("subscriptions", {}))
+        for inst in api_context.get("inst"):
+            if inst.is_connected_ws:
 
-                elif inst.is_connected_ws is not None:
-                    self.api_facade = \
-                        CoinigyFacade(inst, api_context)
+                self.ws_facade = CoinigyFacade(inst, api_context)
+                if not self.possible_channels:
 
-        parser = CoinigyResultParserFactory(self._strategy_data, context)
-        parser.product.interface()
+                    def pop_chans(chans):
+                        """Populate the channels on success"""
+                        self.possible_channels = chans
+                        self.allocate(api_context["shared"]
+                                      .get("channels", {}))
 
-        # initialze supplemented data
-        context["strategy"].update({
-            "coinigy": {
-                "data": parser.product.result,
-                "api": self.api_facade,
-                "ws": self.ws_facade,
-                }
-            })
+                    self.ws_facade.get_channels(pop_chans)
 
-        return context
+            elif inst.is_connected_ws is not None:
+                self.api_facade = \
+                    CoinigyFacade(inst, api_context)
@@ -0,0 +1,34 @@
+"""Order book strategy, maintaining L2 books from snapshots and streams"""
+from bors.app.strategy import IStrategy
+
+from nombot.common.orderbook import OrderBookEngine
+
+
+class OrderBookStrategy(IStrategy):
+    """
+    Feed ccxt `fetchOrderBook` results and Coinigy order channel messages
+    into an order book engine shared with the rest of the pipeline
+    """
+    name = "orderbook_strategy"
+
+    def __init__(self, depth=None):
+        self.engine = OrderBookEngine()
+        self.depth = depth
+
+    def bind(self, context):
+        """Bind actions to the strategy context for a given result"""
+        result = context.get("result")
+        data = getattr(result, "result", None)
+        if data is not None:
+            if result.callname == "fetchOrderBook":
+                self.engine.apply_order_books(data)
+            elif result.response_type == "orders" or \
+                    str(result.channel or "").startswith("ORDER"):
+                self.engine.apply_ws_orders(data)
+
+        context["strategy"].update({
+            "orderbooks": self.engine,
+            "orderbook_depth": self.depth,
+        })
+
+        return context
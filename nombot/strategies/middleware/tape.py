@@ -0,0 +1,30 @@
+"""Trade tape strategy, accumulating polled trades without duplicates"""
+from bors.app.strategy import IStrategy
+
+from nombot.common.tape import TradeTapes
+
+
+class TradeTapeStrategy(IStrategy):
+    """
+    Feed `fetchTrades` results into per-market trade tapes shared with the
+    rest of the pipeline; overlapping polls only add the new trades
+    """
+    name = "tape_strategy"
+
+    def __init__(self, capacity=1000):
+        self.tapes = TradeTapes(capacity)
+
+    def bind(self, context):
+        """Bind actions to the strategy context for a given result"""
+        result = context.get("result")
+        added = 0
+        if getattr(result, "callname", None) == "fetchTrades" and \
+                result.result is not None:
+            added = self.tapes.apply_trades(result.result)
+
+        context["strategy"].update({
+            "tapes": self.tapes,
+            "tape_added": added,
+        })
+
+        return context
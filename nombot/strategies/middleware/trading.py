@@ -1,31 +1,216 @@
 """Trading strategies"""
-import pandas as pd
+import numpy as np
 
 from bors.app.strategy import IStrategy
 
+from nombot.common.timeframe import parse_timeframe
+
+
+class Candles:
+    """
+    The most recent candles of one market and timeframe, in array ring
+    buffers written twice over so any window of them is a contiguous view
+    """
+    columns = ("time", "open", "high", "low", "close", "volume")
+
+    def __init__(self, timeframe, hist_size):
+        self.timeframe = timeframe
+        self.period = parse_timeframe(timeframe)
+        self.hist_size = hist_size
+        self.time = np.zeros(2 * hist_size, dtype=np.int64)
+        for column in self.columns[1:]:
+            setattr(self, column, np.zeros(2 * hist_size, dtype=np.float64))
+        self._slot = -1  # slot of the current candle
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _set(self, column, value):
+        """Write a value of the current candle to both of its slots"""
+        buf = getattr(self, column)
+        buf[self._slot] = buf[self._slot + self.hist_size] = value
+
+    def update(self, timestamp, price, volume=0.0):
+        """
+        Fold a price (and traded volume) into the candle of its period,
+        returning whether a new candle was opened; prices older than the
+        current candle are ignored
+        """
+        return self.fold(timestamp, price, price, price, price, volume)
+
+    def fold(self, timestamp, open_, high, low, close, volume=0.0):
+        """Fold a candle of the same or a shorter timeframe, as `update`"""
+        start = timestamp - timestamp % self.period
+        if self.count:
+            current = self.time[self._slot]
+            if start < current:
+                return False
+            if start == current:
+                if high > self.high[self._slot]:
+                    self._set("high", high)
+                if low < self.low[self._slot]:
+                    self._set("low", low)
+                self._set("close", close)
+                self._set("volume", self.volume[self._slot] + volume)
+                return False
+
+        self._slot = (self._slot + 1) % self.hist_size
+        self.count = min(self.count + 1, self.hist_size)
+        for column, value in zip(self.columns,
+                                 (start, open_, high, low, close, volume)):
+            self._set(column, value)
+        return True
+
+    def current(self):
+        """Return the candle being built, or None before the first price"""
+        if not self.count:
+            return None
+        return {column: getattr(self, column)[self._slot].item()
+                for column in self.columns}
+
+    def window(self, size=None, closed=False):
+        """
+        Return read-only views of the `size` most recent candles, oldest
+        first, keyed by column; `closed` leaves the current candle out
+        """
+        available = self.count - 1 if closed and self.count else self.count
+        size = available if size is None else min(size, available)
+        end = self._slot + self.hist_size + 1
+        if closed:
+            end -= 1
+        views = {}
+        for column in self.columns:
+            view = getattr(self, column)[end - size:end]
+            view.flags.writeable = False
+            views[column] = view
+        return views
+
+    def closed(self, size=None):
+        """Return views of the `size` most recent closed candles"""
+        return self.window(size, closed=True)
+
 
 class OHLCV:
     """Implementation of OHLCV data (open, high, low, close, volume)"""
-    history = pd.DataFrame()
-
-    def __init__(self, hist_size):
+    def __init__(self, hist_size, timeframes=("1m", "5m", "1h")):
         self.hist_size = hist_size
+        self.timeframes = tuple(timeframes)
+        for timeframe in self.timeframes:
+            parse_timeframe(timeframe)
+        self.candles = {}  # type: dict
+        self.seen = {}  # type: dict  # newest trade time and ids, by market
+        self.polled = {}  # type: dict  # last candle folded, by timeframe
+
+    def series(self, exchange, market):
+        """Return the candles of a market for every timeframe"""
+        key = (exchange, market)
+        series = self.candles.get(key, None)
+        if series is None:
+            series = self.candles[key] = {
+                timeframe: Candles(timeframe, self.hist_size)
+                for timeframe in self.timeframes
+            }
+        return series
+
+    def add(self, exchange, market, timestamp, price, volume=0.0):
+        """Fold a price into every timeframe of a market"""
+        for candles in self.series(exchange, market).values():
+            candles.update(timestamp, price, volume)
+
+    def add_candles(self, exchange, market, candles):
+        """
+        Fold columns of candles (as prepared by `OHLCVSchema`) into the
+        timeframes they can build, judging their own timeframe from the
+        spacing of their timestamps.  Polls overlap, so candles older than
+        the last one folded are skipped, and the last one, which was still
+        open when last polled, only folds in the volume it has gained since.
+        """
+        times = np.asarray(candles["timestamp"])
+        if len(times) < 2:
+            return
+        period = int(np.diff(times).min())
+        if period <= 0:
+            return
+        targets = [target for target in self.series(exchange, market).values()
+                   if target.period % period == 0]
+        key = (exchange, market, period)
+        last, folded = self.polled.get(key, (None, 0.0))
+        for row in zip(times.tolist(), candles["open"], candles["high"],
+                       candles["low"], candles["close"], candles["volume"]):
+            if last is not None and row[0] < last:
+                continue
+            volume = row[5] - folded if row[0] == last else row[5]
+            for target in targets:
+                target.fold(*row[:5], volume)
+            last, folded = row[0], row[5]
+        self.polled[key] = (last, folded)
+
+    def add_trades(self, trades):
+        """Fold the traded prices and amounts of trades not yet seen"""
+        for trade in trades:
+            if trade.get("timestamp") is not None and self.is_new(trade):
+                self.add(trade["exchange"], trade["symbol"],
+                         trade["timestamp"], trade["price"],
+                         trade.get("amount") or 0.0)
+
+    def is_new(self, trade):
+        """
+        Whether a trade is newer than those seen on its market; polls of
+        recent trades overlap, so trades at the newest timestamp seen are
+        told apart by id (those without one are taken as seen)
+        """
+        key = (trade["exchange"], trade["symbol"])
+        timestamp, trade_id = trade["timestamp"], trade.get("id")
+        newest, ids = self.seen.get(key, (None, None))
+        if newest is not None and timestamp < newest:
+            return False
+        if timestamp == newest:
+            if trade_id is None or trade_id in ids:
+                return False
+            ids.add(trade_id)
+            return True
+        self.seen[key] = (timestamp, {trade_id})
+        return True
+
+    def add_tickers(self, ticks):
+        """Fold the last prices of tickers"""
+        if not isinstance(ticks, list):
+            ticks = [ticks]
+        for tick in ticks:
+            # tickers carry rolling 24h volumes, not traded amounts
+            if tick.get("timestamp") is not None and \
+                    tick.get("last") is not None:
+                self.add(tick["exchange"], tick["symbol"],
+                         tick["timestamp"], tick["last"])
 
     def update(self, data):
         """Update the data using the latest information"""
-        pass
+        result = data.get("result")
+        callname = getattr(result, "callname", None)
+        items = getattr(result, "result", None)
+        if items is None:
+            return
+        if callname == "fetchTrades":
+            self.add_trades(items)
+        elif callname == "fetchOHLCV":
+            for candles in items:
+                self.add_candles(candles["exchange"], candles["market"],
+                                 candles)
+        elif callname in ("fetchTicker", "fetchTickers"):
+            self.add_tickers(items)
 
     def dump(self):
         """Dump the data for the strategy pipeline"""
-        pass
+        return self.candles
 
 
 class OHLCVStrategy(IStrategy):
     """Strategy to supplement/act upon incoming data"""
     name = "ohlc_strategy"
 
-    def __init__(self, hist_size=100):
-        self._data = OHLCV(hist_size)
+    def __init__(self, hist_size=100, timeframes=("1m", "5m", "1h")):
+        self._data = OHLCV(hist_size, timeframes)
         self.hist_size = hist_size
 
     def bind(self, context):
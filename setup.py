@@ -17,6 +17,8 @@ requirements = [
     'urllib3',
     'bors',
     'click',
+    'numpy',
+    'sortedcontainers',
 ]
 
 test_requirements = [
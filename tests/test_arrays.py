@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test the NumPy-backed result decoders"""
+
+
+import unittest
+
+import numpy as np
+
+from nombot.generics.arrays import decode_ohlcv, decode_order_books
+from nombot.generics.exchange import OHLCVSchema, OrderBookSchema
+
+
+def order_books():
+    """ccxt-like fetchOrderBook results as CCXTApi returns them"""
+    data = {"result": {
+        "bittrex": {
+            "BTC/USD": {"bids": [[9.0, 1.0], [8.0, 2.0]],
+                        "asks": [[10.0, 0.5]],
+                        "timestamp": 1, "datetime": "a", "nonce": 7},
+            "ETH/USD": {"bids": [], "asks": [[5.0, 1.0, 3]],
+                        "timestamp": 2, "datetime": "b", "nonce": None},
+        },
+        "coinbase": {
+            "BTC/USD": {"bids": [[9.5, 1.0]], "asks": [[9.6, 1.0]],
+                        "timestamp": 3, "datetime": "c", "nonce": None},
+        },
+    }}
+    data["result"]["result"] = data["result"]
+    return data
+
+
+class TestDecodeOrderBooks(unittest.TestCase):
+    """Tests for the order book decoder"""
+
+    def setUp(self):
+        """Set up test fixtures, if any"""
+        self.books = decode_order_books(order_books())
+
+    def test_keying(self):
+        """Books are keyed as OrderBookSchema.prepare keys them"""
+        expected = [(book["exchange"], book["market"])
+                    for book in OrderBookSchema().prepare(order_books())]
+        self.assertListEqual(
+            [(book["exchange"], book["market"]) for book in self.books],
+            expected)
+
+    def test_arrays(self):
+        """Sides are contiguous float64 (n, 2) arrays"""
+        for book in self.books:
+            for side in ("bids", "asks"):
+                self.assertEqual(book[side].dtype, np.float64)
+                self.assertEqual(book[side].shape[1], 2)
+                self.assertTrue(book[side].flags["C_CONTIGUOUS"])
+
+        np.testing.assert_array_equal(self.books[0]["bids"],
+                                      [[9.0, 1.0], [8.0, 2.0]])
+
+    def test_empty_and_extra(self):
+        """Empty sides and extra level fields are handled"""
+        book = self.books[1]
+        self.assertEqual(book["bids"].shape, (0, 2))
+        np.testing.assert_array_equal(book["asks"], [[5.0, 1.0]])
+        self.assertEqual(book["timestamp"], 2)
+
+    def test_ragged(self):
+        """Levels with differing numbers of fields are decoded"""
+        data = order_books()
+        data["result"]["bittrex"]["BTC/USD"]["bids"] = [[9.0, 1.0, 2],
+                                                        [8.0, 2.0]]
+        data["result"]["bittrex"]["BTC/USD"]["asks"] = None
+        book = decode_order_books(data)[0]
+        np.testing.assert_array_equal(book["bids"],
+                                      [[9.0, 1.0], [8.0, 2.0]])
+        self.assertEqual(book["asks"].shape, (0, 2))
+
+
+class TestDecodeOHLCV(unittest.TestCase):
+    """Tests for the candle decoder"""
+
+    def test_columns(self):
+        """Candles are decoded into array columns, keyed as prepared"""
+        data = {"result": {"bittrex": {
+            "BTC/USD": [[1, 2.0, 3.0, 1.0, 2.5, 9.0],
+                        [2, 2.5, 3.5, 2.0, 3.0, 8.0]],
+            "ETH/USD": []}}}
+        btc, eth = decode_ohlcv(data)
+        prepared = list(OHLCVSchema().prepare(data))[0]
+        for column in OHLCVSchema.columns:
+            self.assertIsInstance(btc[column], np.ndarray)
+            self.assertEqual(list(btc[column]), prepared[column])
+        self.assertEqual(btc["timestamp"].dtype, np.int64)
+        self.assertEqual(btc["close"].dtype, np.float64)
+        self.assertEqual((eth["market"], eth["volume"].shape),
+                         ("ETH/USD", (0,)))
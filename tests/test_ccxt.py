@@ -0,0 +1,535 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test the ccxt facade against stubbed exchanges"""
+
+
+import asyncio
+import logging
+import multiprocessing
+import sys
+import time
+import types
+import unittest
+
+try:
+    import ccxt.async_support  # noqa: F401 pylint: disable=unused-import
+    from ccxt.base.errors import ExchangeError, RequestTimeout
+except ImportError:
+    # Without ccxt, stand in for the modules the facade imports, keeping
+    # the hierarchy of its errors; every exchange the tests use is stubbed
+    # below anyway
+    class BaseError(Exception):
+        """ccxt's base error"""
+
+    class ExchangeError(BaseError):
+        """ccxt's exchange error"""
+
+    class NetworkError(BaseError):
+        """ccxt's network error"""
+
+    class ExchangeNotAvailable(NetworkError):
+        """ccxt's unavailable exchange error"""
+
+    class RequestTimeout(NetworkError):
+        """ccxt's request timeout"""
+
+    ERRORS = types.ModuleType("ccxt.base.errors")
+    for error in (BaseError, ExchangeError, NetworkError,
+                  ExchangeNotAvailable, RequestTimeout):
+        setattr(ERRORS, error.__name__, error)
+    ASYNC = types.ModuleType("ccxt.async_support")
+    ASYNC.exchanges = []
+    CCXT_MODULE = types.ModuleType("ccxt")
+    CCXT_MODULE.async_support = ASYNC
+    CCXT_MODULE.base = types.ModuleType("ccxt.base")
+    CCXT_MODULE.base.errors = ERRORS
+    sys.modules.update({
+        "ccxt": CCXT_MODULE,
+        "ccxt.async_support": ASYNC,
+        "ccxt.base": CCXT_MODULE.base,
+        "ccxt.base.errors": ERRORS,
+    })
+
+# pylint: disable=wrong-import-position
+from nombot.api.services import ccxt as service  # noqa: E402
+from nombot.common.ratelimit import RateLimiter  # noqa: E402
+
+
+MARKETS = {
+    "BTC/USD": {"symbol": "BTC/USD", "base": "BTC", "quote": "USD"},
+    "ETH/BTC": {"symbol": "ETH/BTC", "base": "ETH", "quote": "BTC"},
+    "ETH/USD": {"symbol": "ETH/USD", "base": "ETH", "quote": "USD"},
+    "XRP/EUR": {"symbol": "XRP/EUR", "base": "XRP", "quote": "EUR"},
+}
+
+MINUTE = 60 * 1000
+
+
+class StubExchange:
+    """An exchange answering from memory, counting its calls"""
+    name = "stub"
+    delay = 0.0  # seconds each fetch takes
+    fail_load = False
+    error = None  # raised by every fetch of a ticker
+    has = {"fetchTicker": True, "fetchTickers": True,
+           "fetchOrderBook": True, "fetchOrderBooks": "emulated",
+           "fetchBalance": True, "createOrder": True, "fetchOHLCV": True}
+
+    def __init__(self, config=None):
+        self.config = config
+        self.rateLimit = 1  # pylint: disable=invalid-name
+        self.apiKey = self.secret = None  # pylint: disable=invalid-name
+        self.enableRateLimit = True  # pylint: disable=invalid-name
+        self.markets = self.currencies = self.symbols = None
+        self.calls = []  # type: list
+        self.in_flight = self.max_in_flight = 0
+        self.failing = set()  # type: set  # symbols raising errors
+
+    async def load_markets(self, reload=False):
+        """Load the stubbed markets"""
+        self.calls.append("load_markets")
+        await asyncio.sleep(0.01)
+        if self.fail_load:
+            raise ExchangeError("cannot load markets")
+        self.set_markets(MARKETS, {cur: {"code": cur} for cur in
+                                   ("BTC", "ETH", "EUR", "USD", "XRP")})
+        return self.markets
+
+    def set_markets(self, markets, currencies):
+        """Set the markets, as ccxt does"""
+        self.markets = dict(markets)
+        self.currencies = dict(currencies)
+        self.symbols = sorted(markets)
+
+    async def fetchTicker(self, symbol):  # pylint: disable=invalid-name
+        """Fetch one ticker"""
+        self.calls.append(("fetchTicker", symbol))
+        if self.error is not None:
+            raise self.error(f"{self.name} timed out (10000 ms)")
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if symbol in self.failing:
+            raise ExchangeError(f"no ticker for {symbol}")
+        return {"symbol": symbol, "exchange": self.name}
+
+    async def fetchTickers(self, symbols=None):  # pylint: disable=C0103
+        """Fetch many tickers in one request"""
+        self.calls.append(("fetchTickers", tuple(symbols or ())))
+        await asyncio.sleep(self.delay)
+        return {sym: {"symbol": sym, "exchange": self.name}
+                for sym in MARKETS}
+
+    async def fetchOHLCV(self, symbol, timeframe="1m", since=None,
+                         limit=None):  # pylint: disable=invalid-name
+        """Fetch `limit` one-minute candles from `since`"""
+        self.calls.append(("fetchOHLCV", symbol, since))
+        await asyncio.sleep(self.delay)
+        return [[since + num * MINUTE, 1.0, 2.0, 0.5, 1.5, 10.0]
+                for num in range(limit)]
+
+    async def fetchBalance(self):  # pylint: disable=invalid-name
+        """Fetch the account's balance"""
+        self.calls.append("fetchBalance")
+        return {"free": {"USD": 1000.0}, "used": {"USD": 0.0},
+                "total": {"USD": 1000.0}}
+
+    async def createOrder(self, symbol, kind, side, amount,
+                          price=None):  # pylint: disable=invalid-name
+        """Place an order"""
+        self.calls.append(("createOrder", symbol, kind, side, amount))
+        return {"id": "1", "symbol": symbol, "type": kind, "side": side,
+                "amount": amount, "remaining": amount, "filled": 0.0,
+                "price": price, "status": "open", "timestamp": None}
+
+    async def close(self):
+        """Nothing to close"""
+
+
+class SlowExchange(StubExchange):
+    """An exchange slower than any timeout the tests set"""
+    name = "slow"
+    delay = 1.0
+
+
+class BrokenExchange(StubExchange):
+    """An exchange whose markets cannot be loaded"""
+    name = "broken"
+    fail_load = True
+
+
+class TimingOutExchange(StubExchange):
+    """An exchange whose requests time out in ccxt"""
+    name = "timing_out"
+    error = RequestTimeout
+
+
+class EmulatedExchange(StubExchange):
+    """An exchange whose bulk calls are emulated by ccxt"""
+    name = "emulated"
+    has = dict(StubExchange.has, fetchTickers="emulated")
+
+
+class FacadeTestCase(unittest.TestCase):
+    """Runs a facade over stubbed exchanges"""
+
+    def setUp(self):
+        """Set up test fixtures, if any"""
+        self.module_ccxt = service.ccxt
+        service.ccxt = types.SimpleNamespace(
+            stub=StubExchange, slow=SlowExchange, broken=BrokenExchange,
+            emulated=EmulatedExchange, timing_out=TimingOutExchange,
+            exchanges=["stub"])
+        service.CCXT._ex = {}
+        RateLimiter._buckets = {}  # pylint: disable=protected-access
+        self.facade = None
+
+    def tearDown(self):
+        """Tear down test fixtures, if any"""
+        if self.facade is not None:
+            self.facade.shutdown()
+        service.ccxt = self.module_ccxt
+
+    def make(self, overrides=None, **conf):
+        """Create the facade with the exchanges and settings given"""
+        conf = dict({"exchanges": ["stub"],
+                     "currencies": ["BTC", "ETH", "USD"]}, **conf)
+        self.facade = service.CCXT(logging.getLogger("test"), conf,
+                                   {"credentials": None}, overrides)
+        return self.facade
+
+    def exchanges(self):
+        """The facade's exchanges, by name"""
+        return self.facade._ex  # pylint: disable=protected-access
+
+    def stub(self, name="stub"):
+        """The stubbed ccxt object of an exchange"""
+        return self.exchanges()[name]._ex  # pylint: disable=W0212
+
+
+class TestFanOut(FacadeTestCase):
+    """Tests for calls fanned out over exchanges"""
+
+    def test_concurrent(self):
+        """Exchanges are called at once; slow ones are left out"""
+        facade = self.make(exchanges=["stub", "slow"], concurrent=True,
+                           timeout=0.2)
+        start = time.time()
+        results = facade.call_on_exchanges("call", "fetchTicker", "BTC/USD")
+        self.assertLess(time.time() - start, 0.9)
+        self.assertEqual(results,
+                         {"stub": {"symbol": "BTC/USD", "exchange": "stub"}})
+
+    def test_network_errors(self):
+        """Exchanges failing with network errors are dropped from calls"""
+        for concurrent in (True, False):
+            with self.subTest(concurrent=concurrent):
+                facade = self.make(exchanges=["stub", "timing_out"],
+                                   concurrent=concurrent)
+                results = facade.call_on_exchanges("call", "fetchTicker",
+                                                   "BTC/USD")
+                self.assertEqual(list(results), ["stub"])
+                results = facade.call_on_exchanges("call_over_syms",
+                                                   "fetchTicker")
+                self.assertEqual(list(results), ["stub"])
+                facade.shutdown()
+                self.facade = None
+
+    def test_cycle(self):
+        """Without `concurrent`, exchanges are called in turn"""
+        facade = self.make(exchanges=["stub", "emulated"])
+        results = facade.call_on_exchanges("call", "fetchTicker", "ETH/BTC")
+        self.assertEqual(sorted(results), ["emulated", "stub"])
+
+
+class TestSweep(FacadeTestCase):
+    """Tests for calls swept over the configured symbols"""
+
+    def test_bounded(self):
+        """Concurrent sweeps keep within the exchange's concurrency"""
+        facade = self.make(concurrent=True, concurrency=2)
+        self.stub().delay = 0.02
+        results = facade.call_on_exchanges("call_over_syms", "fetchTicker")
+        self.assertEqual(sorted(results["stub"]),
+                         ["BTC/USD", "ETH/BTC", "ETH/USD"])
+        self.assertEqual(self.stub().max_in_flight, 2)
+
+    def test_failing_symbols(self):
+        """Symbols that fail are left out of the results"""
+        facade = self.make(concurrent=True)
+        self.stub().failing.add("ETH/BTC")
+        results = facade.call_on_exchanges("call_over_syms", "fetchTicker")
+        self.assertEqual(sorted(results["stub"]), ["BTC/USD", "ETH/USD"])
+
+        facade.concurrent = False
+        for ex in self.exchanges().values():
+            ex.concurrent = False
+        results = facade.call_on_exchanges("call_over_syms", "fetchTicker")
+        self.assertEqual(sorted(results["stub"]), ["BTC/USD", "ETH/USD"])
+
+
+class TestPlan(FacadeTestCase):
+    """Tests for bulk call planning"""
+
+    def test_native_bulk(self):
+        """Native bulk calls replace sweeps, keeping configured symbols"""
+        facade = self.make({"fetchTicker": "call_over_syms",
+                            "fetchOrderBook": "call_over_syms"},
+                           exchanges=["stub", "emulated"])
+        plans = {name: ex.plan for name, ex in self.exchanges().items()}
+        self.assertEqual(plans["stub"]["fetchTicker"], "call_bulk")
+        self.assertEqual(plans["stub"]["fetchOrderBook"], "call_over_syms")
+        self.assertEqual(plans["emulated"]["fetchTicker"], "call_over_syms")
+
+        results = facade.call_on_exchanges("call_over_syms", "fetchTicker")
+        self.assertEqual(sorted(results["stub"]),
+                         ["BTC/USD", "ETH/BTC", "ETH/USD"])
+        self.assertEqual([call for call in self.stub().calls
+                          if call != "load_markets"],
+                         [("fetchTickers", ("BTC/USD", "ETH/BTC", "ETH/USD"))])
+        self.assertEqual(len([call for call in self.stub("emulated").calls
+                              if call != "load_markets"]), 3)
+
+
+class TestBootstrap(FacadeTestCase):
+    """Tests for loading exchange markets"""
+
+    def test_bootstrap(self):
+        """Markets load at start; exchanges failing to load are dropped"""
+        facade = self.make(exchanges=["stub", "broken"])
+        self.assertEqual(list(facade.load_times()), ["stub"])
+        self.assertEqual(facade.index.exchanges("BTC", "USD"), {"stub"})
+        self.assertEqual(sorted(self.exchanges()["stub"].markets),
+                         ["BTC/USD", "ETH/BTC", "ETH/USD"])
+
+    def test_lazy(self):
+        """Lazy markets load once, on first use"""
+        facade = self.make(lazy=True, concurrent=True)
+        self.assertEqual(facade.load_times(), {"stub": None})
+        self.assertEqual(self.stub().calls, [])
+        facade.call_on_exchanges("call_over_syms", "fetchTicker")
+        self.assertEqual(self.stub().calls.count("load_markets"), 1)
+        self.assertIsNotNone(facade.load_times()["stub"])
+
+
+class TestHealth(FacadeTestCase):
+    """Tests for circuit breaking in the facade"""
+
+    def trip(self, *target):
+        """Open the circuit of an exchange or symbol, cooled down"""
+        health = self.facade.health.get(*target)
+        for _ in range(health.outcomes.maxlen):
+            health.failure()
+        health.cooldown = 0
+        return health
+
+    def test_filters_keep_probe(self):
+        """Skipped calls leave open circuits as they were"""
+        facade = self.make(concurrent=True)
+        health = self.trip("stub", "ETH/BTC")
+        self.assertIn("ETH/BTC", self.exchanges()["stub"].healthy_syms())
+        exchange = self.trip("stub")
+        facade.healthy_exchanges("fetchTicker")
+        self.assertEqual((health.state, exchange.state),
+                         (health.OPEN, health.OPEN))
+
+    def test_symbol_outage(self):
+        """Exchanges whose every symbol fails record a failure"""
+        facade = self.make(concurrent=True)
+        self.stub().failing.update(MARKETS)
+        results = facade.call_on_exchanges("call_over_syms", "fetchTicker")
+        self.assertEqual(results, {})
+        self.assertEqual(list(facade.health.get("stub").outcomes), [True])
+
+    def test_probe_resolves(self):
+        """The probe of a half-open circuit records its outcome"""
+        facade = self.make(concurrent=True)
+        exchange = self.trip("stub")
+        symbol = self.trip("stub", "ETH/BTC")
+        self.stub().failing.add("ETH/BTC")
+        results = facade.call_on_exchanges("call_over_syms", "fetchTicker")
+        self.assertEqual(sorted(results["stub"]), ["BTC/USD", "ETH/USD"])
+        self.assertEqual((exchange.state, symbol.state),
+                         (exchange.CLOSED, symbol.OPEN))
+
+
+class TestCache(FacadeTestCase):
+    """Tests for responses served from the cache"""
+
+    def test_shared(self):
+        """Fresh results are served from the cache, uncopied"""
+        facade = self.make()
+        first = facade.call_on_exchanges("call", "fetchTicker", "BTC/USD")
+        second = facade.call_on_exchanges("call", "fetchTicker", "BTC/USD")
+        self.assertIs(second["stub"], first["stub"])
+        self.assertEqual(self.stub().calls.count(("fetchTicker", "BTC/USD")),
+                         1)
+
+    def test_recovering(self):
+        """Exchanges whose circuit is not closed are probed, not cached"""
+        facade = self.make()
+        facade.call_on_exchanges("call", "fetchTicker", "BTC/USD")
+        health = facade.health.get("stub")
+        for _ in range(health.outcomes.maxlen):
+            health.failure()
+        health.cooldown = 0
+        facade.call_on_exchanges("call", "fetchTicker", "BTC/USD")
+        self.assertEqual(self.stub().calls.count(("fetchTicker", "BTC/USD")),
+                         2)
+        self.assertEqual(health.state, health.CLOSED)
+
+
+class TestLedgers(FacadeTestCase):
+    """Tests for the balance ledgers of the API facade"""
+
+    def api(self):
+        """Create the API facade, following balances on a ledger"""
+        api = service.CCXTApi({
+            "conf": {"exchanges": ["stub"], "balance_ledger": True},
+            "credentials": [{"name": "stub", "apiKey": "key",
+                             "secret": "secret"}],
+            "log_level": "WARNING",
+            "shared": {},
+        })
+        self.facade = api.ccxt
+        return api
+
+    def test_fetch_balance(self):
+        """
+        Balances are served from ledgers once the process that seeded them
+        follows orders of its own
+        """
+        api = self.api()
+        api.call("fetchBalance")
+        api.call("fetchBalance")
+        self.assertEqual(self.stub().calls.count("fetchBalance"), 2)
+
+        api.call("createOrder", "BTC/USD", "limit", "buy", 2.0, 100.0)
+        self.assertEqual(api.call("fetchBalance")["stub"]["free"]["USD"],
+                         800.0)
+        self.assertEqual(self.stub().calls.count("fetchBalance"), 2)
+
+    def test_other_process(self):
+        """Orders placed in another process leave the seed to be refetched"""
+        api = self.api()
+        api.call("fetchBalance")
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+
+        def trade():
+            api.call("createOrder", "BTC/USD", "limit", "buy", 2.0, 100.0)
+            api.call("fetchBalance")
+            results.put(self.stub().calls.count("fetchBalance"))
+        child = context.Process(target=trade)
+        child.start()
+        child.join(10)
+        self.assertEqual(child.exitcode, 0)
+        # the child's exchange is made anew, so this is its own fetch
+        self.assertEqual(results.get(timeout=1), 1)
+
+        api.call("fetchBalance")
+        self.assertEqual(self.stub().calls.count("fetchBalance"), 2)
+
+    def test_submit(self):
+        """Submitted calls are recorded before their future resolves"""
+        api = self.api()
+        api.call("fetchBalance")
+        order = api.submit("createOrder", "BTC/USD", "limit", "buy", 2.0,
+                           100.0).result(5)
+        self.assertEqual(order["stub"]["id"], "1")
+        self.assertEqual(api.ledgers.get("stub", "key").free("USD"), 800.0)
+
+
+class TestBackfill(FacadeTestCase):
+    """Tests for candle backfills"""
+
+    def test_pages(self):
+        """Pages of candles are fetched concurrently and merged"""
+        facade = self.make(currencies=["BTC", "USD"])
+        results = facade.backfill_ohlcv("1m", 10 / 1440, 4)
+        candles = results["stub"]["BTC/USD"]
+        self.assertEqual(len(candles), 10)
+        self.assertEqual([candle[0] - candles[0][0] for candle in candles],
+                         [num * MINUTE for num in range(10)])
+        self.assertEqual(len([call for call in self.stub().calls
+                              if call[0] == "fetchOHLCV"]), 3)
+
+    def test_timeout(self):
+        """Backfills outlasting `call_timeout` give up with no results"""
+        facade = self.make(exchanges=["slow"], call_timeout=0.2)
+        start = time.time()
+        self.assertEqual(facade.backfill_ohlcv("1m", 10 / 1440, 4), {})
+        self.assertLess(time.time() - start, 0.9)
+
+    def test_api(self):
+        """The API sends backfilled candles down the pipeline as arrays"""
+        received = []
+        api = service.CCXTApi({
+            "conf": {"exchanges": ["stub"], "currencies": ["BTC", "USD"],
+                     "array_candles": True},
+            "credentials": None,
+            "log_level": "WARNING",
+            "shared": {},
+            "callback": lambda result, context: received.append(result),
+        })
+        self.facade = api.ccxt
+        decoders = api.result_schema.decoders
+        api.result_schema = lambda: DecodingSchema(decoders)
+        api.backfill(10 / 1440, limit=4)
+
+        candles, = received[0].result
+        self.assertEqual((candles["exchange"], candles["market"]),
+                         ("stub", "BTC/USD"))
+        self.assertEqual(candles["volume"].tolist(), [10.0] * 10)
+        self.assertEqual(received[0].callname, "fetchOHLCV")
+
+
+class DecodingSchema:
+    """Loads results with decoders only, as the response schema does"""
+    def __init__(self, decoders):
+        self.decoders = decoders
+        self.context = {}
+
+    def load(self, data):
+        """Decode the results of the call named in the context"""
+        callname = self.context["callname"]
+        return types.SimpleNamespace(
+            callname=callname,
+            result=self.decoders[callname]({"result": data}))
+
+
+class TestRuntime(FacadeTestCase):
+    """Tests for the facade's loop across processes and slow calls"""
+
+    def test_forked(self):
+        """A forked process runs calls on a loop of its own"""
+        facade = self.make(concurrent=True)
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+
+        def call():
+            results.put(facade.call_on_exchanges("call", "fetchTicker",
+                                                 "BTC/USD"))
+        child = context.Process(target=call)
+        child.start()
+        child.join(10)
+        self.assertEqual(child.exitcode, 0)
+        self.assertEqual(results.get(timeout=1),
+                         {"stub": {"symbol": "BTC/USD", "exchange": "stub"}})
+        self.assertFalse(facade.runtime.forked)
+
+    def test_call_timeout(self):
+        """Calls outlasting `call_timeout` give up with no results"""
+        facade = self.make(exchanges=["slow"], call_timeout=0.2)
+        start = time.time()
+        self.assertEqual(
+            facade.call_on_exchanges("call", "fetchTicker", "BTC/USD"), {})
+        self.assertLess(time.time() - start, 0.9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test the Coinigy REST facade's market data requests"""
+
+
+import sys
+import threading
+import time
+import types
+import unittest
+
+try:
+    import socketclusterclient  # noqa: F401 pylint: disable=unused-import
+except ImportError:
+    # Without the websocket client, stand in for the module bors imports;
+    # the tests make no websocket connections
+    SOCKETCLUSTER = types.ModuleType("socketclusterclient")
+    SOCKETCLUSTER.Socketcluster = types.SimpleNamespace(socket=None)
+    sys.modules["socketclusterclient"] = SOCKETCLUSTER
+
+# pylint: disable=wrong-import-position
+from nombot.api.services.coinigy import Coinigy, split_data  # noqa: E402
+
+
+def response(data_type):
+    """A "data" response of a type"""
+    data = {"exch_code": "GDAX", "primary_curr_code": "BTC",
+            "secondary_curr_code": "USD", "type": data_type}
+    for part in ("history", "asks", "bids"):
+        if data_type in (part, "all") or \
+                (data_type == "orders" and part != "history"):
+            data[part] = [{"part": part}]
+    return {"data": data, "notifications": []}
+
+
+class TestSplitData(unittest.TestCase):
+    """Tests for cutting a type out of a market data response"""
+
+    def test_parts(self):
+        """Each type keeps its own parts, sharing their lists"""
+        full = response("all")
+        orders = split_data(full, "orders")
+        self.assertEqual(sorted(orders["data"]),
+                         ["asks", "bids", "exch_code", "primary_curr_code",
+                          "secondary_curr_code", "type"])
+        self.assertEqual(orders["data"]["type"], "orders")
+        self.assertIs(orders["data"]["asks"], full["data"]["asks"])
+        self.assertNotIn("history", split_data(full, "bids")["data"])
+        self.assertEqual(full["data"]["type"], "all")
+
+    def test_errors(self):
+        """Responses without data are passed through"""
+        error = {"err_num": "1", "err_msg": "no"}
+        self.assertIs(split_data(error, "bids"), error)
+        self.assertIsNone(split_data(None, "bids"))
+
+
+class TestCall(unittest.TestCase):
+    """Tests for coalesced market data requests"""
+
+    def setUp(self):
+        """Set up test fixtures, if any"""
+        self.coinigy = Coinigy({
+            "conf": {"endpoints": {"rest": "https://api.example.com/api/v1"},
+                     "subscriptions": {}},
+            "credentials": {"apikey": "key", "secret": "secret"},
+            "log_level": "WARNING",
+        })
+        self.requests = []
+        self.release = threading.Event()
+        self.coinigy.req.call = self.fake_call
+
+    def fake_call(self, callname, data=None, **_):
+        """Answer a request once released, recording it"""
+        self.requests.append((callname, dict(data or {})))
+        self.release.wait(5)
+        return response((data or {}).get("type", "all"))
+
+    def data(self, data_type):
+        """Request market data of a type"""
+        return self.coinigy.call("data", {"exchange_code": "GDAX",
+                                          "exchange_market": "BTC/USD",
+                                          "type": data_type})
+
+    def test_single(self):
+        """Lone requests are sent as their own type"""
+        self.release.set()
+        self.assertEqual(self.data("bids")["data"]["type"], "bids")
+        self.assertEqual(self.requests[0][1]["type"], "bids")
+
+    def test_covered(self):
+        """Requests join one in flight covering their type"""
+        results = {}
+
+        def request(data_type):
+            """Request from a thread"""
+            results[data_type] = self.data(data_type)
+
+        leader = threading.Thread(target=request, args=("orders",))
+        leader.start()
+        while not self.requests:
+            self.release.wait(0.001)
+        followers = [threading.Thread(target=request, args=(data_type,))
+                     for data_type in ("asks", "history")]
+        for thread in followers:
+            thread.start()
+        while len(self.requests) < 2:
+            self.release.wait(0.001)
+        time.sleep(0.05)  # for the asks request to join too
+        self.release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        self.assertEqual(sorted(req[1]["type"] for req in self.requests),
+                         ["history", "orders"])
+        self.assertEqual(results["asks"]["data"]["asks"],
+                         [{"part": "asks"}])
+        self.assertNotIn("bids", results["asks"]["data"])
+        self.assertEqual(results["history"]["data"]["type"], "history")
+
+    def test_merged(self):
+        """Types requested within the merge window share one request"""
+        self.coinigy.merge_window = 0.1
+        self.release.set()
+        results = {}
+
+        def request(data_type):
+            """Request from a thread"""
+            results[data_type] = self.data(data_type)
+
+        for data_types, merged in ((("asks", "bids"), "orders"),
+                                   (("history", "bids", "asks"), "all")):
+            threads = [threading.Thread(target=request, args=(data_type,))
+                       for data_type in data_types]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+            self.assertEqual(self.requests.pop()[1]["type"], merged)
+            self.assertEqual(self.requests, [])
+            for data_type in data_types:
+                self.assertEqual(results[data_type]["data"]["type"],
+                                 data_type)
+            self.assertNotIn("bids", results["asks"]["data"])
+
+    def test_other_calls(self):
+        """Other calls are made as they are"""
+        self.release.set()
+        self.coinigy.call("accounts")
+        self.assertEqual(self.requests, [("accounts", {})])
+
+
+if __name__ == "__main__":
+    unittest.main()
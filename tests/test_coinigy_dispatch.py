@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test the Coinigy strategy's result dispatch"""
+
+
+import unittest
+
+from nombot.api.coinigy_response import Result
+from nombot.strategies.middleware.coinigy import CoinigyStrategy
+
+
+CHAN = "TRADE-GDAX--BTC--USD"
+
+
+class TestCoinigyDispatch(unittest.TestCase):
+    """Tests for the dispatch table and channel slots"""
+
+    def setUp(self):
+        """Set up test fixtures, if any"""
+        self.strategy = CoinigyStrategy()
+        self.strategy.api_facade = self.strategy.ws_facade = object()
+
+    def bind(self, **kwargs):
+        """Bind a result, returning the supplemented data"""
+        context = {"result": Result(**kwargs), "strategy": {}}
+        return self.strategy.bind(context)["strategy"]["coinigy"]
+
+    def test_slots(self):
+        """Results land in the slot of their callname or channel"""
+        self.strategy.allocate([CHAN])
+        slot = self.strategy.slots[CHAN]
+        data = self.bind(channel=CHAN, response_type="trade", result=1)
+        self.bind(channel=CHAN, response_type="trade", result=2)
+        self.bind(callname="accounts", result=[])
+        self.assertIs(self.strategy.slots[CHAN], slot)
+        self.assertEqual((slot.result.result, slot.count), (2, 2))
+        self.assertEqual(self.strategy.slots["accounts"].count, 1)
+        self.assertIs(data["slots"], self.strategy.slots)
+
+    def test_handlers(self):
+        """Handlers are dispatched by callname or response type"""
+        seen = []
+        self.strategy.dispatch["trade"] = \
+            lambda slots, key, result: seen.append((key, result.result))
+        data = self.bind(channel=CHAN, response_type="trade", result=3)
+        self.assertEqual(seen, [(CHAN, 3)])
+        self.assertEqual(data["data"].result, 3)
+        self.assertNotIn(CHAN, self.strategy.slots)
+
+
+if __name__ == "__main__":
+    unittest.main()
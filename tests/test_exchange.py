@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test the exchange schemas' result preparation"""
+
+
+import copy
+import types
+import unittest
+
+from nombot.generics import exchange as X
+
+
+TRADE = {"id": "1", "symbol": "BTC/USD", "price": 9.5, "info": {"raw": 1}}
+ORDER = {"id": "2", "symbol": "BTC/USD", "status": "open"}
+
+
+def results(**by_exchange):
+    """Wrap results as CCXTApi returns them"""
+    data = {"result": dict(by_exchange)}
+    data["result"]["result"] = data["result"]
+    return data
+
+
+class TestPrepare(unittest.TestCase):
+    """Tests for the streaming prepare pipeline"""
+
+    def test_streaming(self):
+        """Records are yielded lazily"""
+        prepared = X.TradeSchema().prepare(
+            results(bittrex={"BTC/USD": [TRADE] * 3}))
+        self.assertIsInstance(prepared, types.GeneratorType)
+        self.assertEqual(next(prepared)["exchange"], "bittrex")
+        self.assertEqual(len(list(prepared)), 2)
+
+    def test_untouched(self):
+        """Shared (e.g. cached) responses are never mutated"""
+        data = results(bittrex={"BTC/USD": {"symbol": "BTC/USD", "bid": 1}},
+                       kraken={"ETH/USD": {"symbol": "ETH/USD", "bid": 2}})
+        before = copy.deepcopy(data["result"]["bittrex"])
+        tickers = list(X.TickerSchema().prepare(data))
+        self.assertEqual(data["result"]["bittrex"], before)
+        self.assertEqual([(tick["exchange"], tick["bid"]) for tick in tickers],
+                         [("bittrex", 1), ("kraken", 2)])
+
+    def test_no_copies(self):
+        """Nested values are shared with the response"""
+        data = results(bittrex={"BTC/USD": [TRADE]})
+        trade, = X.TradeSchema().prepare(data)
+        self.assertIs(trade["info"], TRADE["info"])
+
+    def test_orders(self):
+        """Orders are yielded from lists or results keyed by symbol"""
+        data = results(bittrex=[ORDER, ORDER],
+                       kraken={"BTC/USD": [ORDER], "result": {}})
+        orders = list(X.OrderSchema().prepare(data))
+        self.assertEqual([order["exchange"] for order in orders],
+                         ["bittrex", "bittrex", "kraken"])
+        self.assertEqual(orders[0]["id"], "2")
+
+    def test_order_books(self):
+        """Order books are keyed by exchange and market"""
+        data = results(bittrex={"BTC/USD": {"bids": [[1.0, 2.0]], "asks": []}})
+        book, = X.OrderBookSchema().prepare(data)
+        self.assertEqual((book["exchange"], book["market"]),
+                         ("bittrex", "BTC/USD"))
+        self.assertIs(book["bids"],
+                      data["result"]["bittrex"]["BTC/USD"]["bids"])
+
+    def test_ohlcv(self):
+        """Candles are split into columns per exchange and market"""
+        data = results(bittrex={"BTC/USD": [[1, 2.0, 3.0, 1.0, 2.5, 9.0],
+                                            [2, 2.5, 3.5, 2.0, 3.0, 8.0]],
+                                "ETH/USD": []})
+        btc, eth = X.OHLCVSchema().prepare(data)
+        self.assertEqual((btc["exchange"], btc["market"]),
+                         ("bittrex", "BTC/USD"))
+        self.assertEqual(list(btc["timestamp"]), [1, 2])
+        self.assertEqual(list(btc["volume"]), [9.0, 8.0])
+        self.assertEqual(list(eth["close"]), [])
+
+    def test_balances(self):
+        """Balances gather their currencies under by_sym"""
+        data = results(bittrex={"info": [], "free": {"BTC": 1.0},
+                                "BTC": {"free": 1.0}})
+        balance, = X.BalanceSchema().prepare(data)
+        self.assertEqual(balance["by_sym"], {"BTC": {"free": 1.0}})
+        self.assertEqual(balance["free"], {"BTC": 1.0})
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test exchange health tracking"""
+
+
+import unittest
+
+from nombot.common.health import Health, HealthTable
+
+
+class TestHealth(unittest.TestCase):
+    """Tests for the circuit breaker"""
+
+    def setUp(self):
+        """Set up test fixtures, if any"""
+        self.health = Health(window=4, threshold=0.5, cooldown=0)
+
+    def test_closed(self):
+        """Healthy targets allow calls"""
+        for _ in range(4):
+            self.health.success(1.0)
+        self.assertTrue(self.health.allow())
+        self.assertEqual(self.health.state, Health.CLOSED)
+        self.assertEqual(self.health.error_rate, 0.0)
+
+    def test_opens(self):
+        """Errors above the threshold open the circuit"""
+        self.health.success(1.0)
+        self.health.success(1.0)
+        self.health.failure()
+        self.assertEqual(self.health.state, Health.CLOSED)
+        self.health.failure()
+        self.assertEqual(self.health.state, Health.OPEN)
+
+    def test_probe(self):
+        """Open circuits allow a single probe after the cooldown"""
+        for _ in range(4):
+            self.health.failure()
+
+        self.assertTrue(self.health.allow())
+        self.assertEqual(self.health.state, Health.HALF_OPEN)
+        self.assertFalse(self.health.allow())
+
+        self.health.failure()
+        self.assertEqual(self.health.state, Health.OPEN)
+
+        self.assertTrue(self.health.allow())
+        self.health.success(1.0)
+        self.assertEqual(self.health.state, Health.CLOSED)
+        self.assertEqual(self.health.error_rate, 0.0)
+
+    def test_available(self):
+        """Checking availability leaves the probe to the caller"""
+        for _ in range(4):
+            self.health.failure()
+
+        self.assertTrue(self.health.available())
+        self.assertEqual(self.health.state, Health.OPEN)
+        self.assertTrue(self.health.allow())
+        self.assertFalse(self.health.available())
+
+    def test_cooldown(self):
+        """Open circuits refuse calls during the cooldown"""
+        health = Health(window=1, cooldown=60)
+        health.failure()
+        self.assertFalse(health.allow())
+
+    def test_latency(self):
+        """Latency is an EWMA of successful calls"""
+        health = Health(alpha=0.5)
+        health.success(1.0)
+        health.success(3.0)
+        self.assertAlmostEqual(health.latency, 2.0)
+        self.assertIsNotNone(health.last_success)
+
+
+class TestHealthTable(unittest.TestCase):
+    """Tests for the health table"""
+
+    def test_dump(self):
+        """Exchanges nest the health of their symbols"""
+        table = HealthTable(window=1)
+        table.get("bittrex").success(0.5)
+        table.get("bittrex", "BTC/USD").failure()
+        table.get("coinbase", "BTC/USD").success(0.1)
+
+        dump = table.dump()
+        self.assertEqual(dump["bittrex"]["latency"], 0.5)
+        self.assertEqual(dump["bittrex"]["symbols"]["BTC/USD"]["state"],
+                         Health.OPEN)
+        self.assertIn("BTC/USD", dump["coinbase"]["symbols"])
+        self.assertIs(table.get("bittrex"), table.get("bittrex"))
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test the incremental technical indicators"""
+
+
+import math
+import unittest
+
+import numpy as np
+
+from bors.common.dotobj import DotObj
+
+from nombot.algorithms.indicators import \
+    ATR, Bollinger, EMA, Indicators, MACD, RSI, SMA, VWAP, ewm
+from nombot.strategies.basic_trading import StockSupplement
+from nombot.strategies.middleware.trading import OHLCVStrategy
+
+
+def bars(count, seed=1):
+    """Random walk candles"""
+    rng = np.random.RandomState(seed)
+    close = 100 + np.cumsum(rng.normal(size=count))
+    return {
+        "time": np.arange(count) * 60000,
+        "open": close,
+        "high": close + rng.random_sample(count),
+        "low": close - rng.random_sample(count),
+        "close": close,
+        "volume": rng.random_sample(count) * 10,
+    }
+
+
+def stepped(indicator, *columns):
+    """Feed an indicator one value at a time, as NaN-filled arrays"""
+    out = []
+    for row in zip(*columns):
+        value = indicator.update(*row)
+        out.append(value if value is not None else
+                   (math.nan,) * 3 if isinstance(indicator, Bollinger)
+                   else math.nan)
+    return np.array(out)
+
+
+class TestIndicators(unittest.TestCase):
+    """Batches match incremental updates"""
+
+    def assert_same(self, make, *columns, split=50):
+        """Compare stepping against batches split in two"""
+        stepped_out = stepped(make(), *columns)
+        indicator = make()
+        first = indicator.batch(*(column[:split] for column in columns))
+        rest = indicator.batch(*(column[split:] for column in columns))
+        if isinstance(first, tuple):
+            batched = np.column_stack([np.concatenate(lines) for lines in
+                                       zip(first, rest)])
+        else:
+            batched = np.concatenate([first, rest])
+        np.testing.assert_allclose(batched, stepped_out, rtol=1e-9)
+
+    def test_ewm(self):
+        """The blocked exponential mean matches its recurrence"""
+        values = bars(1000)["close"]
+        for alpha in (0.9, 0.5, 2 / 201):
+            expected, prev = [], values[0]
+            for value in values:
+                prev += alpha * (value - prev)
+                expected.append(prev)
+            np.testing.assert_allclose(ewm(values, alpha), expected)
+
+    def test_averages(self):
+        """SMA, EMA and Bollinger bands"""
+        close = bars(200)["close"]
+        self.assert_same(lambda: SMA(20), close, split=5)
+        self.assert_same(lambda: EMA(20), close)
+        self.assert_same(lambda: Bollinger(20, 2.0), close)
+        self.assertIsNone(SMA(2).update(1.0))
+
+    def test_oscillators(self):
+        """RSI and MACD"""
+        close = bars(200)["close"]
+        self.assert_same(lambda: RSI(14), close)
+        macd = MACD()
+        stepped_out = np.array([macd.update(value) for value in close])
+        np.testing.assert_allclose(np.column_stack(MACD().batch(close)),
+                                   stepped_out)
+        self.assertEqual(RSI(3).batch([1.0, 2.0, 3.0])[-1], 100.0)
+
+    def test_ranges(self):
+        """ATR and VWAP"""
+        data = bars(200)
+        self.assert_same(ATR, data["high"], data["low"], data["close"])
+        self.assert_same(VWAP, data["high"], data["low"], data["close"],
+                         data["volume"])
+
+    def test_vwap_sessions(self):
+        """The VWAP restarts at each UTC day"""
+        data = bars(200)
+        data["time"] = data["time"] * 30 + 86400000 - 50 * 1800000
+        columns = (data["high"], data["low"], data["close"], data["volume"],
+                   data["time"])
+        for split in (10, 50, 60, 150):
+            self.assert_same(VWAP, *columns, split=split)
+        vwap = VWAP().batch(*columns)
+        day = slice(50, 98)  # the bars of the second day
+        typical = (data["high"] + data["low"] + data["close"])[day] / 3
+        self.assertAlmostEqual(vwap[50], typical[0])
+        self.assertAlmostEqual(
+            vwap[97], np.average(typical, weights=data["volume"][day]))
+        np.testing.assert_allclose(VWAP(None).batch(*columns),
+                                   VWAP().batch(*columns[:4]))
+
+    def test_feed(self):
+        """Feeding skips bars already seen and batches backlogs"""
+        data = bars(100)
+        fed, updated = Indicators(), Indicators()
+        fed.feed({key: column[:60] for key, column in data.items()})
+        fed.feed({key: column[:61] for key, column in data.items()})
+        fed.feed(data)
+        for row in zip(*(data[key] for key in Indicators.columns)):
+            updated.update(*row)
+        self.assertEqual(fed.time, data["time"][-1])
+        for name, value in updated.latest.items():
+            self.assertAlmostEqual(fed.latest[name], value, places=6)
+
+
+class TestStockSupplement(unittest.TestCase):
+    """Tests for the indicator strategy"""
+
+    def test_bind(self):
+        """Indicators follow the closed candles of the OHLCV strategy"""
+        ohlcv, stock = OHLCVStrategy(100, ("1m",)), StockSupplement("1m")
+        trades = [{"exchange": "bittrex", "symbol": "BTC/USD",
+                   "timestamp": minute * 60000, "price": 100.0 + minute,
+                   "amount": 1.0} for minute in range(30)]
+        context = {"result": DotObj({"callname": "fetchTrades",
+                                     "result": trades}),
+                   "strategy": {}}
+        stock.bind(ohlcv.bind(context))
+        latest = context["strategy"]["indicators"][("bittrex", "BTC/USD")]
+        self.assertEqual(latest["time"], 28 * 60000)
+        self.assertAlmostEqual(latest["sma"], 118.5)
+        self.assertEqual(latest["rsi"], 100.0)
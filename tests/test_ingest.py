@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test the websocket ingestion queue"""
+
+
+import threading
+import unittest
+import unittest.mock
+
+from nombot.api.response import Result
+from nombot.common.ingest import IngestQueue, Ingestor
+
+
+ORDERS = "ORDER-BTRX--BTC--USD"
+TRADES = "TRADE-BTRX--BTC--USD"
+
+
+def result(channel, response_type, data):
+    """A websocket result as its schema loads it"""
+    res = Result(channel=channel, response_type=response_type)
+    res.result = data
+    return res
+
+
+class TestIngestQueue(unittest.TestCase):
+    """Tests for conflation, bounds and draining"""
+
+    def setUp(self):
+        """Set up test fixtures, if any"""
+        self.queue = IngestQueue(maxsize=5)
+
+    def put(self, channel, response_type, data):
+        """Queue a result"""
+        self.queue.put(channel, response_type,
+                       result(channel, response_type, data), "ctx")
+
+    def test_order_channels_keep_latest(self):
+        """Order channels keep only the latest state"""
+        for book in range(3):
+            self.put(ORDERS, "orders", book)
+        drained = self.queue.drain(timeout=0)
+        self.assertEqual(len(drained), 1)
+        channel, res_type, res, extra = drained[0]
+        self.assertEqual((channel, res_type, extra),
+                         (ORDERS, "orders", "ctx"))
+        self.assertEqual(res.result, 2)
+        metrics = self.queue.metrics()
+        self.assertEqual(metrics["conflated"], 2)
+        self.assertEqual(metrics["drained"], 1)
+        self.assertEqual(metrics["depth"], 0)
+
+    def test_trade_channels_batch(self):
+        """Trade channels merge their results into one list"""
+        for trade in range(3):
+            self.put(TRADES, "trade", {"id": trade})
+        self.put(ORDERS, "orders", "book")
+        drained = self.queue.drain(timeout=0)
+        self.assertEqual([entry[0] for entry in drained], [TRADES, ORDERS])
+        merged = drained[0][2]
+        self.assertEqual(merged.channel, TRADES)
+        self.assertEqual(merged.result, [{"id": 0}, {"id": 1}, {"id": 2}])
+        self.assertEqual(self.queue.metrics()["batched"], 2)
+
+    def test_other_channels_are_not_conflated(self):
+        """Unknown response types keep each result"""
+        self.put("TICKER-BTRX--BTC--USD", "ticker", 1)
+        self.put("TICKER-BTRX--BTC--USD", "ticker", 2)
+        results = [entry[2].result for entry in self.queue.drain(timeout=0)]
+        self.assertEqual(results, [1, 2])
+
+    def test_overflow_drops_oldest(self):
+        """Overflowing the queue drops the oldest channels first"""
+        self.put(ORDERS, "orders", "book")
+        for trade in range(5):
+            self.put(TRADES, "trade", trade)
+        metrics = self.queue.metrics()
+        self.assertEqual(metrics["dropped"], 1)
+        self.assertEqual(metrics["depth"], 5)
+        self.assertEqual(metrics["high_water"], 5)
+        drained = self.queue.drain(timeout=0)
+        self.assertEqual([entry[0] for entry in drained], [TRADES])
+
+        for trade in range(7):
+            self.put(TRADES, "trade", trade)
+        self.assertEqual(self.queue.drain(timeout=0)[0][2].result,
+                         [2, 3, 4, 5, 6])
+
+    def test_drain_in_batches(self):
+        """Drains hand over at most `max_entries` channels each"""
+        for num in range(3):
+            self.put(f"TRADE-BTRX--C{num}--USD", "trade", num)
+        self.assertEqual(len(self.queue.drain(2, timeout=0)), 2)
+        self.assertEqual(len(self.queue.drain(2, timeout=0)), 1)
+        self.assertEqual(self.queue.drain(2, timeout=0), [])
+        self.assertEqual(self.queue.metrics()["drains"], 2)
+
+
+class TestIngestor(unittest.TestCase):
+    """Tests for the consuming thread"""
+
+    def test_consumes_in_background(self):
+        """Queued results reach the consumer"""
+        received = []
+        done = threading.Event()
+
+        def consume(res, extra):
+            """Record a result"""
+            received.append((res.result, extra))
+            done.set()
+
+        ingestor = Ingestor(consume, maxsize=10)
+        ingestor.put(TRADES, "trade", result(TRADES, "trade", 1), "ctx")
+        self.assertTrue(done.wait(5))
+        ingestor.stop()
+        ingestor.thread.join(5)
+        self.assertFalse(ingestor.thread.is_alive())
+        self.assertEqual(received, [([1], "ctx")])
+
+    def test_survives_consumer_errors(self):
+        """A consumer raising is logged and later results still arrive"""
+        received = []
+        done, failed = threading.Event(), threading.Event()
+        log = unittest.mock.Mock()
+        log.exception.side_effect = lambda message: failed.set()
+
+        def consume(res, extra):
+            """Fail on the first result, then record"""
+            if extra == "bad":
+                raise ValueError("bad result")
+            received.append(res.result)
+            done.set()
+
+        ingestor = Ingestor(consume, maxsize=10, log=log)
+        ingestor.put(TRADES, "trade", result(TRADES, "trade", 1), "bad")
+        self.assertTrue(failed.wait(5))
+        ingestor.put(TRADES, "trade", result(TRADES, "trade", 2))
+        self.assertTrue(done.wait(5))
+        ingestor.stop()
+        self.assertEqual(received, [[2]])
+        self.assertIn(TRADES, log.exception.call_args[0][0])
+
+    def test_logs_metrics(self):
+        """Metrics are logged every interval"""
+        logged = threading.Event()
+        log = unittest.mock.Mock()
+        log.info.side_effect = lambda message: logged.set()
+
+        ingestor = Ingestor(lambda res, extra: None, maxsize=10, log=log,
+                            log_interval=0.01)
+        ingestor.put(TRADES, "trade", result(TRADES, "trade", 1))
+        self.assertTrue(logged.wait(5))
+        ingestor.stop()
+        self.assertIn("'received': 1", log.info.call_args[0][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
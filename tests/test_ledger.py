@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test the balance ledgers"""
+
+
+import unittest
+
+from nombot.common.ledger import Ledgers
+
+
+SEED = {"free": {"BTC": 1.0, "USD": 1000.0},
+        "used": {"BTC": 0.0, "USD": 0.0},
+        "total": {"BTC": 1.0, "USD": 1000.0}}
+LATER = 2000 * 1000  # ms, after the seed
+
+
+def order(**kwargs):
+    """A ccxt order"""
+    return dict({"id": "1", "symbol": "BTC/USD", "side": "buy",
+                 "price": 100.0, "amount": 2.0, "remaining": 2.0,
+                 "filled": 0.0, "status": "open", "timestamp": LATER},
+                **kwargs)
+
+
+def fill(**kwargs):
+    """A ccxt trade of ours"""
+    return dict({"id": "t1", "order": "1", "symbol": "BTC/USD",
+                 "side": "buy", "price": 100.0, "amount": 1.0,
+                 "cost": 100.0, "timestamp": LATER,
+                 "fee": {"currency": "USD", "cost": 0.5}}, **kwargs)
+
+
+class TestLedger(unittest.TestCase):
+    """Tests for a single ledger"""
+
+    def setUp(self):
+        """Set up test fixtures, if any"""
+        self.ledgers = Ledgers(interval=60.0)
+        self.ledger = self.ledgers.get("bittrex", "key")
+        self.ledger.seed(SEED, now=1000)
+
+    def test_orders(self):
+        """Orders hold funds until filled or closed"""
+        self.ledger.order(order())
+        self.assertEqual(self.ledger.free("USD"), 800.0)
+        self.ledger.order(order(side="sell", id="2", price=None))
+        self.assertEqual(self.ledger.free("BTC"), -1.0)
+        self.assertTrue(self.ledger.drifted)
+        self.ledger.order(order(status="canceled"))
+        self.assertEqual(self.ledger.free("USD"), 1000.0)
+
+    def test_fills(self):
+        """Fills move totals once, less fees, and release holds"""
+        self.ledger.order(order())
+        self.assertTrue(self.ledger.fill(fill()))
+        self.assertFalse(self.ledger.fill(fill()))
+        balance = self.ledger.balance()
+        self.assertEqual(balance["BTC"]["total"], 2.0)
+        self.assertEqual(balance["total"]["USD"], 899.5)
+        self.assertEqual(balance["used"]["USD"], 100.0)
+        self.ledger.order(order(status="closed", filled=1.0))
+        self.assertEqual(self.ledger.balance()["free"]["USD"], 899.5)
+        self.assertFalse(self.ledger.drifted)
+
+    def test_settled(self):
+        """Events older than the seed are already in its balances"""
+        self.ledger.order(order(timestamp=500 * 1000))
+        self.assertEqual(self.ledger.free("USD"), 1000.0)
+        self.assertFalse(self.ledger.fill(fill(timestamp=500 * 1000)))
+        self.assertEqual(self.ledger.total["BTC"], 1.0)
+
+    def test_missed_fill(self):
+        """Orders filled beyond the fills seen flag a drift"""
+        self.ledger.order(order())
+        self.ledger.order(order(filled=1.5, remaining=0.5))
+        self.assertTrue(self.ledger.drifted)
+
+    def test_reconcile(self):
+        """Ledgers go stale on a drift or after the interval"""
+        self.assertTrue(self.ledgers.stale([("bittrex", "key")], now=1030))
+        self.ledger.order(order())
+        self.assertFalse(self.ledgers.stale([("bittrex", "key")], now=1030))
+        self.assertTrue(self.ledgers.stale([("bittrex", "key")], now=1060))
+        self.assertTrue(self.ledgers.stale([("kraken", "key")], now=1030))
+        self.ledger.fill(fill(order=None))
+        drift = self.ledger.reconcile(SEED, now=2000)
+        self.assertEqual(drift, {"BTC": -1.0, "USD": 100.5})
+        self.assertEqual(self.ledger.total["BTC"], 1.0)
+        self.assertTrue(self.ledger.stale(60.0, now=2030))
+        self.ledger.fill(fill(id="t2"))
+        self.assertFalse(self.ledger.stale(60.0, now=2030))
+
+    def test_other_process(self):
+        """Ledgers seeded in another process are stale"""
+        self.ledger.order(order())
+        self.ledger.pid = None
+        self.assertTrue(self.ledgers.stale([("bittrex", "key")], now=1030))
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test the on-disk market cache"""
+
+
+import unittest
+from tempfile import TemporaryDirectory
+
+from nombot.common.market_cache import MarketCache
+
+
+MARKETS = {"BTC/USD": {"symbol": "BTC/USD", "base": "BTC", "quote": "USD"}}
+CURRENCIES = {"BTC": {"id": "BTC"}, "USD": {"id": "USD"}}
+
+
+class TestMarketCache(unittest.TestCase):
+    """Tests for the market cache"""
+
+    def setUp(self):
+        """Set up test fixtures, if any"""
+        self.tmpdir = TemporaryDirectory()
+        self.cache = MarketCache(self.tmpdir.name, ttl=60)
+
+    def tearDown(self):
+        """Tear down test fixtures, if any"""
+        self.tmpdir.cleanup()
+
+    def test_miss(self):
+        """An exchange that was never stored misses"""
+        self.assertEqual(self.cache.get("bittrex"), (None, False))
+
+    def test_roundtrip(self):
+        """Stored markets are returned fresh"""
+        self.cache.put("bittrex", MARKETS, CURRENCIES)
+        entry, fresh = self.cache.get("bittrex")
+
+        self.assertTrue(fresh)
+        self.assertDictEqual(entry["markets"], MARKETS)
+        self.assertDictEqual(entry["currencies"], CURRENCIES)
+
+    def test_keyed_by_exchange(self):
+        """Exchanges do not share entries"""
+        self.cache.put("bittrex", MARKETS, CURRENCIES)
+        self.assertEqual(self.cache.get("coinbase"), (None, False))
+
+    def test_expired(self):
+        """Entries older than the TTL are returned stale"""
+        cache = MarketCache(self.tmpdir.name, ttl=0)
+        cache.put("bittrex", MARKETS, CURRENCIES)
+        entry, fresh = cache.get("bittrex")
+
+        self.assertFalse(fresh)
+        self.assertDictEqual(entry["markets"], MARKETS)
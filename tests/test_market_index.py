@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test the market index"""
+
+
+import unittest
+
+from nombot.common.market_index import MarketIndex
+
+
+def markets(*symbols):
+    """Build ccxt-like markets from symbols"""
+    return {
+        sym: {"symbol": sym, "base": sym.split("/")[0],
+              "quote": sym.split("/")[1]}
+        for sym in symbols
+    }
+
+
+class TestMarketIndex(unittest.TestCase):
+    """Tests for the market index"""
+
+    def setUp(self):
+        """Set up test fixtures, if any"""
+        self.index = MarketIndex()
+        self.index.add("bittrex", markets("BTC/USD", "ETH/BTC", "ETH/USD"))
+        self.index.add("coinbase", markets("BTC/USD", "LTC/USD"))
+
+    def test_exchanges(self):
+        """Exchanges listing a pair"""
+        self.assertSetEqual(self.index.exchanges("BTC", "USD"),
+                            {"bittrex", "coinbase"})
+        self.assertSetEqual(self.index.exchanges("ETH", "BTC"), {"bittrex"})
+        self.assertSetEqual(self.index.exchanges("XRP", "BTC"), set())
+
+    def test_symbols(self):
+        """Symbols by base, quote and exchange"""
+        self.assertSetEqual(self.index.symbols(base="ETH"),
+                            {"ETH/BTC", "ETH/USD"})
+        self.assertSetEqual(self.index.symbols(quote="USD"),
+                            {"BTC/USD", "ETH/USD", "LTC/USD"})
+        self.assertSetEqual(self.index.symbols(quote="USD",
+                                               exchange="coinbase"),
+                            {"BTC/USD", "LTC/USD"})
+        self.assertEqual(len(self.index.symbols()), 4)
+
+    def test_market(self):
+        """Market of a symbol on an exchange"""
+        self.assertEqual(self.index.market("coinbase", "LTC/USD")["base"],
+                         "LTC")
+        self.assertIsNone(self.index.market("coinbase", "ETH/BTC"))
+
+    def test_remove(self):
+        """Removing an exchange keeps symbols other exchanges list"""
+        self.index.remove("coinbase")
+        self.assertSetEqual(self.index.exchanges("BTC", "USD"), {"bittrex"})
+        self.assertSetEqual(self.index.symbols(base="LTC"), set())
+        self.assertNotIn("LTC", self.index.by_base)
+
+    def test_replace(self):
+        """Re-adding an exchange replaces its markets"""
+        self.index.add("coinbase", markets("ETH/USD"))
+        self.assertSetEqual(self.index.exchanges("LTC", "USD"), set())
+        self.assertSetEqual(self.index.exchanges("ETH", "USD"),
+                            {"bittrex", "coinbase"})
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test the incremental order book engine"""
+
+
+import unittest
+
+import numpy as np
+
+from nombot.common.orderbook import OrderBookEngine
+
+
+class TestOrderBook(unittest.TestCase):
+    """Tests for the order books"""
+
+    def setUp(self):
+        """Set up test fixtures, if any"""
+        self.engine = OrderBookEngine()
+        self.book = self.engine.snapshot(
+            "bittrex", "BTC/USD",
+            bids=[[99.0, 1.0], [100.0, 2.0], [98.0, 0.0]],
+            asks=[[102.0, 1.0], [101.0, 3.0]], timestamp=1)
+
+    def test_snapshot(self):
+        """Snapshots are sorted best first, dropping empty levels"""
+        self.assertEqual(self.book.best_bid(), (100.0, 2.0))
+        self.assertEqual(self.book.best_ask(), (101.0, 3.0))
+        self.assertEqual(self.book.depth()["bids"], [[100.0, 2.0],
+                                                     [99.0, 1.0]])
+        self.assertEqual(self.book.spread(), 1.0)
+        self.assertIs(self.engine.get("bittrex", "BTC/USD"), self.book)
+        self.assertIsNone(self.engine.get("bittrex", "ETH/USD"))
+
+    def test_updates(self):
+        """Deltas insert, change and remove levels"""
+        self.engine.update("bittrex", "BTC/USD", "buy", 100.5, 1.0)
+        self.engine.update("bittrex", "BTC/USD", "asks", 101.0, 0)
+        self.engine.update("bittrex", "BTC/USD", "bids", 99.0, 5.0, 2)
+        self.assertEqual(self.book.best_bid(), (100.5, 1.0))
+        self.assertEqual(self.book.best_ask(), (102.0, 1.0))
+        self.assertEqual(self.book.depth(2), {
+            "bids": [[100.5, 1.0], [100.0, 2.0]],
+            "asks": [[102.0, 1.0]],
+            "timestamp": 2,
+        })
+        self.engine.update("bittrex", "BTC/USD", "asks", 50.0, 0)
+        self.assertEqual(len(self.book.asks), 1)
+        with self.assertRaises(ValueError):
+            self.book.update("middle", 1.0, 1.0)
+
+    def test_empty(self):
+        """Empty sides have no best level"""
+        self.book.snapshot([], [])
+        self.assertIsNone(self.book.best_bid())
+        self.assertIsNone(self.book.spread())
+
+    def test_order_books(self):
+        """fetchOrderBook results and arrays are applied as snapshots"""
+        self.engine.apply_order_books([
+            {"exchange": "bittrex", "market": "BTC/USD",
+             "bids": np.array([[90.0, 1.0]]), "asks": None},
+            {"exchange": "kraken", "market": "BTC/USD",
+             "bids": [], "asks": [[95.0, 2.0]], "timestamp": 3},
+        ])
+        self.assertEqual(self.book.best_bid(), (90.0, 1.0))
+        self.assertIsNone(self.book.best_ask())
+        self.assertEqual(self.engine.get("kraken", "BTC/USD").timestamp, 3)
+
+    def test_ws_orders(self):
+        """Coinigy order channel items replace their market's book"""
+        self.engine.apply_ws_orders([
+            {"exchange": "BTRX", "label": "BTC/USD", "ordertype": "Buy",
+             "price": 10.0, "quantity": 1.0},
+            {"exchange": "BTRX", "label": "BTC/USD", "ordertype": "Sell",
+             "price": 11.0, "quantity": 2.0},
+            {"exchange": "BTRX", "label": "BTC/USD", "ordertype": "Buy",
+             "price": 10.5, "quantity": 1.0},
+        ])
+        book = self.engine.get("BTRX", "BTC/USD")
+        self.assertEqual(book.best_bid(), (10.5, 1.0))
+        self.assertEqual(book.best_ask(), (11.0, 2.0))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test the token-bucket rate limiter"""
+
+
+import asyncio
+import time
+import unittest
+
+from nombot.common.ratelimit import RateLimiter, TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Tests for the token bucket"""
+
+    def setUp(self):
+        """Set up test fixtures, if any"""
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        """Tear down test fixtures, if any"""
+        self.loop.close()
+
+    def timed(self, *coros):
+        """Run the coroutines, returning the seconds spent"""
+        start = time.monotonic()
+        for coro in coros:
+            self.loop.run_until_complete(coro)
+        return time.monotonic() - start
+
+    def test_burst(self):
+        """A full bucket serves a burst without waiting"""
+        bucket = TokenBucket(rate=10, capacity=5)
+        elapsed = self.timed(*[bucket.acquire() for _ in range(5)])
+        self.assertLess(elapsed, 0.05)
+
+    def test_refill(self):
+        """An empty bucket waits for tokens to accrue"""
+        bucket = TokenBucket(rate=20, capacity=1)
+        elapsed = self.timed(bucket.acquire(), bucket.acquire())
+        self.assertGreaterEqual(elapsed, 0.04)
+
+    def test_weight(self):
+        """Heavier calls wait longer"""
+        bucket = TokenBucket(rate=20, capacity=2)
+        elapsed = self.timed(bucket.acquire(2), bucket.acquire(2))
+        self.assertGreaterEqual(elapsed, 0.09)
+
+    def test_overweight(self):
+        """Calls heavier than the bucket leave it in debt"""
+        bucket = TokenBucket(rate=20, capacity=1)
+        self.assertLess(self.timed(bucket.acquire(5)), 0.05)
+        self.assertGreaterEqual(self.timed(bucket.acquire()), 0.24)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Tests for the rate limiter"""
+
+    def test_shared_bucket(self):
+        """Limiters with the same key share a bucket"""
+        first = RateLimiter(("test_exch", "key"), 1)
+        second = RateLimiter(("test_exch", "key"), 1)
+        other = RateLimiter(("test_exch", "other_key"), 1)
+
+        self.assertIs(first.bucket, second.bucket)
+        self.assertIsNot(first.bucket, other.bucket)
+
+    def test_weights(self):
+        """Calls weigh 1 unless configured"""
+        limiter = RateLimiter(("test_exch", None), 1,
+                              weights={"fetchTickers": 5})
+
+        self.assertEqual(limiter.weight("fetchTickers"), 5)
+        self.assertEqual(limiter.weight("fetchTicker"), 1)
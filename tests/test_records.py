@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test the compact record types"""
+
+
+import unittest
+
+from nombot.generics.records import Order, Ticker, Trade, record_decoders
+
+
+TRADE = {"id": "1", "symbol": "BTC/USD", "price": 9.5, "amount": 2.0,
+         "side": "buy", "info": {"raw": "payload"}}
+
+
+def results(**by_exchange):
+    """Wrap results as CCXTApi returns them"""
+    data = {"result": dict(by_exchange)}
+    data["result"]["result"] = data["result"]
+    return data
+
+
+class TestRecords(unittest.TestCase):
+    """Tests for the records"""
+
+    def test_slots(self):
+        """Records carry no instance dict"""
+        trade = Trade.from_dict(TRADE, "bittrex")
+        self.assertFalse(hasattr(trade, "__dict__"))
+        self.assertIn("price", Trade.__slots__)
+        self.assertNotIn("info", Trade.__slots__)
+
+    def test_access(self):
+        """Fields are reachable by attribute or key"""
+        trade = Trade.from_dict(TRADE, "bittrex")
+        self.assertEqual(trade.price, 9.5)
+        self.assertEqual(trade["exchange"], "bittrex")
+        self.assertIsNone(trade.order)
+        with self.assertRaises(KeyError):
+            trade["missing"]  # pylint: disable=pointless-statement
+
+    def test_info(self):
+        """Raw payloads are only kept on request"""
+        self.assertIsNone(Trade.from_dict(TRADE).info)
+        kept = Trade.from_dict(TRADE, keep_info=True)
+        self.assertDictEqual(kept.as_dict()["info"], TRADE["info"])
+
+
+class TestRecordDecoders(unittest.TestCase):
+    """Tests for decoding results into records"""
+
+    def setUp(self):
+        """Set up test fixtures, if any"""
+        self.decoders = record_decoders()
+
+    def test_by_symbol(self):
+        """Results keyed by symbol are flattened"""
+        tickers = self.decoders["fetchTicker"](results(
+            bittrex={"BTC/USD": {"symbol": "BTC/USD", "bid": 1.0},
+                     "ETH/USD": {"symbol": "ETH/USD", "bid": 2.0}}))
+        self.assertListEqual([ticker.bid for ticker in tickers], [1.0, 2.0])
+        self.assertIsInstance(tickers[0], Ticker)
+
+        trades = self.decoders["fetchTrades"](results(
+            bittrex={"BTC/USD": [TRADE, TRADE]}))
+        self.assertEqual(len(trades), 2)
+
+    def test_lists(self):
+        """Lists returned by exchanges are flattened"""
+        orders = self.decoders["fetchOrders"](results(
+            bittrex=[{"id": "1"}], coinbase=[{"id": "2"}, {"id": "3"}]))
+        self.assertListEqual(
+            [(order.exchange, order.id) for order in orders],
+            [("bittrex", "1"), ("coinbase", "2"), ("coinbase", "3")])
+        self.assertIsInstance(orders[0], Order)
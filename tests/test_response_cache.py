@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test response caching and request coalescing"""
+
+
+import asyncio
+import threading
+import time
+import unittest
+
+from nombot.common.response_cache import MISSING, SingleFlight, TTLCache
+from nombot.common.response_cache import ThreadedSingleFlight
+
+
+class TestTTLCache(unittest.TestCase):
+    """Tests for the TTL cache"""
+
+    def test_hit(self):
+        """Live entries are returned"""
+        cache = TTLCache()
+        cache.put("key", None, 60)
+        self.assertIsNone(cache.get("key"))
+        self.assertIs(cache.get("other"), MISSING)
+
+    def test_expiry(self):
+        """Expired entries miss"""
+        cache = TTLCache()
+        cache.put("key", "value", 0.01)
+        time.sleep(0.02)
+        self.assertIs(cache.get("key"), MISSING)
+        self.assertEqual(len(cache), 0)
+
+    def test_lru(self):
+        """The least recently used entry is evicted"""
+        cache = TTLCache(maxsize=2)
+        cache.put("first", 1, 60)
+        cache.put("second", 2, 60)
+        cache.get("first")
+        cache.put("third", 3, 60)
+
+        self.assertEqual(cache.get("first"), 1)
+        self.assertIs(cache.get("second"), MISSING)
+        self.assertEqual(cache.get("third"), 3)
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Tests for request coalescing"""
+
+    def setUp(self):
+        """Set up test fixtures, if any"""
+        self.loop = asyncio.new_event_loop()
+        self.calls = 0
+
+    def tearDown(self):
+        """Tear down test fixtures, if any"""
+        self.loop.close()
+
+    async def fetch(self, value):
+        """A slow request"""
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return value
+
+    async def gather(self, *coros):
+        """Gather in the test loop"""
+        return await asyncio.gather(*coros)
+
+    def test_coalesce(self):
+        """Concurrent calls with the same key share one request"""
+        flights = SingleFlight()
+        results = self.loop.run_until_complete(self.gather(
+            *[flights.do("key", self.fetch, "value") for _ in range(5)]))
+
+        self.assertListEqual(results, ["value"] * 5)
+        self.assertEqual(self.calls, 1)
+
+    def test_keys(self):
+        """Calls with different keys are not shared"""
+        flights = SingleFlight()
+        results = self.loop.run_until_complete(self.gather(
+            flights.do("first", self.fetch, 1),
+            flights.do("second", self.fetch, 2)))
+
+        self.assertListEqual(results, [1, 2])
+        self.assertEqual(self.calls, 2)
+
+    def test_sequential(self):
+        """Finished calls are not reused"""
+        flights = SingleFlight()
+        for _ in range(2):
+            self.loop.run_until_complete(flights.do("key", self.fetch, 1))
+        self.assertEqual(self.calls, 2)
+
+
+class TestThreadedSingleFlight(unittest.TestCase):
+    """Tests for request coalescing across threads"""
+
+    def setUp(self):
+        """Set up test fixtures, if any"""
+        self.flights = ThreadedSingleFlight()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def fetch(self, value):
+        """A request blocked until released"""
+        self.calls += 1
+        self.release.wait(5)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def run_threads(self, value, count=5):
+        """Call from several threads at once, returning the outcomes"""
+        outcomes = []
+
+        def call():
+            """Record the result or error of a call"""
+            try:
+                outcomes.append(self.flights.do("key", self.fetch, value))
+            except ValueError as err:
+                outcomes.append(err)
+
+        threads = [threading.Thread(target=call) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        while not self.flights._flights:  # pylint: disable=protected-access
+            time.sleep(0.001)
+        time.sleep(0.05)  # let the others join the flight
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        return outcomes
+
+    def test_coalesce(self):
+        """Concurrent calls with the same key share one request"""
+        self.assertListEqual(self.run_threads("value"), ["value"] * 5)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.flights.do("key", self.fetch, 2), 2)
+        self.assertEqual(self.calls, 2)
+
+    def test_errors(self):
+        """Errors are raised to every caller of the flight"""
+        error = ValueError("failed")
+        self.assertListEqual(self.run_threads(error, 3), [error] * 3)
+        self.assertEqual(self.calls, 1)
+
+    def test_any(self):
+        """Calls join a flight under any of their keys, or lead their own"""
+        leader = threading.Thread(
+            target=self.flights.do, args=("all", self.fetch, "value"))
+        leader.start()
+        while not self.flights._flights:  # pylint: disable=protected-access
+            time.sleep(0.001)
+        shared = []
+        follower = threading.Thread(target=lambda: shared.append(
+            self.flights.do_any(("bids", "all"), self.fetch, "other")))
+        follower.start()
+        time.sleep(0.05)  # let it join the flight
+        self.release.set()
+        leader.join(5)
+        follower.join(5)
+        self.assertEqual((shared, self.calls), (["value"], 1))
+        self.assertEqual(self.flights.do_any(("bids", "all"), self.fetch, 2),
+                         2)
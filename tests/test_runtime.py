@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test the background event loop runtime"""
+
+
+import asyncio
+import unittest
+
+from nombot.common.runtime import LoopRuntime
+
+
+class TestLoopRuntime(unittest.TestCase):
+    """Tests for the loop runtime"""
+
+    def setUp(self):
+        """Set up test fixtures, if any"""
+        self.runtime = LoopRuntime()
+
+    def tearDown(self):
+        """Tear down test fixtures, if any"""
+        self.runtime.shutdown(1)
+
+    def test_run(self):
+        """Coroutines run to completion on the loop"""
+        async def add(left, right):
+            """Add, asynchronously"""
+            await asyncio.sleep(0)
+            return left + right
+
+        self.assertEqual(self.runtime.run(add(1, 2), 1), 3)
+
+    def test_submit(self):
+        """Submitted coroutines overlap"""
+        async def nap():
+            """Sleep a bit, returning the loop we ran on"""
+            await asyncio.sleep(0.05)
+            return asyncio.get_event_loop()
+
+        futures = [self.runtime.submit(nap()) for _ in range(10)]
+        loops = {future.result(0.2) for future in futures}
+        self.assertSetEqual(loops, {self.runtime.loop})
+
+    def test_shutdown_cancels(self):
+        """Shutdown cancels pending work and closes the loop"""
+        future = self.runtime.submit(asyncio.sleep(60))
+        self.runtime.shutdown(1)
+
+        self.assertTrue(future.cancelled())
+        self.assertTrue(self.runtime.loop.is_closed())
+        self.assertFalse(self.runtime.thread.is_alive())
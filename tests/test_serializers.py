@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test the compiled response serializers"""
+
+
+import json
+import unittest
+
+from marshmallow import fields, post_dump, Schema
+
+from nombot.api.response import RESPONSE_MAP
+from nombot.api import coinigy_response
+from nombot.generics.response import ParserRegistry, SERIALIZERS
+from nombot.generics.serializers import compile_schema
+
+
+FEE = {"currency": "USD", "cost": 0.1, "rate": 0.0025}
+LIMIT = {"min": 0.001, "max": 1000}
+SAMPLES = {
+    "fetchBalance": [{"exchange": "exch", "info": [{"raw": 1}],
+                      "free": {"BTC": 1.0}, "by_sym": {}}],
+    "fetchMarkets": {"exchange": "exch", "active": 1, "symbol": "BTC/USD",
+                     "limits": {"amount": LIMIT, "price": LIMIT},
+                     "precision": None},
+    "fetchOrderBook": [{"exchange": "exch", "market": "BTC/USD",
+                        "bids": [[6000, "1.5"]], "asks": [],
+                        "timestamp": "1530000000000", "nonce": None}],
+    "fetchOHLCV": [{"exchange": "exch", "market": "BTC/USD",
+                    "timestamp": (1, "2"), "open": (1, 2.5), "high": (),
+                    "low": [], "close": [3], "volume": None}],
+    "fetchOrders": [{"exchange": "exch", "id": 1, "price": 6000,
+                     "trades": None, "fee": FEE, "info": {}}],
+    "fetchTicker": {"exchange": "exch", "symbol": "BTC/USD", "bid": None,
+                    "ask": "6001.5", "info": {"raw": 1}},
+    "fetchTickers": [{"exchange": "exch", "symbol": "BTC/USD", "last": 1}],
+    "fetchTrades": [{"exchange": "exch", "id": "1", "order": None,
+                     "amount": 2}],
+    "fetchMyTrades": [{"exchange": "exch", "id": "1", "fee": None}],
+}
+SAMPLES["fetchOpenOrders"] = SAMPLES["fetchOrders"]
+SAMPLES["fetchClosedOrders"] = SAMPLES["fetchOrders"]
+
+
+class TestSerializers(unittest.TestCase):
+    """Tests for the compiled serializers"""
+
+    def test_response_map(self):
+        """Every callname serializes as its marshmallow schema does"""
+        for callname, sample in SAMPLES.items():
+            with self.subTest(callname=callname):
+                self.assertEqual(SERIALIZERS[callname](sample),
+                                 RESPONSE_MAP[callname].dump(sample))
+        self.assertEqual(set(SERIALIZERS), set(RESPONSE_MAP))
+
+    def test_objects(self):
+        """Non-dict objects are read through marshmallow's accessor"""
+        class Tick:  # pylint: disable=too-few-public-methods
+            """A bare ticker object"""
+            symbol = "BTC/USD"
+            bid = 5
+        ticker = Tick()
+        schema = RESPONSE_MAP["fetchTicker"]
+        self.assertEqual(SERIALIZERS["fetchTicker"](ticker),
+                         schema.dump(ticker))
+
+    def test_errors(self):
+        """Unformattable values raise as marshmallow does"""
+        with self.assertRaises(ValueError):
+            SERIALIZERS["fetchTicker"]({"bid": "not a number"})
+
+    def test_fields(self):
+        """Keys, attributes, defaults and slow fields are honored"""
+        class Item(Schema):
+            """Nested schema"""
+            value = fields.Float()
+
+        class Sample(Schema):
+            """A schema exercising uncommon field options"""
+            num = fields.Int(data_key="n")
+            name = fields.Str(attribute="other.name")
+            flag = fields.Bool()
+            missing = fields.Float(default=1.5)
+            entries = fields.List(fields.Nested(Item))
+
+        schema = Sample(many=True)
+        data = [{"num": "3", "other": {"name": 4}, "flag": "yes",
+                 "entries": [{"value": "1"}, {"value": None}]}, {}]
+        self.assertEqual(compile_schema(schema)(data), schema.dump(data))
+
+    def test_hooks(self):
+        """Schemas with dump hooks fall back to marshmallow"""
+        class Hooked(Schema):
+            """A schema with a post_dump hook"""
+            num = fields.Int()
+
+            @post_dump
+            def wrap(self, data, **kwargs):  # pylint: disable=no-self-use
+                """Wrap the output"""
+                return {"wrapped": data}
+
+        schema = Hooked()
+        self.assertEqual(compile_schema(schema), schema.dump)
+
+
+class TestParserRegistry(unittest.TestCase):
+    """Tests for the websocket payload parsers"""
+
+    def setUp(self):
+        """Set up test fixtures, if any"""
+        self.registry = ParserRegistry(coinigy_response.RESPONSE_MAP)
+        self.book = [{"exchange": "GDAX", "label": "BTC/USD",
+                      "ordertype": "Buy", "price": "6500", "quantity": 1,
+                      "total": 6500, "timestamp": "2018-06-26T08:00:01"}]
+
+    def test_resolved_once(self):
+        """Parsers are built once per response type"""
+        parser = self.registry.resolve("orders")
+        self.assertIs(self.registry.resolve("orders"), parser)
+
+    def test_decodes_json(self):
+        """JSON text and decoded payloads parse alike, as the schema dumps"""
+        schema = coinigy_response.RESPONSE_MAP["orders"]
+        parse = self.registry.resolve("orders")
+        self.assertEqual(parse(self.book), schema.dump(self.book))
+        self.assertEqual(parse(json.dumps(self.book)),
+                         schema.dump(self.book))
+        self.assertEqual(parse(json.dumps(self.book).encode()),
+                         schema.dump(self.book))
+
+    def test_unknown_types(self):
+        """Unknown types fall back to the default, or to the payload"""
+        self.assertEqual(self.registry.resolve("unknown")('{"a": 1}'),
+                         {"a": 1})
+        registry = ParserRegistry(coinigy_response.RESPONSE_MAP, "orders")
+        self.assertEqual(registry.resolve("unknown")(self.book),
+                         coinigy_response.RESPONSE_MAP["orders"]
+                         .dump(self.book))
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test the Coinigy channel subscriptions"""
+
+
+import types
+import unittest
+import unittest.mock
+
+from nombot.strategies.middleware.coinigy import ChannelSubscriptions, \
+    CoinigyFacade
+
+
+AVAILABLE = [
+    "ORDER-BTRX--BTC--USD", "TRADE-BTRX--BTC--USD", "TRADE-BTRX--ETH--BTC",
+    "TRADE-GDAX--BTC--USD", "TRADE-BTRX--XRP--BTC", "TICKER-BTRX--BTC--USD",
+]
+
+
+class TestChannelSubscriptions(unittest.TestCase):
+    """Tests for the subscription diffs"""
+
+    def setUp(self):
+        """Set up test fixtures, if any"""
+        self.calls = []
+        self.subs = ChannelSubscriptions(
+            lambda chans: self.calls.append(("add", chans)),
+            lambda chans: self.calls.append(("remove", chans)),
+            batch_size=2, interval=0, subscribed=["FAVORITES"])
+        self.subs.configure({"FAVORITES": True}, ["btrx"],
+                            ["BTC", "USD", "ETH"])
+
+    def test_subscribe(self):
+        """Only wanted channels are subscribed, in batches"""
+        adds, removes = self.subs.set_available(AVAILABLE)
+        self.assertEqual(adds, {"ORDER-BTRX--BTC--USD",
+                                "TRADE-BTRX--BTC--USD",
+                                "TRADE-BTRX--ETH--BTC"})
+        self.assertEqual(removes, set())
+        self.assertEqual([len(chans) for _, chans in self.calls], [2, 1])
+        self.assertEqual(self.calls[0][1]["ORDER-BTRX--BTC--USD"], "orders")
+        self.assertEqual(self.calls[1][1]["TRADE-BTRX--ETH--BTC"], "trade")
+        self.assertIn("FAVORITES", self.subs.subscribed)
+
+    def test_diffs(self):
+        """Changes only (un)subscribe the differences"""
+        self.subs.set_available(AVAILABLE)
+        del self.calls[:]
+        self.assertEqual(self.subs.set_available(AVAILABLE), (set(), set()))
+        self.assertEqual(self.calls, [])
+
+        adds, removes = self.subs.configure(
+            {"FAVORITES": True}, ["btrx", "gdax"], ["BTC", "USD"])
+        self.assertEqual(adds, {"TRADE-GDAX--BTC--USD"})
+        self.assertEqual(removes, {"TRADE-BTRX--ETH--BTC"})
+        self.assertEqual(self.calls, [
+            ("remove", ["TRADE-BTRX--ETH--BTC"]),
+            ("add", {"TRADE-GDAX--BTC--USD": "trade"}),
+        ])
+
+    def test_paced(self):
+        """Batches are spaced out by the interval"""
+        self.subs.interval = 60
+        self.subs.set_available(AVAILABLE)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.subs.pending(), 1)
+        self.subs.cancel()
+
+
+class TestCoinigyFacade(unittest.TestCase):
+    """Tests for following channel changes after connecting"""
+
+    def setUp(self):
+        """Set up test fixtures, if any"""
+        self.offered = list(AVAILABLE)
+        self.context = {
+            "conf": {"subscriptions": {"FAVORITES": True},
+                     "exchanges": ["btrx"], "subscribe_interval": 0,
+                     "channel_refresh": 0},
+            "currencies": ["BTC", "USD"],
+            "shared": {},
+            "log_level": "WARNING",
+        }
+        sock_api = types.SimpleNamespace(
+            sock=unittest.mock.Mock(), channels=[],
+            ws_result_schema=types.SimpleNamespace(
+                parsers=unittest.mock.Mock()))
+        self.inst = types.SimpleNamespace(
+            api=sock_api, wscall=self.wscall,
+            add_channels=unittest.mock.Mock())
+        self.facade = CoinigyFacade(self.inst, self.context)
+
+    def wscall(self, _callname, _data, callback):
+        """Answer a channel request with the offered channels"""
+        callback("channels", None,
+                 [[{"channel": chan} for chan in self.offered]])
+
+    def added(self):
+        """Channels subscribed to so far"""
+        return [chan for call in self.inst.add_channels.call_args_list
+                for chan in call[0][0]]
+
+    def removed(self):
+        """Channels unsubscribed from so far"""
+        return [call[0][0] for call in
+                self.inst.api.sock.unsubscribe.call_args_list]
+
+    def test_changes(self):
+        """Changes after connecting (un)subscribe their differences"""
+        self.facade.get_channels(lambda chans: None)
+        self.assertEqual(sorted(self.added()),
+                         ["ORDER-BTRX--BTC--USD", "TRADE-BTRX--BTC--USD"])
+
+        self.offered.remove("ORDER-BTRX--BTC--USD")
+        self.context["currencies"].append("ETH")
+        self.facade.refresh_channels()
+        self.assertEqual(self.removed(), ["ORDER-BTRX--BTC--USD"])
+        self.assertEqual(self.added()[2:], ["TRADE-BTRX--ETH--BTC"])
+
+        self.context["conf"]["exchanges"] = ["gdax"]
+        self.assertEqual(self.facade.update_channels(),
+                         ({"TRADE-GDAX--BTC--USD"},
+                          {"TRADE-BTRX--BTC--USD", "TRADE-BTRX--ETH--BTC"}))
+        self.assertEqual(self.context["shared"]["channels"],
+                         {"FAVORITES": True, "TRADE-GDAX--BTC--USD": False})
+        self.facade.stop()
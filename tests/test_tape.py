@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test the columnar trade tapes"""
+
+
+import unittest
+
+from nombot.common.tape import TradeTape, TradeTapes
+from nombot.generics.records import Trade
+
+
+def trade(num, side="buy"):
+    """A prepared fetchTrades item"""
+    return {"exchange": "bittrex", "symbol": "BTC/USD", "id": str(num),
+            "timestamp": 1000 + num, "price": 100.0 + num, "amount": 1.0,
+            "side": side}
+
+
+class TestTradeTape(unittest.TestCase):
+    """Tests for a single tape"""
+
+    def test_dedupe(self):
+        """Overlapping polls only add new trades"""
+        tape = TradeTape(10)
+        self.assertEqual(tape.extend([trade(1), trade(2)]), 2)
+        self.assertEqual(tape.extend([trade(2), trade(3)]), 1)
+        self.assertEqual(len(tape), 3)
+        self.assertIn("3", tape)
+        self.assertEqual(list(tape.window()["price"]), [101.0, 102.0, 103.0])
+
+    def test_wrap(self):
+        """Old trades are evicted and windows stay contiguous"""
+        tape = TradeTape(3)
+        tape.extend(trade(num, "sell") for num in range(5))
+        window = tape.window()
+        self.assertEqual(list(window["timestamp"]), [1002, 1003, 1004])
+        self.assertEqual(list(window["side"]), [-1, -1, -1])
+        self.assertEqual(list(tape.window(2)["price"]), [103.0, 104.0])
+        self.assertNotIn("0", tape)
+        # evicted trades do not come back, out of time order
+        self.assertFalse(tape.append(trade(0)))
+        self.assertEqual(list(tape.window()["timestamp"]), [1002, 1003, 1004])
+
+    def test_time_order(self):
+        """Trades older than the newest are dropped, keeping time order"""
+        tape = TradeTape(5)
+        tape.extend([trade(2), trade(4)])
+        self.assertFalse(tape.append(trade(3)))
+        self.assertTrue(tape.append(dict(trade(5), timestamp=None)))
+        self.assertEqual(list(tape.window()["timestamp"]), [1002, 1004, 1004])
+        self.assertEqual(list(tape.since(1003)["price"]), [104.0, 105.0])
+
+    def test_views(self):
+        """Windows are read-only views of the buffers"""
+        tape = TradeTape(4)
+        tape.extend(trade(num) for num in range(6))
+        price = tape.window()["price"]
+        self.assertIs(price.base, tape.price)
+        self.assertFalse(price.flags.writeable)
+
+    def test_since(self):
+        """Windows can start at a timestamp"""
+        tape = TradeTape(5)
+        tape.extend(trade(num) for num in range(8))
+        self.assertEqual(list(tape.since(1005)["timestamp"]),
+                         [1005, 1006, 1007])
+        self.assertEqual(len(tape.since(2000)["price"]), 0)
+
+
+class TestTradeTapes(unittest.TestCase):
+    """Tests for tapes by exchange and market"""
+
+    def test_apply(self):
+        """Trades and trade records are filed by exchange and symbol"""
+        tapes = TradeTapes(10)
+        other = dict(trade(1), symbol="ETH/USD")
+        self.assertEqual(tapes.apply_trades([trade(1), other]), 2)
+        self.assertEqual(tapes.apply_trades(
+            [Trade.from_dict(trade(1)), Trade.from_dict(trade(2))]), 1)
+        self.assertEqual(len(tapes.get("bittrex", "BTC/USD")), 2)
+        self.assertIsNone(tapes.get("kraken", "BTC/USD"))
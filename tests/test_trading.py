@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Test the OHLCV aggregation middleware"""
+
+
+import unittest
+
+from bors.common.dotobj import DotObj
+
+from nombot.generics.records import Ticker
+from nombot.strategies.middleware.trading import \
+    Candles, OHLCV, OHLCVStrategy, parse_timeframe
+
+
+MINUTE = 60 * 1000
+
+
+def trade(timestamp, price, amount=1.0, trade_id=None):
+    """A prepared fetchTrades item"""
+    return {"exchange": "bittrex", "symbol": "BTC/USD", "id": trade_id,
+            "timestamp": timestamp, "price": price, "amount": amount}
+
+
+def context(callname, results):
+    """A strategy context holding a result"""
+    return {"result": DotObj({"callname": callname, "result": results}),
+            "strategy": {}}
+
+
+class TestCandles(unittest.TestCase):
+    """Tests for the candle ring buffers"""
+
+    def test_timeframes(self):
+        """Timeframes are parsed as ccxt names them"""
+        self.assertEqual(parse_timeframe("5m"), 5 * MINUTE)
+        self.assertEqual(parse_timeframe("1d"), 24 * 60 * MINUTE)
+        with self.assertRaises(ValueError):
+            parse_timeframe("1y")
+
+    def test_aggregate(self):
+        """Prices fold into the candle of their period"""
+        candles = Candles("1m", 3)
+        self.assertIsNone(candles.current())
+        self.assertTrue(candles.update(10, 5.0, 1.0))
+        candles.update(20, 7.0, 2.0)
+        candles.update(30, 4.0, 1.0)
+        candles.update(40, 6.0)
+        self.assertEqual(candles.current(), {
+            "time": 0, "open": 5.0, "high": 7.0, "low": 4.0,
+            "close": 6.0, "volume": 4.0})
+        self.assertTrue(candles.update(MINUTE + 1, 8.0))
+        self.assertFalse(candles.update(59, 1.0))  # stale
+        self.assertEqual(list(candles.closed()["close"]), [6.0])
+        self.assertEqual(candles.current()["open"], 8.0)
+
+    def test_ring(self):
+        """History is bounded and windows are views"""
+        candles = Candles("1m", 3)
+        for minute in range(5):
+            candles.update(minute * MINUTE, float(minute))
+        self.assertEqual(len(candles), 3)
+        window = candles.window()
+        self.assertEqual(list(window["open"]), [2.0, 3.0, 4.0])
+        self.assertIs(window["open"].base, candles.open)
+        self.assertFalse(window["open"].flags.writeable)
+        self.assertEqual(list(candles.closed(1)["time"]), [3 * MINUTE])
+
+
+class TestOHLCV(unittest.TestCase):
+    """Tests for the OHLCV strategy"""
+
+    def test_trades(self):
+        """Trades build candles for every timeframe"""
+        ohlcv = OHLCV(10, ("1m", "5m"))
+        ohlcv.update(context("fetchTrades", [
+            trade(0, 1.0), trade(MINUTE, 2.0), trade(2 * MINUTE, 3.0)]))
+        series = ohlcv.dump()[("bittrex", "BTC/USD")]
+        self.assertEqual(len(series["1m"]), 3)
+        self.assertEqual(series["5m"].current()["high"], 3.0)
+        self.assertEqual(series["5m"].current()["volume"], 3.0)
+
+    def test_overlapping_trades(self):
+        """Trades repeated by overlapping polls are folded once"""
+        ohlcv = OHLCV(10, ("1m",))
+        trades = [trade(1000 * num, 1.0, trade_id=str(num))
+                  for num in range(5)]
+        for _ in range(3):
+            ohlcv.update(context("fetchTrades", trades))
+        trades.append(trade(4000, 2.0, 0.5, trade_id="5"))
+        ohlcv.update(context("fetchTrades", trades[2:]))
+        candle = ohlcv.dump()[("bittrex", "BTC/USD")]["1m"].current()
+        self.assertEqual(candle["volume"], 5.5)
+        self.assertEqual(candle["close"], 2.0)
+
+    def test_candles(self):
+        """Fetched candles build the timeframes they divide"""
+        ohlcv = OHLCV(10, ("1m", "5m"))
+        ohlcv.update(context("fetchOHLCV", [{
+            "exchange": "bittrex", "market": "BTC/USD",
+            "timestamp": [0, 5 * MINUTE, 10 * MINUTE],
+            "open": [1.0, 2.0, 3.0], "high": [4.0, 5.0, 6.0],
+            "low": [0.5, 1.5, 2.5], "close": [2.0, 3.0, 4.0],
+            "volume": [1.0, 1.0, 1.0]}]))
+        series = ohlcv.dump()[("bittrex", "BTC/USD")]
+        self.assertEqual(len(series["1m"]), 0)
+        self.assertEqual(list(series["5m"].closed()["high"]), [4.0, 5.0])
+        self.assertEqual(series["5m"].current()["close"], 4.0)
+
+    def test_repolled_candles(self):
+        """Candles repeated by overlapping polls are folded once"""
+        ohlcv = OHLCV(10, ("1m", "5m"))
+
+        def poll(volumes, close):
+            """Poll three one-minute candles, the last one still open"""
+            count = len(volumes)
+            ohlcv.update(context("fetchOHLCV", [{
+                "exchange": "bittrex", "market": "BTC/USD",
+                "timestamp": [num * MINUTE for num in range(count)],
+                "open": [1.0] * count, "high": [2.0] * count,
+                "low": [1.0] * count, "close": [1.0] * (count - 1) + [close],
+                "volume": volumes}]))
+
+        poll([1.0, 1.0, 0.5], 1.5)
+        poll([1.0, 1.0, 2.0], 1.8)
+        poll([1.0, 1.0, 2.0], 1.8)
+        series = ohlcv.dump()[("bittrex", "BTC/USD")]
+        self.assertEqual(series["1m"].current()["volume"], 2.0)
+        self.assertEqual(series["1m"].current()["close"], 1.8)
+        self.assertEqual(list(series["1m"].window()["volume"]),
+                         [1.0, 1.0, 2.0])
+        self.assertEqual(series["5m"].current()["volume"], 4.0)
+
+    def test_tickers(self):
+        """Tickers move prices without adding volume"""
+        ohlcv = OHLCV(10, ("1m",))
+        tick = Ticker.from_dict({"symbol": "BTC/USD", "timestamp": 5,
+                                 "last": 9.0}, "bittrex")
+        ohlcv.update(context("fetchTickers", [tick]))
+        candles = ohlcv.dump()[("bittrex", "BTC/USD")]["1m"]
+        self.assertEqual(candles.current()["close"], 9.0)
+        self.assertEqual(candles.current()["volume"], 0.0)
+
+    def test_bind(self):
+        """The strategy publishes the live candles"""
+        strategy = OHLCVStrategy(hist_size=5)
+        ctx = strategy.bind(context("fetchTrades", [trade(0, 1.0)]))
+        self.assertEqual(ctx["strategy"]["ohlc_hist_size"], 5)
+        self.assertIn(("bittrex", "BTC/USD"), ctx["strategy"]["ohlc"])